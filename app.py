@@ -12,10 +12,12 @@ import tempfile
 import os
 import time
 from datetime import datetime
-from classifier import classify_frame
+from classifier import classify_frame, classify_frames, warmup, FrameFeatures, DuplicateDetector, MotionGate, ResolutionCascade
 from ui_components import apply_custom_css, show_hero, get_category_badge, show_enhanced_video_comparison
 from video_generator import create_video_from_frames, create_video_from_frame_files
-from config import COLORS
+from tracker import KeyframeTracker
+from inference_backends import BACKENDS, BACKEND_LABELS
+from config import COLORS, YOLO_BATCH_SIZE, PHASH_MAX_DISTANCE
 
 # PAGE CONFIG
 # Note: Max upload size is configured to 800MB in .streamlit/config.toml
@@ -91,6 +93,25 @@ edge_threshold = st.sidebar.slider(
     help="Edge ratio threshold for content detection"
 )
 
+# Detection Mode
+detection_mode = st.sidebar.selectbox(
+    "🎞️ Detection Mode",
+    options=["motion_gate", "keyframe_tracker"],
+    format_func=lambda m: {
+        "motion_gate": "Every frame (motion-gated)",
+        "keyframe_tracker": "Keyframes + tracker"
+    }[m],
+    help="Keyframes + tracker runs YOLO only every few frames or on scene cuts and tracks objects in between"
+)
+
+# Inference Backend
+backend = st.sidebar.selectbox(
+    "⚙️ Inference Backend",
+    options=BACKENDS,
+    format_func=lambda b: BACKEND_LABELS[b],
+    help="ONNX Runtime backends are exported once and cached; int8 is fastest on CPU-only devices"
+)
+
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 📊 Current Settings")
 st.sidebar.info(f"""
@@ -117,7 +138,9 @@ st.session_state.thresholds = {
     'yolo_confidence': yolo_threshold,
     'ssim_threshold': ssim_threshold,
     'sky_threshold': sky_threshold,
-    'edge_threshold': edge_threshold
+    'edge_threshold': edge_threshold,
+    'detection_mode': detection_mode,
+    'backend': backend
 }
 
 tab1, tab2 = st.tabs(["📹 VIDEO ANALYSIS", "🖼️ IMAGE ANALYSIS"])
@@ -166,7 +189,17 @@ with tab1:
             results = []
             saved_frames = []  # kept for small demos; primarily we'll save to disk
             saved_frame_paths = []
-            last_frame = None
+            # Per-run duplicate detector: holds only the previous 24x24 thumbnail,
+            # plus a dHash index of every kept frame for hover / pan-back repeats
+            detector = DuplicateDetector(
+                st.session_state.thresholds['ssim_threshold'], hash_distance=PHASH_MAX_DISTANCE
+            )
+            # Per-run motion gate: near-static stretches reuse the last YOLO result
+            motion_gate = MotionGate()
+            # Keyframe mode: YOLO on keyframes only, tracked objects in between
+            tracker = KeyframeTracker() if detection_mode == 'keyframe_tracker' else None
+            # Resolution cascade: YOLO small first, ambiguous frames escalate
+            cascade = ResolutionCascade()
             processed = 0
 
             progress_bar = st.progress(0, text="Starting...")
@@ -175,6 +208,10 @@ with tab1:
             metrics = st.columns(4)
             metric_p, metric_d, metric_s, metric_r = [m.empty() for m in metrics]
 
+            # Load and warm up YOLO outside the timed loop
+            for imgsz in cascade.levels:
+                warmup(imgsz=imgsz, backend=backend)
+
             cap = cv2.VideoCapture(input_path)
             start_time = time.time()
             frame_num = 0
@@ -183,70 +220,88 @@ with tab1:
             skip_frames = max(1, total_frames // 500)  # Process max 500 frames for large videos
             display_update_freq = max(1, skip_frames // 2)  # Show frames more frequently
             
+            batch_size = st.session_state.thresholds.get('batch_size', YOLO_BATCH_SIZE)
+            batch = []  # (frame_num, frame) pairs waiting for classify_frames
+            
             while True:
                 ret, frame = cap.read()
-                if not ret:
+                if ret:
+                    frame_num += 1
+                    
+                    # Skip frames for speed optimization
+                    if frame_num % skip_frames != 0:
+                        continue
+                    
+                    batch.append((frame_num, frame))
+                    if len(batch) < batch_size:
+                        continue
+                
+                if not batch:
                     break
                 
-                frame_num += 1
+                # Classify the collected frames in one batched YOLO call
+                batch_features = [FrameFeatures(f) for _, f in batch]
+                batch_results = classify_frames(
+                    batch_features, None, st.session_state.thresholds, batch_size=batch_size,
+                    detector=detector, motion_gate=motion_gate, tracker=tracker, cascade=cascade
+                )
                 
-                # Skip frames for speed optimization
-                if frame_num % skip_frames != 0:
-                    continue
-                    
-                progress_bar.progress(frame_num / total_frames, text=f"Processing {frame_num}/{total_frames}")
-
-                # Update frame display more frequently to show real-time analysis
-                if processed % display_update_freq == 0:
-                    try:
-                        # Convert BGR to RGB for proper display
-                        display_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        frame_display.image(display_frame, caption=f"Analyzing Frame {frame_num}", use_container_width=True)
-                    except Exception as e:
-                        pass
-
-                category, confidence, detected, metric, latency = classify_frame(frame, last_frame, st.session_state.thresholds)
-                if category == "Discard" and detected == "duplicate_frame":
-                    counts["Duplicates"] += 1
-                counts[category] += 1
-                processed += 1
-
-                if category != "Discard":
-                    # Save frame to disk to avoid holding large lists in memory
-                    try:
-                        frame_id = len(saved_frame_paths)
-                        frame_path = os.path.join(frames_dir, f"frame_{frame_id:06d}.png")
-                        import cv2
-                        cv2.imwrite(frame_path, frame)
-                        saved_frame_paths.append(frame_path)
-                        # keep a small in-memory sample for quick preview (optional)
-                        if len(saved_frames) < 5:
-                            saved_frames.append(frame.copy())
-                    except Exception as e:
-                        # fallback to in-memory if disk write fails
-                        saved_frames.append(frame.copy())
-
-                # Update UI metrics and status more frequently for better user feedback
-                if processed % max(1, display_update_freq) == 0:
-                    badge = get_category_badge(category)
-                    status_display.markdown(
-                        f"<div class='glass-card'>"
-                        f"<p><strong>Frame {frame_num}</strong> | {badge}</p>"
-                        f"<p>📊 Object: <strong>{detected}</strong></p>"
-                        f"<p>🎯 Confidence: <strong>{confidence:.0%}</strong> | ⚡ Speed: <strong>{latency*1000:.1f}ms</strong></p>"
-                        f"<p>🔄 Status: <strong>Processing...</strong></p>"
-                        f"</div>",
-                        unsafe_allow_html=True,
-                    )
+                for (frame_num_b, frame_b), result in zip(batch, batch_results):
+                    progress_bar.progress(frame_num_b / total_frames, text=f"Processing {frame_num_b}/{total_frames}")
+
+                    # Update frame display more frequently to show real-time analysis
+                    if processed % display_update_freq == 0:
+                        try:
+                            # Convert BGR to RGB for proper display
+                            display_frame = cv2.cvtColor(frame_b, cv2.COLOR_BGR2RGB)
+                            frame_display.image(display_frame, caption=f"Analyzing Frame {frame_num_b}", use_container_width=True)
+                        except Exception as e:
+                            pass
+
+                    category, confidence, detected, metric, latency = result
+                    if category == "Discard" and detected in ("duplicate_frame", "near_duplicate"):
+                        counts["Duplicates"] += 1
+                    counts[category] += 1
+                    processed += 1
+
+                    if category != "Discard":
+                        # Save frame to disk to avoid holding large lists in memory
+                        try:
+                            frame_id = len(saved_frame_paths)
+                            frame_path = os.path.join(frames_dir, f"frame_{frame_id:06d}.png")
+                            cv2.imwrite(frame_path, frame_b)
+                            saved_frame_paths.append(frame_path)
+                            # keep a small in-memory sample for quick preview (optional)
+                            if len(saved_frames) < 5:
+                                saved_frames.append(frame_b.copy())
+                        except Exception as e:
+                            # fallback to in-memory if disk write fails
+                            saved_frames.append(frame_b.copy())
+
+                    # Update UI metrics and status more frequently for better user feedback
+                    if processed % max(1, display_update_freq) == 0:
+                        badge = get_category_badge(category)
+                        status_display.markdown(
+                            f"<div class='glass-card'>"
+                            f"<p><strong>Frame {frame_num_b}</strong> | {badge}</p>"
+                            f"<p>📊 Object: <strong>{detected}</strong></p>"
+                            f"<p>🎯 Confidence: <strong>{confidence:.0%}</strong> | ⚡ Speed: <strong>{latency*1000:.1f}ms</strong></p>"
+                            f"<p>🔄 Status: <strong>Processing...</strong></p>"
+                            f"</div>",
+                            unsafe_allow_html=True,
+                        )
 
-                    saved = counts["Critical"] + counts["Important"] + counts["Normal"]
-                    reduction = (1 - saved / max(processed, 1)) * 100
-                    metric_p.metric("Processed", processed)
-                    metric_d.metric("Duplicates", counts["Duplicates"])
-                    metric_s.metric("Saved", saved)
-                    metric_r.metric("Reduction %", f"{reduction:.1f}%")
+                        saved = counts["Critical"] + counts["Important"] + counts["Normal"]
+                        reduction = (1 - saved / max(processed, 1)) * 100
+                        metric_p.metric("Processed", processed)
+                        metric_d.metric("Duplicates", counts["Duplicates"])
+                        metric_s.metric("Saved", saved)
+                        metric_r.metric("Reduction %", f"{reduction:.1f}%")
 
-                last_frame = frame.copy()
+                batch = []
+                
+                if not ret:
+                    break
 
             cap.release()
             elapsed_time = time.time() - start_time
@@ -268,6 +323,29 @@ with tab1:
             fm[2].metric("Duplicates", counts["Duplicates"], f"{counts['Duplicates']/processed*100:.1f}%")
             fm[3].metric("Write Reduction", f"{reduction:.1f}%", "Lower is better")
             fm[4].metric("Lifespan Extension", f"{lifespan_extension:.1f}x", "Higher is better")
+            if tracker is not None:
+                tracking = tracker.stats()
+                st.caption(
+                    f"🎞️ YOLO keyframes: {tracking['keyframes']} | tracked frames: {tracking['tracked_frames']} "
+                    f"| scene cuts: {tracking['scene_cuts']} ({tracking['inference_fraction']:.0%} inference)"
+                )
+            else:
+                reuse = motion_gate.stats()
+                st.caption(
+                    f"🎯 YOLO inferences: {reuse['inferences']} | reused on low motion: {reuse['reused']} "
+                    f"({reuse['hit_rate']:.0%} of detection-stage frames)"
+                )
+            cascade_stats = cascade.stats()
+            escalated = " | ".join(f"{size}px: {n}" for size, n in cascade_stats['escalated'].items())
+            st.caption(
+                f"🔍 Resolution cascade: {cascade_stats['inferred'][0]} frames at {cascade_stats['levels'][0]}px "
+                f"| escalated {escalated} ({cascade_stats['relative_cost']:.2f}x single-pass cost)"
+            )
+            if detector.near_duplicates:
+                st.caption(
+                    f"🔁 Perceptual-hash index removed {detector.near_duplicates} extra writes "
+                    f"(revisited scenes missed by the consecutive-frame SSIM check)"
+                )
 
             # ========================== VIDEO CREATION ========================== #
             st.markdown("---")
@@ -7,13 +7,23 @@ import threading
 import time
 import os
 import tempfile
-import cv2
 from datetime import datetime
-from classifier import classify_frame
-from video_generator import create_video_from_frame_files
-import streamlit as st
+from classifier import FrameFeatures
+from classifier_engine import get_engine
+from classifier_pool import ClassificationPool
+from result_cache import get_result_cache
+from feature_store import FeatureRecorder, save_feature_store
+from frame_sources import open_frame_source
+from config import YOLO_BACKEND, CLASSIFY_WORKERS, PIPELINE_DECODE_QUEUE, PIPELINE_WRITE_QUEUE, FRAME_DECODER
+from video_generator import StreamingVideoSink
+from job_manager import get_job_manager
+try:
+    import streamlit as st
+except ImportError:
+    st = None  # Session helpers need Streamlit; the processor itself runs without it
 import queue
 import json
+import uuid
 
 class BackgroundVideoProcessor:
     def __init__(self):
@@ -45,97 +55,290 @@ class BackgroundVideoProcessor:
         
         return True, "Background processing started"
     
+    def run(self, video_path, thresholds, fps, width, height, total_frames):
+        """Process a video in the calling thread (job manager workers). Returns the final result
+        stop_event is NOT cleared, so a stop requested before the job starts still applies"""
+        self.progress_queue = queue.Queue()
+        self.result_queue = queue.Queue()
+        self.is_processing = True
+        self._process_video_background(video_path, thresholds, fps, width, height, total_frames)
+        return self.get_result()
+    
+    def _put(self, stage_queue, item, done):
+        """Blocking put that gives up once the job is stopped or torn down (backpressure without deadlock)"""
+        while not (self.stop_event.is_set() or done.is_set()):
+            try:
+                stage_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def _next_frame(self, frames_queue):
+        """Next (frame_num, frame) from the decoder; None at the end of the video or on stop"""
+        while not self.stop_event.is_set():
+            try:
+                return frames_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+    
+    def _decode_frames(self, source, frames_queue, done, profiler, errors):
+        """Decoder stage: pull the sampled (frame_num, frame, full_frame) items from the frame source, end with None"""
+        frames = iter(source)
+        try:
+            while not (self.stop_event.is_set() or done.is_set()):
+                decode_start = time.perf_counter()
+                item = next(frames, None)
+                profiler.add("decode", time.perf_counter() - decode_start)
+                if item is None or not self._put(frames_queue, item, done):
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            frames.close()  # releases the capture / stops ffmpeg
+            self._put(frames_queue, None, done)
+    
+    def _encode_frames(self, write_queue, sink, done, profiler):
+        """Output stage: stream kept frames into the video encoder in arrival (= frame) order until None"""
+        while True:
+            try:
+                frame = write_queue.get(timeout=0.1)
+            except queue.Empty:
+                if done.is_set():
+                    return
+                continue
+            if frame is None:
+                return
+            encode_start = time.perf_counter()
+            sink.write(frame)
+            profiler.add("encode", time.perf_counter() - encode_start)
+    
     def _process_video_background(self, video_path, thresholds, fps, width, height, total_frames):
-        """Background video processing worker"""
+        """
+        Background video processing worker - the classifier stage of a three-stage pipeline:
+        decoder thread -> this thread (classification) -> encoder thread.
+        Bounded queues between the stages keep memory flat and frame order intact.
+        """
+        pool = None
+        sink = None
+        pipeline_done = threading.Event()  # tears the helper threads down on errors
         try:
-            # Create temporary directories
+            # Create temporary directory (kept frames go straight into the encoder - no frame files)
             tmpdir = tempfile.mkdtemp(prefix="aura_bg_")
-            frames_dir = os.path.join(tmpdir, "frames")
             output_path = os.path.join(tmpdir, "aura_optimized.mp4")
-            os.makedirs(frames_dir, exist_ok=True)
+            
+            thresholds = thresholds or {}
+            # Shot sampling reads EVERY frame (cheap thumbnail histograms) and only
+            # classifies shot boundaries / representatives, so long videos are covered end to end
+            shot_sampling = thresholds.get('sampling') == 'shots'
+            # AGGRESSIVE OPTIMIZATION: Process even fewer frames for background
+            skip_frames = 1 if shot_sampling else max(1, total_frames // 300)  # Process max 300 frames for speed
+            
+            # Shared engine (model + thread budget); the job context holds this job's
+            # duplicate detector, motion gate, tracker and resolution cascade
+            engine = get_engine(thresholds.get('backend', YOLO_BACKEND))
+            job = engine.job(thresholds)
+            
+            # Persistent cache: a finished run of the same video + settings + loaded model is replayed
+            cache = get_result_cache() if thresholds.get('use_cache', True) else None
+            run_key, cached_run = None, None
+            if cache is not None:
+                try:
+                    run_key = cache.job_key(video_path, thresholds, backend=engine.loaded_backend(),
+                                            skip_frames=skip_frames)
+                    cached_run = cache.lookup(run_key)
+                except Exception as e:
+                    print(f"Warning: Classification cache lookup failed: {e}")
+                    cache = None
+            cached_results, cached_summary = cached_run if cached_run is not None else (None, None)
+            job_results = {}  # frame_num -> result, stored in the cache when the job finishes
+            replay_broken = False  # the stored run did not cover every decoded frame
+            # Load and warm up YOLO before the clock starts so the first frame
+            # doesn't absorb the cold-start cost (ONNX export happens here once)
+            # Process-pool mode: each worker loads its own copy of the model instead
+            # (not in shot mode - representatives are classified one at a time)
+            # Stride / shot sampling grab()s past skipped frames (or, with the ffmpeg decoder, selects
+            # and downscales them inside ffmpeg); keyframe sampling decodes I-frames only
+            source = open_frame_source(video_path, thresholds.get('sampling'), skip_frames, width, height, fps,
+                                       decoder=thresholds.get('decoder', FRAME_DECODER))
+            n_workers = 0 if shot_sampling else thresholds.get('workers', CLASSIFY_WORKERS)
+            if cached_results is None and n_workers > 0:
+                pool = ClassificationPool(job, n_workers, source.frame_shape or (height, width, 3))
+                pool.start()
+            elif cached_results is None:
+                engine.load(job.cascade.levels)
             
             # Initialize counters
             counts = {"Critical": 0, "Important": 0, "Normal": 0, "Discard": 0, "Duplicates": 0}
-            saved_frame_paths = []
-            last_frame = None
+            # Raw per-frame measurements, so sliders can re-threshold without reprocessing
+            recorder = FeatureRecorder(job.detector.hash_distance)
+            analysed_frames = []
             processed = 0
+            kept = 0  # frames sent to the encoder (shot-inherited frames keep a label but are never written)
             start_time = time.time()
             
-            # Open video
-            cap = cv2.VideoCapture(video_path)
-            frame_num = 0
+            # Decoder and encoder run in their own threads (OpenCV and pipe I/O release the GIL),
+            # overlapping with classification instead of waiting for it
+            # ONE encoder for the whole job, fed every kept frame in the source's own pixel
+            # layout (yuv420p full frames from the ffmpeg decoder are encoded without conversion)
+            sink = StreamingVideoSink(output_path, fps, width, height, pix_fmt=source.pix_fmt)
+            sink.open()
+            frames_queue = queue.Queue(maxsize=PIPELINE_DECODE_QUEUE)
+            write_queue = queue.Queue(maxsize=PIPELINE_WRITE_QUEUE)
+            decode_errors = []
+            decoder = threading.Thread(
+                target=self._decode_frames,
+                args=(source, frames_queue, pipeline_done, job.profiler, decode_errors),
+                name="aura-pipeline-decode",
+                daemon=True
+            )
+            writer = threading.Thread(
+                target=self._encode_frames,
+                args=(write_queue, sink, pipeline_done, job.profiler),
+                name="aura-pipeline-encode",
+                daemon=True
+            )
+            decoder.start()
+            writer.start()
             
-            # AGGRESSIVE OPTIMIZATION: Process even fewer frames for background
-            skip_frames = max(1, total_frames // 300)  # Process max 300 frames for speed
+            batch_size = 1 if shot_sampling else job.batch_size
+            batch = []  # (frame_num, frame, full_frame) items waiting for classify_frames
+            shot_result = None  # result of the current shot's latest representative
             
-            while not self.stop_event.is_set():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame_num += 1
-                
-                # Skip frames for speed
-                if frame_num % skip_frames != 0:
-                    continue
-                
-                # Classify frame
-                category, confidence, detected, metric, latency = classify_frame(
-                    frame, last_frame, thresholds
-                )
+            while True:
+                item = self._next_frame(frames_queue)
                 
-                # Update counts
-                if category == "Discard" and detected == "duplicate_frame":
-                    counts["Duplicates"] += 1
-                counts[category] += 1
-                processed += 1
+                if item is not None:
+                    batch.append(item)
+                    if len(batch) < batch_size:
+                        continue
                 
-                # Save important frames
-                if category != "Discard":
-                    try:
-                        frame_id = len(saved_frame_paths)
-                        frame_path = os.path.join(frames_dir, f"frame_{frame_id:06d}.png")
-                        cv2.imwrite(frame_path, frame)
-                        saved_frame_paths.append(frame_path)
-                    except Exception:
-                        pass
+                ready = []  # (batch, results) pairs finished in frame order
+                if batch and cached_results is not None and any(n not in cached_results for n, _, _ in batch):
+                    # The decoder produced a frame the stored run does not have (different decoder or
+                    # frame count): cache miss - classify live from here on and drop the stale run
+                    print("Warning: Cached run is missing frame(s) - classifying the rest of the video")
+                    cached_results = cached_summary = None
+                    replay_broken = True
+                    engine.load(job.cascade.levels)
+                if batch and cached_results is not None:
+                    # Cache hit: replay the stored results, only decoding is left
+                    ready.append((batch, [cached_results[n] + (0.0,) for n, _, _ in batch]))
+                elif batch and job.shots is not None:
+                    # Shot mode: classify boundaries / representatives only. The rest of the shot is a
+                    # repeat of its representative - takes its label, counted as a duplicate, never written
+                    shot_start = time.perf_counter()
+                    features = FrameFeatures(batch[0][1])
+                    _, representative = job.shots.observe(features)
+                    job.profiler.add("shot_detect", time.perf_counter() - shot_start)
+                    if representative or shot_result is None:
+                        shot_result = job.classify([features], recorder=recorder)[0]
+                        analysed_frames.append(batch[0][0])
+                        ready.append((batch, [shot_result]))
+                    else:
+                        ready.append((batch, [shot_result[:2] + ("shot_inherited", shot_result[3], 0.0)]))
+                elif batch and pool is not None:
+                    # Heuristics here, YOLO in the worker processes; batches come back in order
+                    ready.extend(pool.submit([f for _, f, _ in batch], payload=batch, recorder=recorder))
+                    analysed_frames.extend(n for n, _, _ in batch)
+                elif batch:
+                    # Classify the whole batch in one YOLO call
+                    ready.append((batch, job.classify([f for _, f, _ in batch], recorder=recorder)))
+                    analysed_frames.extend(n for n, _, _ in batch)
+                if item is None and pool is not None:
+                    ready.extend(pool.drain())
                 
-                # Send progress update every 10 frames
-                if processed % 10 == 0:
-                    progress_data = {
-                        'processed': processed,
-                        'total_estimated': total_frames // skip_frames,
-                        'frame_num': frame_num,
-                        'total_frames': total_frames,
-                        'counts': counts.copy(),
-                        'current_category': category,
-                        'current_detected': detected,
-                        'current_confidence': confidence
-                    }
-                    self.progress_queue.put(progress_data)
+                for done_batch, batch_results in ready:
+                    # Classification ran on the analysis frames; the full-resolution frames are kept
+                    for (batch_frame_num, _, batch_frame), result in zip(done_batch, batch_results):
+                        category, confidence, detected, metric, latency = result
+                        if cached_results is None:
+                            job_results[batch_frame_num] = result
+                        
+                        # Update counts
+                        inherited = detected == "shot_inherited"
+                        if inherited or (category == "Discard" and detected in ("duplicate_frame", "near_duplicate")):
+                            counts["Duplicates"] += 1
+                        counts[category] += 1
+                        processed += 1
+                        
+                        # Save important frames (encoding happens in the encoder thread)
+                        if category != "Discard" and not inherited:
+                            write_queue.put(batch_frame)
+                            kept += 1
+                        
+                        # Send progress update every 10 frames
+                        if processed % 10 == 0:
+                            if source.mode == "keyframes":
+                                # Keyframe spacing is only known as we go - extrapolate from the position
+                                total_estimated = max(processed, processed * total_frames // max(batch_frame_num, 1))
+                            else:
+                                total_estimated = total_frames // skip_frames
+                            progress_data = {
+                                'processed': processed,
+                                'total_estimated': total_estimated,
+                                'frame_num': batch_frame_num,
+                                'total_frames': total_frames,
+                                'counts': counts.copy(),
+                                'saved': kept,
+                                'current_category': category,
+                                'current_detected': detected,
+                                'current_confidence': confidence
+                            }
+                            self.progress_queue.put(progress_data)
+                        
+                batch = []
                 
-                last_frame = frame.copy()
+                if item is None:
+                    break
             
-            cap.release()
+            # Let the encoder take every queued frame before the video is finalized
+            write_queue.put(None)
+            writer.join()
+            pipeline_done.set()
+            decoder.join()
+            if decode_errors:
+                raise decode_errors[0]
+            if pool is not None:
+                pool.close()
+                pool = None
             elapsed_time = time.time() - start_time
             
-            # Create optimized video if we have frames
+            # Finalize the optimized video - a stopped job keeps the frames encoded so far
             video_created = False
             video_message = ""
+            try:
+                video_created, video_message, _ = sink.close()
+            except Exception as e:
+                video_message = f"Video creation failed: {str(e)}"
             
-            if len(saved_frame_paths) > 0 and not self.stop_event.is_set():
+            # Job statistics - replayed from the cache, or stored for the next run
+            if cached_summary is not None:
+                summary = cached_summary
+                if not os.path.exists(summary.get('feature_store') or ""):
+                    summary['feature_store'] = None
+            else:
+                feature_path = None
                 try:
-                    success, message, frames_written = create_video_from_frame_files(
-                        frames_dir, output_path, fps, width, height, crf=23, preset="ultrafast"
+                    feature_path = save_feature_store(
+                        recorder.build(analysed_frames), os.path.join(tmpdir, "features.npz")
                     )
-                    video_created = success
-                    video_message = message
                 except Exception as e:
-                    video_message = f"Video creation failed: {str(e)}"
+                    print(f"Warning: Could not save feature store: {e}")
+                summary = {**job.stats(), 'feature_store': feature_path}
+                if cache is not None and not self.stop_event.is_set():
+                    try:
+                        if replay_broken:
+                            # Partly replayed, partly classified: not a complete run, the next one re-stores it
+                            cache.discard(run_key)
+                        else:
+                            cache.store(run_key, job_results, summary)
+                    except Exception as e:
+                        print(f"Warning: Could not store classification cache: {e}")
             
             # Calculate final metrics
-            saved = counts["Critical"] + counts["Important"] + counts["Normal"]
-            reduction = (1 - saved / processed) * 100 if processed > 0 else 0
+            reduction = (1 - kept / processed) * 100 if processed > 0 else 0
             lifespan_extension = 100 / (100 - reduction) if reduction < 100 else 999
             
             # Send final results
@@ -144,9 +347,15 @@ class BackgroundVideoProcessor:
                 'counts': counts,
                 'processed': processed,
                 'elapsed_time': elapsed_time,
-                'saved_frames': len(saved_frame_paths),
+                'saved_frames': sink.frames_written,
                 'reduction': reduction,
                 'lifespan_extension': lifespan_extension,
+                **summary,
+                'cache_hit': cached_results is not None,
+                # Per-stage latency histograms and decode throughput of THIS run (never replayed from the cache)
+                'stage_latency': job.profiler.summary(),
+                'decode': source.stats(),
+                'video_sink': sink.stats(),
                 'video_created': video_created,
                 'video_message': video_message,
                 'output_path': output_path if video_created else None,
@@ -165,6 +374,11 @@ class BackgroundVideoProcessor:
             self.result_queue.put(error_result)
         
         finally:
+            pipeline_done.set()
+            if pool is not None:
+                pool.close()
+            if sink is not None and not sink.closed:
+                sink.abort()
             self.is_processing = False
     
     def get_progress(self):
@@ -198,26 +412,16 @@ class BackgroundVideoProcessor:
         """Check if processing is active"""
         return self.is_processing and (self.processing_thread and self.processing_thread.is_alive())
 
-# Global processor instance
-_global_processor = None
+# Session state helpers - every session's jobs go through the process-wide job manager
+def _session_id():
+    """Owner ID of this Streamlit session (its jobs are private to it)"""
+    if 'aura_session_id' not in st.session_state:
+        st.session_state.aura_session_id = uuid.uuid4().hex
+    return st.session_state.aura_session_id
 
-def get_processor():
-    """Get global processor instance"""
-    global _global_processor
-    if _global_processor is None:
-        _global_processor = BackgroundVideoProcessor()
-    return _global_processor
-
-def cleanup_processor():
-    """Cleanup global processor"""
-    global _global_processor
-    if _global_processor:
-        _global_processor.stop_processing()
-        _global_processor = None
-
-# Session state helpers
 def init_background_state():
     """Initialize background processing session state"""
+    _session_id()
     if 'bg_processor_active' not in st.session_state:
         st.session_state.bg_processor_active = False
     if 'bg_processor_progress' not in st.session_state:
@@ -226,37 +430,54 @@ def init_background_state():
         st.session_state.bg_processor_result = None
     if 'bg_start_time' not in st.session_state:
         st.session_state.bg_start_time = None
+    if 'bg_jobs' not in st.session_state:
+        st.session_state.bg_jobs = []
+    if 'bg_submit_time' not in st.session_state:
+        st.session_state.bg_submit_time = None
 
 def update_background_state():
-    """Update session state with background processor status"""
-    processor = get_processor()
+    """Update session state with this session's jobs"""
+    jobs = get_job_manager().jobs(owner=_session_id())
+    st.session_state.bg_jobs = jobs
     
-    # Update active status
-    st.session_state.bg_processor_active = processor.is_active()
+    # Active while any of this session's jobs is queued or running
+    running = [job for job in jobs if job['state'] == 'running']
+    st.session_state.bg_processor_active = any(job['state'] in ('queued', 'running') for job in jobs)
     
-    # Get progress updates
-    progress_updates = processor.get_progress()
-    if progress_updates:
-        st.session_state.bg_processor_progress = progress_updates[-1]  # Keep latest
+    # Jobs finished since this session last submitted one, latest first
+    submitted = st.session_state.get('bg_submit_time')
+    finished = sorted(
+        (job for job in jobs if job['finished_at'] is not None and job['result'] is not None
+         and (submitted is None or job['finished_at'] >= submitted)),
+        key=lambda job: job['finished_at'], reverse=True
+    )
     
-    # Check for completion
-    result = processor.get_result()
-    if result:
-        st.session_state.bg_processor_result = result
-        st.session_state.bg_processor_active = False
+    # Progress of the longest-running job, else of the latest finished one
+    if running:
+        st.session_state.bg_processor_progress = running[-1]['progress']
+        st.session_state.bg_start_time = running[-1]['started_at']
+    elif finished:
+        st.session_state.bg_processor_progress = finished[0]['progress']
+    
+    # Result of the latest finished job
+    st.session_state.bg_processor_result = finished[0]['result'] if finished else None
 
-def start_background_processing(video_path, thresholds, fps, width, height, total_frames):
-    """Start background processing and update session state"""
-    processor = get_processor()
-    success, message = processor.start_processing(video_path, thresholds, fps, width, height, total_frames)
+def start_background_processing(video_path, thresholds, fps, width, height, total_frames, priority="normal"):
+    """Queue a video job for this session and update session state"""
+    try:
+        job_id = get_job_manager().submit(
+            video_path, thresholds, fps, width, height, total_frames, priority=priority, owner=_session_id()
+        )
+    except Exception as e:
+        return False, str(e)
     
-    if success:
-        st.session_state.bg_processor_active = True
-        st.session_state.bg_start_time = datetime.now()
-        st.session_state.bg_processor_progress = {}
-        st.session_state.bg_processor_result = None
+    st.session_state.bg_processor_active = True
+    st.session_state.bg_start_time = datetime.now()
+    st.session_state.bg_submit_time = st.session_state.bg_start_time
+    st.session_state.bg_processor_progress = {}
+    st.session_state.bg_processor_result = None
     
-    return success, message
+    return True, f"Job {job_id} queued"
 
 def get_background_status():
     """Get current background processing status"""
@@ -266,11 +487,16 @@ def get_background_status():
         'active': st.session_state.bg_processor_active,
         'progress': st.session_state.bg_processor_progress,
         'result': st.session_state.bg_processor_result,
-        'start_time': st.session_state.bg_start_time
+        'start_time': st.session_state.bg_start_time,
+        'jobs': st.session_state.bg_jobs
     }
 
-def stop_background_processing():
-    """Stop background processing"""
-    processor = get_processor()
-    processor.stop_processing()
-    st.session_state.bg_processor_active = False
+def stop_background_processing(job_id=None):
+    """Cancel one of this session's jobs (default: all of its queued / running jobs)"""
+    manager = get_job_manager()
+    job_ids = [job_id] if job_id else [
+        job['job_id'] for job in manager.jobs(owner=_session_id()) if job['state'] in ('queued', 'running')
+    ]
+    for active_id in job_ids:
+        manager.cancel(active_id, owner=_session_id())
+    update_background_state()
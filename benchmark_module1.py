@@ -0,0 +1,559 @@
+"""
+Benchmark script for AURA Module 1 classification pipeline
+Runs on synthetic drone-like footage - no video files or YOLO weights needed
+Usage: python benchmark_module1.py [video.mp4]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import cv2
+import numpy as np
+from classifier import (
+    DuplicateDetector, FrameFeatures, ResolutionCascade, classify_frames, evaluate_heuristics,
+    get_model, is_empty_sky, is_static_water
+)
+from tracker import KeyframeTracker
+from frame_metrics import ssim_batch
+from config import PHASH_MAX_DISTANCE, ANALYSIS_WIDTH
+from inference_backends import BACKENDS
+from feature_store import FeatureRecorder, reclassify
+from classifier_engine import ClassifierEngine
+from classifier_pool import ClassificationPool
+from frame_sources import CaptureSampler, FFmpegPipeSource, KeyframeSampler, ffmpeg_available
+from video_generator import StreamingVideoSink, create_video_from_frame_files
+
+
+def make_world(height=1080, width=4000, seed=0):
+    """Large smooth textured 'ground' image the synthetic drone flies over"""
+    rng = np.random.default_rng(seed)
+    world = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    world = cv2.resize(world, (width, height), interpolation=cv2.INTER_CUBIC)
+    return cv2.GaussianBlur(world, (9, 9), 0)
+
+
+def make_hover_pan_sequence(world, frame_width=1920, step=40, hover=20, passes=3):
+    """
+    Drone hovers, pans right, pans back and repeats - the same scene is revisited
+    many times but never appears twice in a row
+    """
+    max_x = world.shape[1] - frame_width
+    positions = []
+    for _ in range(passes):
+        positions += [0] * hover
+        positions += list(range(0, max_x, step))
+        positions += list(range(max_x, 0, -step))
+
+    frames = []
+    for i, x in enumerate(positions):
+        frame = world[:, x:x + frame_width].copy()
+        # Small sensor noise so hovering frames are not bit-identical
+        noise = np.random.default_rng(i).integers(-3, 4, frame.shape, dtype=np.int16)
+        frames.append(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def count_writes(frames, detector):
+    """Run the heuristic cascade and count frames that would be written"""
+    results = classify_frames([FrameFeatures(f) for f in frames], detector=detector)
+    return sum(1 for r in results if r[0] != "Discard")
+
+
+def benchmark_near_duplicate_index():
+    """Writes removed by the dHash index compared with consecutive-only SSIM"""
+    print("🔁 Near-duplicate index (hover / pan-away / pan-back)...")
+    frames = make_hover_pan_sequence(make_world())
+
+    consecutive = DuplicateDetector(0.97)
+    indexed = DuplicateDetector(0.97, hash_distance=PHASH_MAX_DISTANCE)
+
+    writes_ssim = count_writes(frames, consecutive)
+    writes_index = count_writes(frames, indexed)
+
+    print(f"   - Frames analysed:           {len(frames)}")
+    print(f"   - Writes (consecutive SSIM): {writes_ssim}")
+    print(f"   - Writes (+ dHash index):    {writes_index}")
+    print(f"   - Extra writes removed:      {indexed.near_duplicates} "
+          f"({indexed.near_duplicates / max(writes_ssim, 1):.1%})")
+
+    # Lookup cost against the populated index
+    features = [FrameFeatures(f) for f in frames[:200]]
+    hashes = [f.dhash for f in features]
+    start = time.perf_counter()
+    for h in hashes:
+        indexed.hash_index.nearest(h, PHASH_MAX_DISTANCE)
+    per_lookup_ms = (time.perf_counter() - start) * 1000 / len(hashes)
+    print(f"   - Index size: {len(indexed.hash_index)} | lookup: {per_lookup_ms:.3f} ms")
+
+
+def benchmark_ssim_kernel(n_pairs=2000):
+    """skimage structural_similarity vs the NumPy ssim_batch kernel on 24x24 thumbnails"""
+    print("🧮 SSIM kernel (24x24 thumbnails)...")
+    from skimage.metrics import structural_similarity as ssim
+
+    rng = np.random.default_rng(1)
+    stack1 = rng.integers(0, 255, (n_pairs, 24, 24), dtype=np.uint8)
+    noise = rng.integers(-10, 10, stack1.shape)
+    stack2 = np.clip(stack1.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    start = time.perf_counter()
+    reference = np.array([ssim(a, b, full=True)[0] for a, b in zip(stack1, stack2)])
+    skimage_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = np.array([ssim_batch(a, b)[0] for a, b in zip(stack1, stack2)])
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = ssim_batch(stack1, stack2)
+    batch_s = time.perf_counter() - start
+
+    print(f"   - skimage (full=True):  {skimage_s * 1e6 / n_pairs:8.1f} us/pair")
+    print(f"   - ssim_batch, 1 pair:   {single_s * 1e6 / n_pairs:8.1f} us/pair ({skimage_s / single_s:.1f}x)")
+    print(f"   - ssim_batch, stacked:  {batch_s * 1e6 / n_pairs:8.1f} us/pair ({skimage_s / batch_s:.1f}x)")
+    print(f"   - max |diff| vs skimage: {max(np.abs(reference - single).max(), np.abs(reference - batched).max()):.2e}")
+
+
+def make_horizon_sequence(world, n_frames=100, frame_width=1920, step=20):
+    """Pan over the world with the top part of each frame replaced by blue sky"""
+    frames = []
+    for i in range(n_frames):
+        frame = world[:, i * step:i * step + frame_width].copy()
+        horizon = int(frame.shape[0] * (0.4 + 0.3 * (i % 10) / 10))  # 40-70% sky
+        frame[:horizon] = (230, 150, 90)
+        frames.append(frame)
+    return frames
+
+
+def benchmark_sky_roi():
+    """Detector input pixels with the non-sky ROI crop vs whole frames"""
+    print("🌤️ Sky ROI crop (horizon shots)...")
+    frames = make_horizon_sequence(make_world())
+
+    start = time.perf_counter()
+    crops = [FrameFeatures(f).sky_roi for f in frames]
+    roi_ms = (time.perf_counter() - start) * 1000 / len(frames)
+
+    areas = [1.0 if roi is None else (roi[2] - roi[0]) * (roi[3] - roi[1]) for roi in crops]
+    print(f"   - Frames cropped: {sum(1 for roi in crops if roi is not None)}/{len(frames)}")
+    print(f"   - Mean detector input: {np.mean(areas):.1%} of the full frame")
+    print(f"   - ROI cost: {roi_ms:.3f} ms/frame (incl. thumbnail)")
+
+
+def benchmark_reclassify(n_frames=20000):
+    """Slider update cost: vectorized reclassify over a full-length feature store"""
+    print("🎚️ Live re-classification (feature store)...")
+    frames = make_hover_pan_sequence(make_world(), passes=1)
+    recorder = FeatureRecorder(PHASH_MAX_DISTANCE)
+    classify_frames([FrameFeatures(f) for f in frames], detector=DuplicateDetector(0.97, check_stride=1,
+                    hash_distance=PHASH_MAX_DISTANCE), recorder=recorder)
+    store = recorder.build(range(len(frames)))
+
+    # Tile the recorded columns up to a long video
+    reps = max(1, n_frames // len(frames))
+    columns = ('ssim', 'blue_ratio', 'white_ratio', 'edge_ratio', 'water_ratio', 'variance', 'dhash', 'status')
+    long_store = dict(store, **{name: np.tile(store[name], reps) for name in columns})
+    for name in ('thumb', 'mean_color'):
+        long_store[name] = np.concatenate([store[name]] * reps)
+    long_store['frame_idx'] = np.arange(len(long_store['ssim']))
+    long_store['det_offsets'] = np.zeros(len(long_store['ssim']) + 1, dtype=np.int64)
+    long_store['det_class'] = store['det_class'][:0]
+    long_store['det_conf'] = store['det_conf'][:0]
+
+    for ssim_threshold in (0.97, 0.9):
+        start = time.perf_counter()
+        live = reclassify(long_store, {'ssim_threshold': ssim_threshold, 'yolo_confidence': 0.5})
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"   - {live['processed']} frames @ SSIM {ssim_threshold}: {elapsed_ms:.1f} ms "
+              f"| kept {len(live['kept_frames'])} | reduction {live['reduction']:.1f}%")
+
+
+def benchmark_post_processing(batch_size=8, box_counts=(1, 10, 100), repeats=50):
+    """Per-box Python loop vs vectorized _extract_batch on real ultralytics Results"""
+    print("📦 Detection post-processing (per batch of results)...")
+    try:
+        import torch
+        from ultralytics.engine.results import Results
+    except ImportError:
+        print("   ⚠️ ultralytics / torch not available - skipping")
+        return
+    from classifier import _extract_batch
+    from config import CRITICAL_CLASSES, IMPORTANT_CLASSES
+
+    names = {i: f"class_{i}" for i in range(80)}
+    names.update({0: 'person', 2: 'car', 8: 'boat'})
+    image = np.zeros((256, 256, 3), dtype=np.uint8)
+
+    def per_box_loop(results, conf_threshold):
+        categories = []
+        for result in results:
+            objects = [(result.names[int(box.cls)], float(box.conf), tuple(box.xyxyn[0].tolist()))
+                       for box in result.boxes if float(box.conf) > conf_threshold]
+            best = next((o for o in objects if o[0] in CRITICAL_CLASSES), None) \
+                or next((o for o in objects if o[0] in IMPORTANT_CLASSES), None)
+            categories.append(best)
+        return categories
+
+    for n_boxes in box_counts:
+        rng = np.random.default_rng(n_boxes)
+        results = []
+        for _ in range(batch_size):
+            xy = rng.random((n_boxes, 2)) * 200
+            data = np.column_stack([xy, xy + 20, rng.random(n_boxes), rng.integers(0, 80, n_boxes)])
+            results.append(Results(image, path="", names=names, boxes=torch.tensor(data, dtype=torch.float32)))
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            per_box_loop(results, 0.5)
+        loop_ms = (time.perf_counter() - start) * 1000 / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            _extract_batch(results, 0.5)
+        vector_ms = (time.perf_counter() - start) * 1000 / repeats
+        print(f"   - {n_boxes:3d} boxes/frame: loop {loop_ms:7.2f} ms | vectorized {vector_ms:6.2f} ms "
+              f"({loop_ms / vector_ms:.1f}x)")
+
+
+def read_video_frames(video_path, max_frames=300):
+    """First max_frames frames of a real video"""
+    frames = []
+    cap = cv2.VideoCapture(video_path)
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def benchmark_keyframe_tracker(video_path=None):
+    """Keyframe + tracker labels vs YOLO on every frame: agreement and inference cost"""
+    print("🎞️ Keyframe + tracker vs every-frame YOLO...")
+    if get_model() is None:
+        print("   ⚠️ YOLO weights not available - skipping")
+        return
+
+    frames = read_video_frames(video_path) if video_path else make_hover_pan_sequence(make_world(), passes=1)
+
+    start = time.perf_counter()
+    baseline = classify_frames([FrameFeatures(f) for f in frames], detector=DuplicateDetector(0.97))
+    baseline_s = time.perf_counter() - start
+
+    tracker = KeyframeTracker()
+    start = time.perf_counter()
+    tracked = classify_frames([FrameFeatures(f) for f in frames], detector=DuplicateDetector(0.97), tracker=tracker)
+    tracked_s = time.perf_counter() - start
+
+    labelled = [(a[0], b[0]) for a, b in zip(baseline, tracked) if a[0] != "Discard"]
+    agreement = sum(1 for a, b in labelled if a == b) / max(len(labelled), 1)
+    stats = tracker.stats()
+    print(f"   - Frames labelled by YOLO: {len(labelled)} (every-frame) vs {stats['keyframes']} keyframes")
+    print(f"   - Scene cuts: {stats['scene_cuts']} | inference fraction: {stats['inference_fraction']:.1%}")
+    print(f"   - Category agreement: {agreement:.1%}")
+    print(f"   - Time: {baseline_s:.2f}s (every-frame) vs {tracked_s:.2f}s (tracker)")
+
+
+def benchmark_inference_backends(video_path=None):
+    """Throughput and label agreement of each inference backend against PyTorch"""
+    print("⚙️ Inference backends (PyTorch vs ONNX Runtime FP32 / int8)...")
+    if get_model(backend="torch") is None:
+        print("   ⚠️ YOLO weights not available - skipping")
+        return
+
+    frames = read_video_frames(video_path) if video_path else make_hover_pan_sequence(make_world(), passes=1)
+    features = [FrameFeatures(f) for f in frames]
+
+    reference = None
+    for backend in BACKENDS:
+        if get_model(backend=backend) is None:
+            print(f"   - {backend:10s} unavailable")
+            continue
+        start = time.perf_counter()
+        results = classify_frames(features, thresholds={'yolo_confidence': 0.5, 'ssim_threshold': 0.97, 'backend': backend}, detector=DuplicateDetector(0.97))
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference = results
+        labelled = [(a, b) for a, b in zip(reference, results) if a[0] != "Discard"]
+        same_category = sum(1 for a, b in labelled if a[0] == b[0]) / max(len(labelled), 1)
+        same_detection = sum(1 for a, b in labelled if a[2] == b[2]) / max(len(labelled), 1)
+        print(f"   - {backend:10s} {len(frames) / elapsed:6.1f} fps | category agreement {same_category:.1%} "
+              f"| detection agreement {same_detection:.1%}")
+
+
+def benchmark_resolution_cascade(video_path=None):
+    """Fixed 256 px inference vs the RESOLUTION_LEVELS cascade: Critical recall (vs 640 px) and cost"""
+    print("🔍 Resolution cascade vs fixed input size...")
+    if get_model() is None:
+        print("   ⚠️ YOLO weights not available - skipping")
+        return
+
+    frames = read_video_frames(video_path) if video_path else make_hover_pan_sequence(make_world(), passes=1)
+    features = [FrameFeatures(f) for f in frames]
+
+    def run(cascade):
+        start = time.perf_counter()
+        results = classify_frames(features, detector=DuplicateDetector(0.97), cascade=cascade)
+        return results, time.perf_counter() - start
+
+    reference, _ = run(ResolutionCascade(levels=(640,)))
+    fixed, fixed_s = run(None)
+    cascade = ResolutionCascade()
+    adaptive, adaptive_s = run(cascade)
+
+    critical = [i for i, r in enumerate(reference) if r[0] == "Critical"]
+    def recall(results):
+        return sum(1 for i in critical if results[i][0] == "Critical") / max(len(critical), 1)
+
+    stats = cascade.stats()
+    print(f"   - Critical frames at 640 px: {len(critical)}")
+    print(f"   - Critical recall: {recall(fixed):.1%} (fixed 256) vs {recall(adaptive):.1%} (cascade)")
+    print(f"   - Frames per level: {dict(zip(stats['levels'], stats['inferred']))} "
+          f"| relative cost {stats['relative_cost']:.2f}x")
+    print(f"   - Time: {fixed_s:.2f}s (fixed 256) vs {adaptive_s:.2f}s (cascade)")
+
+
+def benchmark_thread_budget(video_path=None, job_counts=(1, 2, 4)):
+    """Aggregate throughput of concurrent jobs on one shared engine, per torch / OpenCV thread split"""
+    print("🧵 Thread budget (concurrent jobs on one ClassifierEngine)...")
+    cores = os.cpu_count() or 1
+    frames = read_video_frames(video_path) if video_path else make_hover_pan_sequence(make_world(), passes=1)
+    if get_model() is None:
+        print("   ⚠️ YOLO weights not available - timing the heuristic stages only")
+
+    default_cv2_threads = cv2.getNumThreads()
+    splits = sorted({(cores, 1), (cores, cores), (max(1, cores // 2), 1), (1, 1)}, reverse=True)
+    for torch_threads, cv2_threads in splits:
+        engine = ClassifierEngine(torch_threads=torch_threads, cv2_threads=cv2_threads)
+        for n_jobs in job_counts:
+            jobs = [engine.job() for _ in range(n_jobs)]
+            workers = [
+                threading.Thread(target=lambda job=job: [job.classify(frames[b:b + 8])
+                                                         for b in range(0, len(frames), 8)])
+                for job in jobs
+            ]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            print(f"   - torch {torch_threads:2d} / cv2 {cv2_threads:2d} threads, {n_jobs} job(s): "
+                  f"{n_jobs * len(frames) / elapsed:7.1f} fps total")
+    cv2.setNumThreads(default_cv2_threads)
+    ClassifierEngine().apply_thread_budget()  # restore the configured budget
+
+
+def benchmark_process_pool(video_path=None):
+    """Throughput of the shared-memory process pool vs the single background thread"""
+    print("🧮 Process pool vs single thread...")
+    if get_model() is None:
+        print("   ⚠️ YOLO weights not available - skipping")
+        return
+
+    frames = read_video_frames(video_path) if video_path else make_hover_pan_sequence(make_world(), passes=1)
+    engine = ClassifierEngine()
+    job = engine.job()
+    start = time.perf_counter()
+    for b in range(0, len(frames), job.batch_size):
+        job.classify(frames[b:b + job.batch_size])
+    base_fps = len(frames) / (time.perf_counter() - start)
+    print(f"   - thread     : {base_fps:6.1f} fps")
+
+    cores = os.cpu_count() or 1
+    for n_workers in sorted({1, 2, 4, 8, 16, cores}):
+        if n_workers > cores:
+            continue
+        job = engine.job()
+        with ClassificationPool(job, n_workers, frames[0].shape) as pool:
+            pool.start()
+            start = time.perf_counter()
+            for b in range(0, len(frames), job.batch_size):
+                pool.submit(frames[b:b + job.batch_size])
+            pool.drain()
+            fps = len(frames) / (time.perf_counter() - start)
+        print(f"   - {n_workers:2d} workers : {fps:6.1f} fps ({fps / base_fps:.1f}x)")
+
+
+def benchmark_batched_heuristics(n_frames=512, batch_size=16):
+    """Sky / water features one thumbnail at a time vs evaluate_heuristics over a stack"""
+    print("🧱 Batched heuristic evaluator vs per-frame stages...")
+    rng = np.random.default_rng(0)
+    world = make_world()
+    thumbnails = []
+    for i in range(n_frames):
+        x = int(rng.integers(0, world.shape[1] - 640))
+        thumbnails.append(cv2.resize(world[:, x:x + 640], FrameFeatures.THUMB_SIZE))
+
+    def per_frame(features):
+        for f in features:
+            is_empty_sky(f)
+            is_static_water(f)
+            f.white_ratio  # the feature recorder reads every ratio
+
+    def batched(features):
+        for b in range(0, len(features), batch_size):
+            evaluate_heuristics(features[b:b + batch_size])
+
+    for name, run in (("per-frame", per_frame), ("batched", batched)):
+        best = None
+        for _ in range(5):
+            features = [FrameFeatures(t) for t in thumbnails]
+            start = time.perf_counter()
+            run(features)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"   - {name:9s}: {best / n_frames * 1e6:6.1f} us/frame")
+
+
+def write_pan_video(path, n_frames=300, fps=30, scale=1):
+    """Encode a synthetic 1080p pan (scale=2: 4K) over the world for the decoder benchmarks (one frame in memory at a time)"""
+    world = make_world()
+    if scale != 1:
+        world = cv2.resize(world, None, fx=scale, fy=scale)
+    height, width = world.shape[0], 1920 * scale
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for i in range(n_frames):
+        x = (i * 20) % (world.shape[1] - width)
+        writer.write(np.ascontiguousarray(world[:, x:x + width]))
+    writer.release()
+    return path
+
+
+def benchmark_frame_sampling(video_path=None, skip_frames=10):
+    """Decode fps of read()-everything vs grab()-sampling vs keyframe-only decoding"""
+    print("📼 Frame sampling: read() every frame vs grab() vs keyframes only...")
+    if video_path is None:
+        video_path = write_pan_video(os.path.join(tempfile.mkdtemp(prefix="aura_bench_"), "pan.mp4"))
+    cap = cv2.VideoCapture(video_path)
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+
+    # Baseline: the old loop - read() every frame, keep every skip_frames-th
+    start = time.perf_counter()
+    seen = 0
+    while cap.read()[0]:
+        seen += 1
+    cap.release()
+    print(f"   - read() all     : {seen / (time.perf_counter() - start):7.1f} video fps | {seen // skip_frames} kept")
+
+    sources = [CaptureSampler(video_path, skip_frames)]
+    if ffmpeg_available():
+        sources.append(KeyframeSampler(video_path, width, height, fps))
+    else:
+        print("   ⚠️ ffmpeg not found - skipping keyframe-only decoding")
+    for source in sources:
+        kept = sum(1 for _ in source)
+        stats = source.stats()
+        print(f"   - {stats['mode']:15s}: {stats['decode_fps']:7.1f} video fps | {kept} kept")
+
+
+def benchmark_frame_decoders(video_path=None, skip_frames=10):
+    """VideoCapture + cv2.resize vs the ffmpeg pipe scaling inside the decoder, 1080p and 4K"""
+    print("📼 Frame decoders: VideoCapture + resize vs ffmpeg pipe (in-decoder scaling)...")
+    if not ffmpeg_available():
+        print("   ⚠️ ffmpeg not found - skipping")
+        return
+    if video_path is not None:
+        videos = [video_path]
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="aura_bench_")
+        videos = [write_pan_video(os.path.join(tmpdir, "pan_1080p.mp4"), n_frames=150),
+                  write_pan_video(os.path.join(tmpdir, "pan_4k.mp4"), n_frames=60, scale=2)]
+
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        analysis_size = (ANALYSIS_WIDTH, int(height * ANALYSIS_WIDTH / width))
+        print(f"   {width}x{height}, stride {skip_frames}:")
+
+        # Baseline: decode to full-size BGR, downscale in Python for analysis
+        start = time.perf_counter()
+        kept = 0
+        for _, frame, _ in CaptureSampler(path, skip_frames):
+            cv2.resize(frame, analysis_size, interpolation=cv2.INTER_AREA)
+            kept += 1
+        elapsed = time.perf_counter() - start
+        print(f"   - VideoCapture + resize  : {1000 * elapsed / max(kept, 1):6.1f} ms/kept frame")
+
+        for label, full_frames in (("ffmpeg analysis only", False), ("ffmpeg analysis + full", True)):
+            source = FFmpegPipeSource(path, width, height, fps, skip_frames, full_frames=full_frames)
+            start = time.perf_counter()
+            kept = sum(1 for _ in source)
+            elapsed = time.perf_counter() - start
+            print(f"   - {label:23s}: {1000 * elapsed / max(kept, 1):6.1f} ms/kept frame")
+
+
+def benchmark_output_sinks(video_path=None):
+    """Kept frames -> MP4: PNG files + create_video_from_frame_files vs one streaming encoder"""
+    print("🎬 Output: PNG round-trip vs streaming encoder (every frame kept)...")
+    if not ffmpeg_available():
+        print("   ⚠️ ffmpeg not found - skipping")
+        return
+    tmpdir = tempfile.mkdtemp(prefix="aura_bench_")
+    if video_path is None:
+        video_path = write_pan_video(os.path.join(tmpdir, "pan.mp4"), n_frames=150)
+    cap = cv2.VideoCapture(video_path)
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    # Decoding alone, so both paths can be reported net of it
+    start = time.perf_counter()
+    for _ in CaptureSampler(video_path):
+        pass
+    decode_time = time.perf_counter() - start
+
+    # Old path: every kept frame as a lossless PNG, then ffmpeg rereads them all
+    frames_dir = os.path.join(tmpdir, "frames")
+    os.makedirs(frames_dir)
+    temp_bytes = 0
+    start = time.perf_counter()
+    for i, (_, frame, _) in enumerate(CaptureSampler(video_path)):
+        frame_path = os.path.join(frames_dir, f"frame_{i:06d}.png")
+        cv2.imwrite(frame_path, frame)
+        temp_bytes += os.path.getsize(frame_path)
+    _, _, written = create_video_from_frame_files(frames_dir, os.path.join(tmpdir, "png.mp4"), fps, width, height)
+    elapsed = time.perf_counter() - start - decode_time
+    print(f"   - PNG + ffmpeg     : {elapsed:6.2f}s | {temp_bytes / 1e6:8.1f} MB temporary | {written} frames")
+
+    # New path: frames piped into one encoder as they arrive (in its own directory, so
+    # anything it leaves next to the output counts as temporary)
+    stream_dir = os.path.join(tmpdir, "stream")
+    os.makedirs(stream_dir)
+    sink = StreamingVideoSink(os.path.join(stream_dir, "stream.mp4"), fps, width, height)
+    start = time.perf_counter()
+    sink.open()
+    for _, frame, _ in CaptureSampler(video_path):
+        sink.write(frame)
+    _, _, written = sink.close()
+    elapsed = time.perf_counter() - start - decode_time
+    stats = sink.stats()
+    temp_bytes = sum(os.path.getsize(os.path.join(stream_dir, name)) for name in os.listdir(stream_dir))
+    temp_bytes -= stats['output_bytes']
+    print(f"   - streaming encoder: {elapsed:6.2f}s | {temp_bytes / 1e6:8.1f} MB temporary | "
+          f"{written} frames ({stats['bytes_streamed'] / 1e6:.0f} MB piped)")
+
+
+if __name__ == "__main__":
+    print("⏱️ AURA Module 1 Benchmarks")
+    benchmark_ssim_kernel()
+    benchmark_near_duplicate_index()
+    benchmark_sky_roi()
+    benchmark_reclassify()
+    benchmark_post_processing()
+    benchmark_batched_heuristics()
+    benchmark_frame_sampling(sys.argv[1] if len(sys.argv) > 1 else None)
+    benchmark_frame_decoders(sys.argv[1] if len(sys.argv) > 1 else None)
+    benchmark_output_sinks(sys.argv[1] if len(sys.argv) > 1 else None)
+    benchmark_keyframe_tracker(sys.argv[1] if len(sys.argv) > 1 else None)
+    benchmark_inference_backends(sys.argv[1] if len(sys.argv) > 1 else None)
+    benchmark_resolution_cascade(sys.argv[1] if len(sys.argv) > 1 else None)
+    benchmark_thread_budget(sys.argv[1] if len(sys.argv) > 1 else None)
+    benchmark_process_pool(sys.argv[1] if len(sys.argv) > 1 else None)
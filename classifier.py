@@ -4,87 +4,461 @@ YOLOv8 + Relaxed Heuristics for frame classification
 ISSUE: Was too aggressive - fixed thresholds
 """
 
-from ultralytics import YOLO
+import threading
 import cv2
 import numpy as np
-from skimage.metrics import structural_similarity as ssim
 import time
-from config import CRITICAL_CLASSES, IMPORTANT_CLASSES, SSIM_THRESHOLD, BLUE_RATIO_THRESHOLD, EDGE_RATIO_THRESHOLD
+from hash_index import BKTree, dhash
+from frame_metrics import ssim_batch, thumbnail_batch
+from stage_timing import stage, record as record_stage
+from config import (
+    CRITICAL_CLASSES, IMPORTANT_CLASSES, SSIM_THRESHOLD, BLUE_RATIO_THRESHOLD, EDGE_RATIO_THRESHOLD,
+    YOLO_BATCH_SIZE, YOLO_WEIGHTS, YOLO_BACKEND, YOLO_IMGSZ, DUPLICATE_CHECK_STRIDE,
+    MOTION_THRESHOLD, MOTION_MAX_REUSE, RESOLUTION_LEVELS, ESCALATION_MARGIN, ESCALATION_MIN_BOX_AREA,
+    SKY_ROI_CROP, ROI_PADDING, ROI_MIN_SIZE, ROI_MAX_AREA, FEATURE_STORE_MIN_CONF, NEAR_DUP_MIN_VARIANCE,
+    NEAR_DUP_MIN_BITS, NEAR_DUP_MIN_SSIM, NEAR_DUP_MAX_COLOR_DIFF
+)
 
-# Load YOLOv8
-try:
-    model = YOLO('yolov8n.pt')
-except Exception as e:
-    print(f"Warning: Could not load YOLO model: {e}")
-    model = None
+# YOLOv8 model registry - models are loaded lazily on first use so that pages
+# which never classify (Module 2-4 via global_status) never import ultralytics
+_model_registry = {}
+_warmed_up = set()
+_model_lock = threading.Lock()
+# One lock per loaded model: an ultralytics predictor is not thread-safe, so
+# concurrent jobs sharing a model take turns on the forward pass
+_inference_locks = {}
+
+
+def get_model(weights=YOLO_WEIGHTS, backend=YOLO_BACKEND):
+    """
+    Return the shared YOLO model for (`weights`, `backend`), loading it on first call
+    Thread-safe: concurrent callers block until the single load finishes.
+    ONNX backends export / quantize once and cache the artifact (inference_backends).
+    Returns None if ultralytics or the weights are unavailable.
+    """
+    key = (weights, backend)
+    if key in _model_registry:
+        return _model_registry[key]
+    
+    with _model_lock:
+        if key not in _model_registry:
+            _inference_locks[key] = threading.Lock()
+            try:
+                from inference_backends import load_model
+                _model_registry[key] = load_model(backend, weights)
+            except Exception as e:
+                print(f"Warning: Could not load YOLO model: {e}")
+                _model_registry[key] = None
+    
+    return _model_registry[key]
+
+
+def preload(weights=YOLO_WEIGHTS, backend=YOLO_BACKEND):
+    """Load the model ahead of time (e.g. at job start). Returns True if available"""
+    return get_model(weights, backend) is not None
+
+
+def warmup(n_iters=2, imgsz=YOLO_IMGSZ, weights=YOLO_WEIGHTS, backend=YOLO_BACKEND):
+    """
+    Run a few dummy inferences so the first real frame doesn't pay the
+    cold-start / JIT / allocator cost. Only runs once per (weights, backend, imgsz).
+    """
+    model = get_model(weights, backend)
+    if model is None:
+        return False
+    
+    key = (weights, backend, imgsz)
+    if key in _warmed_up:
+        return True
+    
+    with _model_lock:
+        if key not in _warmed_up:
+            dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+            try:
+                with _inference_locks[(weights, backend)]:
+                    for _ in range(max(1, int(n_iters))):
+                        model(dummy, verbose=False, imgsz=imgsz)
+                _warmed_up.add(key)
+            except Exception as e:
+                print(f"Warning: YOLO warmup failed: {e}")
+                return False
+    
+    return True
+
+
+# Category priority per class name (2 = Critical, 1 = Important, 0 = Normal),
+# expanded into per-model class-id lookup arrays by _class_tables
+CLASS_PRIORITY = {**{name: 1 for name in IMPORTANT_CLASSES}, **{name: 2 for name in CRITICAL_CLASSES}}
+_class_tables_cache = {}
+
+# HSV ranges shared by the sky and water stages
+LOWER_BLUE = np.array([85, 20, 50])      # was [90, 30, 50]
+UPPER_BLUE = np.array([135, 255, 255])   # was [130, 255, 255]
+LOWER_WHITE = np.array([0, 0, 200])      # was [0, 0, 180]
+UPPER_WHITE = np.array([180, 20, 255])   # was [180, 30, 255]
+LOWER_WATER = np.array([80, 20, 20])
+UPPER_WATER = np.array([110, 200, 180])
+
+# Discard criteria for the sky and water stages (also used by feature_store.reclassify)
+SKY_BLUE_RATIO = 0.80      # was 0.6
+SKY_WHITE_RATIO = 0.85     # was 0.70
+SKY_MAX_EDGE_RATIO = 0.01  # was 0.02
+WATER_RATIO = 0.85
+WATER_MAX_VARIANCE = 300
+
+
+class FrameFeatures:
+    """
+    Single-pass feature extractor shared by every cascade stage
+    The full-resolution frame is downscaled ONCE to a 24x24 thumbnail; HSV, gray,
+    Canny edges and the derived ratios are computed on first use and cached, so
+    a frame is never resized or colour-converted twice.
+    """
+    
+    THUMB_SIZE = (24, 24)  # Even smaller for speed
+    
+    def __init__(self, frame):
+        self.frame = frame
+        with stage("resize"):
+            self.small = cv2.resize(frame, self.THUMB_SIZE)
+        self._hsv = None
+        self._gray = None
+        self._edges = None
+        self._masks = {}
+        self._ratios = {}
+        self._variance = None
+        self._mean_color = None
+        self._dhash = None
+        self._sky_roi = False  # None is a valid result (use the full frame)
+    
+    @property
+    def hsv(self):
+        if self._hsv is None:
+            self._hsv = cv2.cvtColor(self.small, cv2.COLOR_BGR2HSV)
+        return self._hsv
+    
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY)
+        return self._gray
+    
+    @property
+    def edges(self):
+        if self._edges is None:
+            self._edges = cv2.Canny(self.gray, 50, 150)
+        return self._edges
+    
+    def _hsv_mask(self, name, lower, upper):
+        if name not in self._masks:
+            self._masks[name] = cv2.inRange(self.hsv, lower, upper)
+        return self._masks[name]
+    
+    def _hsv_ratio(self, name, lower, upper):
+        if name not in self._ratios:
+            mask = self._hsv_mask(name, lower, upper)
+            self._ratios[name] = np.count_nonzero(mask) / mask.size
+        return self._ratios[name]
+    
+    @property
+    def sky_mask(self):
+        """Sky thumbnail cells: blue or white (the is_empty_sky masks) and connected to the top edge"""
+        return top_connected_sky(
+            self._hsv_mask('blue', LOWER_BLUE, UPPER_BLUE), self._hsv_mask('white', LOWER_WHITE, UPPER_WHITE)
+        )
+    
+    @property
+    def sky_roi(self):
+        """Normalized (x1, y1, x2, y2) crop of the non-sky region, or None for the full frame"""
+        if self._sky_roi is False:
+            self._sky_roi = non_sky_roi(self.sky_mask)
+        return self._sky_roi
+    
+    @property
+    def blue_ratio(self):
+        return self._hsv_ratio('blue', LOWER_BLUE, UPPER_BLUE)
+    
+    @property
+    def white_ratio(self):
+        return self._hsv_ratio('white', LOWER_WHITE, UPPER_WHITE)
+    
+    @property
+    def water_ratio(self):
+        return self._hsv_ratio('water', LOWER_WATER, UPPER_WATER)
+    
+    @property
+    def edge_ratio(self):
+        if 'edge' not in self._ratios:
+            self._ratios['edge'] = np.count_nonzero(self.edges) / self.edges.size
+        return self._ratios['edge']
+    
+    @property
+    def variance(self):
+        if self._variance is None:
+            self._variance = np.var(self.gray)
+        return self._variance
+    
+    @property
+    def mean_color(self):
+        """Mean BGR of the thumbnail"""
+        if self._mean_color is None:
+            self._mean_color = self.small.reshape(-1, 3).mean(axis=0)
+        return self._mean_color
+    
+    @property
+    def dhash(self):
+        """64-bit perceptual hash of the gray thumbnail"""
+        if self._dhash is None:
+            self._dhash = dhash(self.gray)
+        return self._dhash
+
+
+def _grow_span(lo, hi, min_size):
+    """Widen [lo, hi] around its centre to at least min_size, kept inside 0-1"""
+    if hi - lo >= min_size:
+        return lo, hi
+    lo = min(max(0.0, (lo + hi - min_size) / 2), 1.0 - min_size)
+    return lo, lo + min_size
+
+
+def _touching_top(mask):
+    """Cells of the 4-connected components of `mask` that reach the top row"""
+    _, labels = cv2.connectedComponents(mask, connectivity=4)
+    top = np.unique(labels[0][mask[0] > 0])
+    return np.isin(labels, top) & (mask > 0)
+
+
+def top_connected_sky(blue_mask, white_mask):
+    """
+    Sky mask (255 = sky) from the blue and white thumbnail masks
+    Only blue/white regions connected to the top edge are sky - blue sea below a
+    shoreline is kept - and a white blob that does not reach the top edge on its
+    own (a boat, a van, a shirt) is never sky, even when it sits in open water.
+    """
+    sky = _touching_top(cv2.bitwise_or(blue_mask, white_mask))
+    white = white_mask > 0
+    sky &= ~white | _touching_top(white_mask)
+    return sky.astype(np.uint8) * 255
+
+
+def non_sky_roi(sky_mask, padding=ROI_PADDING, min_size=ROI_MIN_SIZE, max_area=ROI_MAX_AREA):
+    """
+    Bounding box of every non-sky cell of a thumbnail sky mask, normalized to 0-1
+    Any single non-sky cell is kept (a boat on a lake, a person on a roof), the box
+    is padded by `padding` cells and grown to `min_size` of each dimension.
+    Returns None when the crop would not save enough (or there is no non-sky cell).
+    """
+    ground = sky_mask == 0
+    rows = np.flatnonzero(ground.any(axis=1))
+    cols = np.flatnonzero(ground.any(axis=0))
+    if rows.size == 0:
+        return None
+    
+    h, w = sky_mask.shape
+    y1, y2 = _grow_span(max(0, rows[0] - padding) / h, min(h, rows[-1] + 1 + padding) / h, min_size)
+    x1, x2 = _grow_span(max(0, cols[0] - padding) / w, min(w, cols[-1] + 1 + padding) / w, min_size)
+    if (x2 - x1) * (y2 - y1) > max_area:
+        return None
+    return float(x1), float(y1), float(x2), float(y2)
+
+
+def hash_is_informative(hash_value, variance):
+    """
+    False for frames whose dHash says nothing about their content
+    Flat or low-texture thumbnails hash to (nearly) all-zero or all-one bits
+    whatever their colour or the small objects on them.
+    """
+    bits = bin(int(hash_value)).count("1")
+    return variance >= NEAR_DUP_MIN_VARIANCE and NEAR_DUP_MIN_BITS <= bits <= 64 - NEAR_DUP_MIN_BITS
+
+
+def confirm_near_duplicate(gray, mean_color, match_gray, match_mean_color):
+    """Thumbnail check behind a dHash match: same structure (SSIM) and same mean colour"""
+    if np.abs(np.asarray(mean_color, dtype=np.float64) - match_mean_color).max() > NEAR_DUP_MAX_COLOR_DIFF:
+        return False
+    return np.array_equal(gray, match_gray) or float(ssim_batch(gray, match_gray)[0]) >= NEAR_DUP_MIN_SSIM
+
+
+def _as_features(frame):
+    """Accept either a raw BGR frame or an existing FrameFeatures"""
+    if frame is None or isinstance(frame, FrameFeatures):
+        return frame
+    return FrameFeatures(frame)
+
+
+def _thumbnail_similarity(gray1, gray2):
+    """SSIM between two 24x24 gray thumbnails (NumPy kernel, skimage parity)"""
+    return float(ssim_batch(gray1, gray2)[0])
 
-# Global cache for performance optimization
-_frame_cache = {}
-_cache_counter = 0
 
 def is_duplicate(frame1, frame2, threshold=0.97, frame_counter=None):  # RELAXED: was 0.93, now 0.97
     """
     Detect ONLY truly duplicate frames using SSIM
     More conservative to avoid discarding good frames
     OPTIMIZED: Skip expensive checks for performance
+    Frames may be raw BGR arrays or FrameFeatures (cached thumbnails are reused).
+    If `frame_counter` is given, only every DUPLICATE_CHECK_STRIDE-th frame is
+    checked; streams should prefer a DuplicateDetector, which owns its counter.
     """
-    global _cache_counter
-    
     if frame1 is None or frame2 is None:
         return False, 0.0
     
     # PERFORMANCE OPTIMIZATION: Skip duplicate detection every few frames
-    _cache_counter += 1
-    if _cache_counter % 5 != 0:  # Only check every 5th frame for duplicates (more aggressive)
+    if frame_counter is not None and frame_counter % DUPLICATE_CHECK_STRIDE != 0:
         return False, 0.0
     
     try:
-        # Even smaller resize for faster processing
-        gray1 = cv2.cvtColor(cv2.resize(frame1, (24, 24)), cv2.COLOR_BGR2GRAY)
-        gray2 = cv2.cvtColor(cv2.resize(frame2, (24, 24)), cv2.COLOR_BGR2GRAY)
-        
-        similarity, _ = ssim(gray1, gray2, full=True)
+        # Compare the shared 24x24 gray thumbnails
+        similarity = _thumbnail_similarity(_as_features(frame1).gray, _as_features(frame2).gray)
         
         # Skip expensive optical flow for performance - use simple similarity
         is_dup = similarity > threshold
         
-        return is_dup, float(similarity)
+        return is_dup, similarity
     
     except Exception as e:
         return False, 0.0
 
 
+class DuplicateDetector:
+    """
+    Per-stream duplicate detector - each video job owns one
+    Keeps only the previous 24x24 gray thumbnail (a few hundred bytes) instead
+    of a full-resolution frame copy, its own check stride and running SSIM
+    stats, so concurrent jobs never share a sampling pattern.
+    With hash_distance set, it also keeps a BK-tree of the dHash of every kept
+    frame and flags near-duplicates of ANY earlier kept frame (hover / pan-back).
+    Each indexed frame keeps its gray thumbnail and mean colour, so a hash match
+    is confirmed against the actual thumbnail before the frame is discarded.
+    """
+    
+    def __init__(self, threshold=0.97, check_stride=DUPLICATE_CHECK_STRIDE, hash_distance=None):
+        self.threshold = threshold
+        self.check_stride = max(1, int(check_stride))
+        self.hash_distance = hash_distance
+        self.reset()
+    
+    def reset(self):
+        """Forget the previous frame and clear the stats"""
+        self.prev_thumb = None
+        self.calls = 0
+        self.checks = 0
+        self.duplicates = 0
+        self.similarity_sum = 0.0
+        self.min_similarity = None
+        self.max_similarity = None
+        self.hash_index = BKTree() if self.hash_distance is not None else None
+        self.near_duplicates = 0
+    
+    def check(self, frame):
+        """
+        Compare `frame` (raw or FrameFeatures) with the previous frame of this
+        stream and remember its thumbnail. Returns (is_duplicate, similarity).
+        """
+        return self.check_batch([frame])[0]
+    
+    def check_batch(self, frames):
+        """
+        Vectorized check() for consecutive frames of this stream
+        All strided comparisons in the batch go through ssim_batch in ONE call;
+        results and stats are identical to calling check() frame by frame.
+        """
+        thumbs = [_as_features(frame).gray for frame in frames]
+        results = [(False, 0.0)] * len(thumbs)
+        
+        pairs = []  # (index, previous thumbnail)
+        prev_thumb = self.prev_thumb
+        for i, thumb in enumerate(thumbs):
+            if prev_thumb is not None:
+                self.calls += 1
+                if self.calls % self.check_stride == 0:
+                    pairs.append((i, prev_thumb))
+            prev_thumb = thumb
+        if thumbs:
+            self.prev_thumb = thumbs[-1]
+        
+        if not pairs:
+            return results
+        
+        try:
+            with stage("ssim", len(pairs)):
+                similarities = ssim_batch(
+                    np.stack([thumbs[i] for i, _ in pairs]), np.stack([prev for _, prev in pairs])
+                )
+        except Exception as e:
+            return results
+        
+        for (i, _), similarity in zip(pairs, similarities):
+            similarity = float(similarity)
+            self.checks += 1
+            self.similarity_sum += similarity
+            self.min_similarity = similarity if self.min_similarity is None else min(self.min_similarity, similarity)
+            self.max_similarity = similarity if self.max_similarity is None else max(self.max_similarity, similarity)
+            is_dup = similarity > self.threshold
+            if is_dup:
+                self.duplicates += 1
+            results[i] = (is_dup, similarity)
+        
+        return results
+    
+    def find_near_duplicate(self, frame):
+        """
+        Look up `frame` in the index of earlier kept frames
+        Low-information hashes are never looked up; a match must pass confirm_near_duplicate
+        Returns (is_near_duplicate, hamming_distance)
+        """
+        if self.hash_index is None:
+            return False, 0
+        
+        features = _as_features(frame)
+        if not hash_is_informative(features.dhash, features.variance):
+            return False, 0
+        match = self.hash_index.nearest(features.dhash, self.hash_distance)
+        if match is None or not confirm_near_duplicate(features.gray, features.mean_color, *match[1]):
+            return False, 0
+        
+        self.near_duplicates += 1
+        return True, match[0]
+    
+    def remember(self, frame):
+        """Add a kept frame's hash (with its thumbnail for confirmation) to the index"""
+        if self.hash_index is not None:
+            features = _as_features(frame)
+            if hash_is_informative(features.dhash, features.variance):
+                self.hash_index.add(features.dhash, (features.gray, features.mean_color))
+    
+    def stats(self):
+        """Running duplicate-check statistics for job results"""
+        return {
+            'frames_seen': self.calls + (1 if self.prev_thumb is not None else 0),
+            'checks': self.checks,
+            'check_stride': self.check_stride,
+            'duplicates': self.duplicates,
+            'mean_similarity': self.similarity_sum / self.checks if self.checks else 0.0,
+            'min_similarity': self.min_similarity or 0.0,
+            'max_similarity': self.max_similarity or 0.0,
+            # Extra writes removed beyond the consecutive-only SSIM check
+            'near_duplicates': self.near_duplicates,
+            'indexed_frames': len(self.hash_index) if self.hash_index is not None else 0
+        }
+
+
 def is_empty_sky(frame):
     """
     Detect empty sky - but be VERY conservative
     Only discard if CLEARLY empty
-    OPTIMIZED: Smaller resize for speed
+    OPTIMIZED: Reads cached ratios from FrameFeatures
     """
     try:
-        small = cv2.resize(frame, (24, 24))  # Even smaller for speed
-        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
-        
-        # Blue sky detection (relaxed thresholds)
-        lower_blue = np.array([85, 20, 50])      # was [90, 30, 50]
-        upper_blue = np.array([135, 255, 255])   # was [130, 255, 255]
-        blue_mask = cv2.inRange(hsv, lower_blue, upper_blue)
-        blue_ratio = np.sum(blue_mask > 0) / blue_mask.size
-        
-        # White/gray sky detection (overcast)
-        lower_white = np.array([0, 0, 200])      # was [0, 0, 180]
-        upper_white = np.array([180, 20, 255])   # was [180, 30, 255]
-        white_mask = cv2.inRange(hsv, lower_white, upper_white)
-        white_ratio = np.sum(white_mask > 0) / white_mask.size
-        
-        # Edge detection
-        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        edge_ratio = np.sum(edges > 0) / edges.size
+        features = _as_features(frame)
+        blue_ratio = features.blue_ratio
+        white_ratio = features.white_ratio
+        edge_ratio = features.edge_ratio
         
         # MORE STRICT SKY CRITERIA:
         # Must be VERY blue (>80%) AND very few edges (<1%)
-        is_blue_sky = (blue_ratio > 0.80 and edge_ratio < 0.01)      # was 0.6 and 0.02
-        is_overcast_sky = (white_ratio > 0.85 and edge_ratio < 0.01) # was 0.70 and 0.02
+        is_blue_sky = (blue_ratio > SKY_BLUE_RATIO and edge_ratio < SKY_MAX_EDGE_RATIO)
+        is_overcast_sky = (white_ratio > SKY_WHITE_RATIO and edge_ratio < SKY_MAX_EDGE_RATIO)
         
         return (is_blue_sky or is_overcast_sky), blue_ratio, edge_ratio
     
@@ -95,117 +469,694 @@ def is_empty_sky(frame):
 def is_static_water(frame):
     """
     Detect static water surfaces - VERY conservative
-    OPTIMIZED: Smaller resize for speed
+    OPTIMIZED: Reads cached ratios from FrameFeatures
     """
     try:
-        small = cv2.resize(frame, (24, 24))  # Even smaller for speed
-        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
-        
-        # Water color ranges (blue-green spectrum)
-        lower_water = np.array([80, 20, 20])
-        upper_water = np.array([110, 200, 180])
-        water_mask = cv2.inRange(hsv, lower_water, upper_water)
-        water_ratio = np.sum(water_mask > 0) / water_mask.size
-        
-        # Calculate texture variance
-        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
-        variance = np.var(gray)
+        features = _as_features(frame)
+        water_ratio = features.water_ratio
         
         # Only discard if VERY uniform water (>80% ratio AND very low variance)
-        return water_ratio > 0.85 and variance < 300, water_ratio
+        return water_ratio > WATER_RATIO and features.variance < WATER_MAX_VARIANCE, water_ratio
     
     except Exception as e:
         return False, 0.0
 
 
-def classify_frame(frame, last_frame=None, thresholds=None):
+_HSV_RANGES = {'blue': (LOWER_BLUE, UPPER_BLUE), 'white': (LOWER_WHITE, UPPER_WHITE), 'water': (LOWER_WATER, UPPER_WATER)}
+
+
+def evaluate_heuristics(features_list):
     """
-    Main classification function - CONFIGURABLE VERSION
-    Uses dynamic thresholds from sidebar
+    Batched sky / water stages for a list of FrameFeatures (same decisions as is_empty_sky / is_static_water)
+    All thumbnails are stacked and measured in a few vectorized calls; each
+    FrameFeatures cache is seeded with its values, so later stages and the
+    feature recorder read them for free.
+    Returns one (is_sky, blue_ratio, edge_ratio, is_water, water_ratio) tuple per frame
     """
-    start_time = time.time()
+    try:
+        hsv, gray, edges, masks, ratios, edge_ratio, variance = thumbnail_batch(
+            np.stack([features.small for features in features_list]), _HSV_RANGES
+        )
+    except Exception as e:
+        print(f"Warning: Batched heuristics failed, using per-frame stages: {e}")
+        return None
     
-    # Use default thresholds if none provided
-    if thresholds is None:
+    edge_ok = edge_ratio < SKY_MAX_EDGE_RATIO
+    sky = ((ratios['blue'] > SKY_BLUE_RATIO) & edge_ok) | ((ratios['white'] > SKY_WHITE_RATIO) & edge_ok)
+    water = ~sky & (ratios['water'] > WATER_RATIO) & (variance < WATER_MAX_VARIANCE)
+    
+    # Plain Python values up front - indexing NumPy scalars per frame costs more than the maths above
+    ratios = {name: ratio.tolist() for name, ratio in ratios.items()}
+    ratios['edge'] = edge_ratio.tolist()
+    sky, water = sky.tolist(), water.tolist()
+    
+    decisions = []
+    for i, features in enumerate(features_list):
+        features._hsv, features._gray, features._edges, features._variance = hsv[i], gray[i], edges[i], variance[i]
+        features._masks.update({name: mask[i] for name, mask in masks.items()})
+        features._ratios.update({name: ratio[i] for name, ratio in ratios.items()})
+        decisions.append((
+            sky[i], ratios['blue'][i], ratios['edge'][i], water[i], ratios['water'][i] if not sky[i] else 0.0
+        ))
+    return decisions
+
+
+class MotionGate:
+    """
+    Per-stream motion gate for the YOLO stage
+    Global motion is the mean absolute difference between consecutive 24x24
+    gray thumbnails (0-1), accumulated since the last inference. While it stays
+    below `threshold`, the last YOLO category and detections are reused; a fresh
+    inference is forced at least every `max_reuse` frames.
+    """
+    
+    def __init__(self, threshold=MOTION_THRESHOLD, max_reuse=MOTION_MAX_REUSE):
+        self.threshold = threshold
+        self.max_reuse = max(0, int(max_reuse))
+        self.reset()
+    
+    def reset(self):
+        """Forget the stream history and clear the stats"""
+        self.prev_thumb = None
+        self.motion = 0.0
+        self.motion_since_inference = 0.0
+        self.reused_in_row = 0
+        self.has_inferred = False
+        self.last_result = None
+        self.hits = 0
+        self.misses = 0
+    
+    def observe(self, frame):
+        """Update the motion score with the next frame of the stream (call for EVERY frame)"""
+        thumb = _as_features(frame).gray
+        if self.prev_thumb is not None:
+            diff = cv2.absdiff(thumb, self.prev_thumb)
+            self.motion = float(np.mean(diff)) / 255.0
+            self.motion_since_inference += self.motion
+        self.prev_thumb = thumb
+        return self.motion
+    
+    def should_infer(self):
+        """
+        Decide whether the current frame needs a fresh YOLO pass
+        False means the caller reuses last_result (counted as a hit)
+        """
+        if (self.has_inferred
+                and self.motion_since_inference < self.threshold
+                and self.reused_in_row < self.max_reuse):
+            self.hits += 1
+            self.reused_in_row += 1
+            return False
+        
+        self.misses += 1
+        self.has_inferred = True
+        self.reused_in_row = 0
+        self.motion_since_inference = 0.0
+        return True
+    
+    def record(self, result):
+        """Remember the (category, confidence, detected, metric) of the latest inference"""
+        self.last_result = tuple(result[:4])
+    
+    def stats(self):
+        """Inference-reuse statistics for job results"""
+        total = self.hits + self.misses
+        return {
+            'inferences': self.misses,
+            'reused': self.hits,
+            'hit_rate': self.hits / total if total else 0.0,
+            'threshold': self.threshold,
+            'max_reuse': self.max_reuse
+        }
+
+
+class ResolutionCascade:
+    """
+    Per-stream adaptive-resolution schedule for the YOLO stage
+    Every frame is inferred at levels[0]; only ambiguous frames move up to the
+    next input size - a detection within `margin` of the confidence threshold,
+    or a kept box smaller than `min_box_area` of the frame (small people seen
+    from altitude). The result at the last level is always final.
+    """
+    
+    def __init__(self, levels=RESOLUTION_LEVELS, margin=ESCALATION_MARGIN, min_box_area=ESCALATION_MIN_BOX_AREA):
+        self.levels = tuple(sorted(int(level) for level in levels))
+        self.margin = margin
+        self.min_box_area = min_box_area
+        self.reset()
+    
+    def reset(self):
+        """Clear the per-level counters"""
+        self.inferred = [0] * len(self.levels)
+    
+    def is_ambiguous(self, detections, conf_threshold):
+        """True if detections (extracted down to conf_threshold - margin) warrant a larger input size"""
+        for _, confidence, (x1, y1, x2, y2) in detections:
+            if abs(confidence - conf_threshold) <= self.margin:
+                return True
+            if confidence > conf_threshold and (x2 - x1) * (y2 - y1) < self.min_box_area:
+                return True
+        return False
+    
+    def record(self, level, n_frames):
+        """Count frames inferred at a level"""
+        self.inferred[level] += n_frames
+    
+    def stats(self):
+        """Per-level escalation statistics for job results"""
+        frames = self.inferred[0]
+        # Inference cost scales roughly with input area; 1.0 = every frame at YOLO_IMGSZ
+        cost = sum(n * size * size for n, size in zip(self.inferred, self.levels))
+        return {
+            'levels': list(self.levels),
+            'inferred': list(self.inferred),
+            'escalated': {size: n for size, n in zip(self.levels[1:], self.inferred[1:])},
+            'escalation_rate': self.inferred[1] / frames if frames and len(self.levels) > 1 else 0.0,
+            'relative_cost': cost / (frames * YOLO_IMGSZ * YOLO_IMGSZ) if frames else 0.0
+        }
+
+
+def _default_thresholds(thresholds):
+    """Fill in the sidebar defaults when no thresholds are provided"""
+    if not thresholds:
         thresholds = {
             'yolo_confidence': 0.5,
             'ssim_threshold': 0.97,
             'sky_threshold': 0.8,
             'edge_threshold': 0.01
         }
-    
-    # Stage 1: Duplicate check (configurable threshold)
-    if last_frame is not None:
+    return thresholds
+
+
+def _run_heuristic_stages(frame, last_frame, thresholds, start_time, detector=None, duplicate=None,
+                          heuristics=None):
+    """
+    Cheap rejection stages (duplicate, sky, water, near-duplicate) - all read the same FrameFeatures
+    `duplicate` is an already computed (is_dup, ssim) result from a batched check
+    `heuristics` is an already computed evaluate_heuristics() entry (batch mode)
+    Returns a finished 5-tuple if the frame is discarded, otherwise None
+    """
+    # Stage 1: Duplicate check (per-stream detector, or against last_frame)
+    if duplicate is not None:
+        is_dup, ssim_val = duplicate
+    elif detector is not None:
+        is_dup, ssim_val = detector.check(frame)
+    elif last_frame is not None:
         is_dup, ssim_val = is_duplicate(frame, last_frame, thresholds['ssim_threshold'])
-        if is_dup:
-            latency = time.time() - start_time
-            return "Discard", 1.0, "duplicate_frame", ssim_val, latency
+    else:
+        is_dup = False
+    if is_dup:
+        latency = time.time() - start_time
+        return "Discard", 1.0, "duplicate_frame", ssim_val, latency
+    
+    # Stages 2-3 read the same HSV thumbnail; timed together as one per-frame sample
+    if heuristics is not None:
+        is_sky, blue_ratio, edge_ratio, is_water, water_ratio = heuristics
+    else:
+        with stage("hsv"):
+            is_sky, blue_ratio, edge_ratio = is_empty_sky(frame)
+            is_water, water_ratio = is_static_water(frame) if not is_sky else (False, 0.0)
     
     # Stage 2: Sky detection (VERY conservative)
-    is_sky, blue_ratio, edge_ratio = is_empty_sky(frame)
     if is_sky:
         latency = time.time() - start_time
         return "Discard", 0.99, "empty_sky", blue_ratio, latency
     
     # Stage 3: Water detection (VERY conservative)
-    is_water, water_ratio = is_static_water(frame)
     if is_water:
         latency = time.time() - start_time
         return "Discard", 0.99, "static_water", water_ratio, latency
     
-    # Stage 4: YOLO object detection (OPTIMIZED)
+    # Stage 3b: Near-duplicate of any earlier kept frame (perceptual hash index)
+    # Runs after sky/water so every hit is a write the SSIM check would have kept;
+    # flat frames are skipped and every hash match is confirmed on the thumbnails
+    if detector is not None:
+        with stage("dhash"):
+            is_near_dup, distance = detector.find_near_duplicate(frame)
+            # Survivors are always kept (YOLO never discards), so index them now
+            if not is_near_dup:
+                detector.remember(frame)
+        if is_near_dup:
+            latency = time.time() - start_time
+            return "Discard", 1.0, "near_duplicate", float(distance), latency
+    
+    return None
+
+
+def _prepare_yolo_frame(frame):
+    """PERFORMANCE: Resize frame to at most 640 wide for faster YOLO processing"""
+    h, w = frame.shape[:2]
+    if w > 640:  # Only resize if frame is large
+        scale = 640 / w
+        new_w, new_h = int(w * scale), int(h * scale)
+        return cv2.resize(frame, (new_w, new_h))
+    return frame
+
+
+def _crop_to_roi(features, use_roi=True):
+    """
+    Frame region to send to YOLO - the non-sky crop, or the full frame
+    Returns (image, roi) with roi the pixel-exact normalized crop, or None
+    """
+    roi = features.sky_roi if use_roi else None
+    if roi is None:
+        return features.frame, None
+    
+    h, w = features.frame.shape[:2]
+    px1, py1 = int(roi[0] * w), int(roi[1] * h)
+    px2, py2 = int(round(roi[2] * w)), int(round(roi[3] * h))
+    crop = np.ascontiguousarray(features.frame[py1:py2, px1:px2])
+    return crop, (px1 / w, py1 / h, px2 / w, py2 / h)
+
+
+def _roi_to_frame(detected_objects, roi):
+    """Map normalized crop boxes back to normalized full-frame coordinates"""
+    if roi is None:
+        return detected_objects
+    rx1, ry1, rx2, ry2 = roi
+    rw, rh = rx2 - rx1, ry2 - ry1
+    return [
+        (name, conf, (rx1 + x1 * rw, ry1 + y1 * rh, rx1 + x2 * rw, ry1 + y2 * rh))
+        for name, conf, (x1, y1, x2, y2) in detected_objects
+    ]
+
+
+def _to_numpy(values):
+    """torch tensor (any device) or array-like -> NumPy array"""
+    if hasattr(values, 'cpu'):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+def _class_tables(names):
+    """
+    Per-model lookup arrays indexed by class id: category priority and class name
+    Built once per model from CLASS_PRIORITY, then cached
+    """
+    key = tuple(names.items()) if isinstance(names, dict) else tuple(enumerate(names))
+    if key not in _class_tables_cache:
+        n_classes = max(class_id for class_id, _ in key) + 1 if key else 0
+        priority = np.zeros(n_classes, dtype=np.int8)
+        labels = np.empty(n_classes, dtype=object)
+        for class_id, name in key:
+            priority[class_id] = CLASS_PRIORITY.get(name, 0)
+            labels[class_id] = name
+        _class_tables_cache[key] = (priority, labels)
+    return _class_tables_cache[key]
+
+
+def _extract_batch(results, conf_threshold):
+    """
+    OPTIMIZED: vectorized detection post-processing for a batch of ultralytics results
+    conf / cls / xyxyn are read once per result; thresholding, the class-id
+    priority lookup and ranking run on the concatenated arrays, so the cost no
+    longer grows with Python work per box in crowded scenes.
+    Returns per-frame [(class_name, confidence, (x1, y1, x2, y2))] with boxes
+    normalized to 0-1, ranked best first (category priority, then confidence).
+    """
+    if not results:
+        return []
+    priority, labels = _class_tables(results[0].names)
+    
+    arrays = [(_to_numpy(r.boxes.conf), _to_numpy(r.boxes.cls), _to_numpy(r.boxes.xyxyn)) for r in results]
+    counts = [len(conf) for conf, _, _ in arrays]
+    if not sum(counts):
+        return [[] for _ in results]
+    
+    # float64 so the threshold compares exactly as float(box.conf) did
+    conf = np.concatenate([a[0] for a in arrays]).astype(np.float64)
+    cls = np.concatenate([a[1] for a in arrays]).astype(np.int64)
+    boxes = np.concatenate([a[2].reshape(-1, 4) for a in arrays])
+    frame_ids = np.repeat(np.arange(len(results)), counts)
+    
+    # Use configurable confidence threshold
+    keep = conf > conf_threshold
+    conf, cls, boxes, frame_ids = conf[keep], cls[keep], boxes[keep], frame_ids[keep]
+    
+    # Rank inside each frame: highest priority first, then highest confidence (stable)
+    order = np.lexsort((-conf, -priority[cls], frame_ids))
+    conf, cls, boxes, frame_ids = conf[order], cls[order], boxes[order], frame_ids[order]
+    
+    detections = list(zip(labels[cls].tolist(), conf.tolist(), map(tuple, boxes.tolist())))
+    bounds = np.searchsorted(frame_ids, np.arange(len(results) + 1)).tolist()
+    return [detections[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def _extract_detections(result, conf_threshold):
+    """
+    Detections above the confidence threshold from one ultralytics result
+    Returns [(class_name, confidence, (x1, y1, x2, y2))] with boxes normalized to 0-1
+    """
+    return _extract_batch([result], conf_threshold)[0]
+
+
+def _categorize_detections(detected_objects, start_time):
+    """Turn (class_name, confidence, ...) detections into the (category, confidence, detected, metric, latency) tuple"""
+    # No objects detected = Still save as Normal (not Discard!)
+    if not detected_objects:
+        latency = time.time() - start_time
+        return "Normal", 0.7, "no_objects_but_saved", 0.0, latency
+    
+    # Best object: highest category priority, then highest confidence (first wins ties).
+    # Lists from _extract_batch are already ranked, so this is their first entry.
+    obj, conf = max(detected_objects, key=lambda d: (CLASS_PRIORITY.get(d[0], 0), d[1]))[:2]
+    priority = CLASS_PRIORITY.get(obj, 0)
+    latency = time.time() - start_time
+    
+    if priority == 2:
+        return "Critical", conf, obj, conf, latency
+    if priority == 1:
+        return "Important", conf, obj, conf, latency
+    # Default to normal for other detected objects
+    return "Normal", conf, obj, 0.0, latency
+
+
+def _categorize_result(result, thresholds, start_time):
+    """Turn one ultralytics result into the (category, confidence, detected, metric, latency) tuple"""
+    detected_objects = _extract_detections(result, thresholds.get('yolo_confidence', 0.5))
+    return _categorize_detections(detected_objects, start_time)
+
+
+def _record_model_speed(results, call_time):
+    """
+    Split a model call into ultralytics' own per-image preprocess / inference /
+    NMS timings (Results.speed, ms); models without them record the whole call
+    """
+    speeds = [getattr(r, 'speed', None) for r in results]
+    if results and all(isinstance(speed, dict) for speed in speeds):
+        for speed in speeds:
+            record_stage("preprocess", (speed.get('preprocess') or 0.0) / 1000)
+            record_stage("inference", (speed.get('inference') or 0.0) / 1000)
+            record_stage("nms", (speed.get('postprocess') or 0.0) / 1000)
+    elif results:
+        record_stage("inference", call_time / len(results), len(results))
+
+
+def _detect(features_list, thresholds, imgsz=YOLO_IMGSZ, margin=0.0, floor=None):
+    """
+    Stage 4 - YOLO object detection (OPTIMIZED), one stacked call for all frames
+    Returns [(status, detections)] per frame, status being "ok", "no_model" or "error"
+    With a margin, detections are kept down to yolo_confidence - margin so the
+    resolution cascade can see near-threshold boxes; `floor` lowers that to a
+    fixed confidence (raw detections for the feature store). Frames are cropped
+    to their non-sky region first; boxes are always in full-frame coordinates.
+    """
     try:
+        model_key = (thresholds.get('weights', YOLO_WEIGHTS), thresholds.get('backend', YOLO_BACKEND))
+        model = get_model(*model_key)
         if model is None:
-            # If YOLO not available, save as Normal
-            latency = time.time() - start_time
-            return "Normal", 0.8, "no_model", 0.0, latency
-        
-        # PERFORMANCE: Resize frame for faster YOLO processing
-        h, w = frame.shape[:2]
-        if w > 640:  # Only resize if frame is large
-            scale = 640 / w
-            new_w, new_h = int(w * scale), int(h * scale)
-            yolo_frame = cv2.resize(frame, (new_w, new_h))
-        else:
-            yolo_frame = frame
-            
-        results = model(yolo_frame, verbose=False, imgsz=256)  # Even smaller model size for speed
+            return [("no_model", [])] * len(features_list)
         
-        detected_objects = []
-        for result in results:
-            for box in result.boxes:
-                class_name = result.names[int(box.cls)]
-                confidence = float(box.conf)
-                
-                # Use configurable confidence threshold
-                if confidence > thresholds.get('yolo_confidence', 0.5):
-                    detected_objects.append((class_name, confidence))
+        # Only the non-sky region goes to YOLO; boxes are mapped back afterwards
+        use_roi = thresholds.get('sky_roi', SKY_ROI_CROP)
+        with stage("yolo_prep", len(features_list)):
+            crops = [_crop_to_roi(features, use_roi) for features in features_list]
+            yolo_frames = [_prepare_yolo_frame(crop) for crop, _ in crops]
+        source = yolo_frames[0] if len(yolo_frames) == 1 else yolo_frames
+        conf_threshold = thresholds.get('yolo_confidence', 0.5) - margin
+        if floor is not None:
+            conf_threshold = min(conf_threshold, floor)
+        with _inference_locks[model_key]:
+            call_start = time.perf_counter()
+            if conf_threshold < thresholds.get('yolo_confidence', 0.5):
+                results = model(source, verbose=False, imgsz=imgsz, conf=max(0.01, conf_threshold))
+            else:
+                results = model(source, verbose=False, imgsz=imgsz)  # Even smaller model size for speed
+            call_time = time.perf_counter() - call_start
+        results = list(results)
+        _record_model_speed(results, call_time)
         
-        # No objects detected = Still save as Normal (not Discard!)
-        if not detected_objects:
-            latency = time.time() - start_time
-            return "Normal", 0.7, "no_objects_but_saved", 0.0, latency
-        
-        # Check for critical objects
-        for obj, conf in detected_objects:
-            if obj in CRITICAL_CLASSES:
-                latency = time.time() - start_time
-                return "Critical", conf, obj, conf, latency
-        
-        # Check for important objects
-        for obj, conf in detected_objects:
-            if obj in IMPORTANT_CLASSES:
-                latency = time.time() - start_time
-                return "Important", conf, obj, conf, latency
-        
-        # Default to normal for other detected objects
-        latency = time.time() - start_time
-        return "Normal", detected_objects[0][1], detected_objects[0][0], 0.0, latency
+        with stage("extract", len(results)):
+            batch_detections = _extract_batch(results, conf_threshold)
+            return [
+                ("ok", _roi_to_frame(detected_objects, roi))
+                for detected_objects, (_, roi) in zip(batch_detections, crops)
+            ]
     
     except Exception as e:
+        return [("error", [])] * len(features_list)
+
+
+def _detect_adaptive(features_list, thresholds, cascade=None, raw_out=None):
+    """
+    Stage 4 with the optional ResolutionCascade - same [(status, detections)] as _detect
+    All frames run at the smallest size; ambiguous ones are re-run together at
+    the next size, so each level is still one stacked call.
+    With a raw_out list, the unfiltered (status, detections) down to
+    FEATURE_STORE_MIN_CONF are appended to it, one entry per frame.
+    """
+    conf_threshold = thresholds.get('yolo_confidence', 0.5)
+    floor = FEATURE_STORE_MIN_CONF if raw_out is not None else None
+    if cascade is None:
+        if raw_out is None:
+            return _detect(features_list, thresholds)
+        raw = _detect(features_list, thresholds, floor=floor)
+        raw_out.extend(raw)
+        return [(status, [d for d in dets if d[1] > conf_threshold]) for status, dets in raw]
+    
+    raw = [None] * len(features_list)
+    pending = list(range(len(features_list)))
+    for level, imgsz in enumerate(cascade.levels):
+        if not pending:
+            break
+        cascade.record(level, len(pending))
+        is_last = level == len(cascade.levels) - 1
+        level_detections = _detect([features_list[i] for i in pending], thresholds, imgsz, cascade.margin, floor)
+        escalate = []
+        for i, (status, detected_objects) in zip(pending, level_detections):
+            if status == "ok" and not is_last and cascade.is_ambiguous(detected_objects, conf_threshold):
+                escalate.append(i)
+            else:
+                raw[i] = (status, detected_objects)
+        pending = escalate
+    
+    if raw_out is not None:
+        raw_out.extend(raw)
+    return [(status, [d for d in dets if d[1] > conf_threshold]) for status, dets in raw]
+
+
+def _detection_result(status, detected_objects, start_time):
+    """5-tuple for a frame that went through the detection stage"""
+    if status == "no_model":
+        # If YOLO not available, save as Normal
+        return "Normal", 0.8, "no_model", 0.0, time.time() - start_time
+    if status == "error":
         # If YOLO fails, save as Normal anyway
-        latency = time.time() - start_time
-        return "Normal", 0.6, f"detection_ok_saved", 0.0, latency
+        return "Normal", 0.6, "detection_ok_saved", 0.0, time.time() - start_time
+    return _categorize_detections(detected_objects, start_time)
+
+
+def classify_frame(frame, last_frame=None, thresholds=None, detector=None, motion_gate=None, tracker=None,
+                   cascade=None):
+    """
+    Main classification function - CONFIGURABLE VERSION
+    Uses dynamic thresholds from sidebar
+    `frame` and `last_frame` may be raw BGR frames or FrameFeatures; passing the
+    previous frame's FrameFeatures avoids re-resizing it for the duplicate check.
+    Video streams should pass their own DuplicateDetector instead of last_frame,
+    and may pass a MotionGate to reuse YOLO results on near-static footage, or a
+    KeyframeTracker to run YOLO on keyframes only and label the frames in between
+    from tracked objects (the motion gate is not used in tracker mode).
+    A ResolutionCascade runs YOLO small first and escalates ambiguous frames.
+    """
+    start_time = time.time()
+    
+    # Use default thresholds if none provided
+    thresholds = _default_thresholds(thresholds)
+    
+    # One downscale / colour conversion shared by every stage
+    features = _as_features(frame)
+    last_features = _as_features(last_frame)
+    
+    if tracker is not None:
+        shift = tracker.observe(features)
+        motion_gate = None
+    elif motion_gate is not None:
+        motion_gate.observe(features)
+    
+    # Stages 1-3: cheap heuristics
+    discarded = _run_heuristic_stages(features, last_features, thresholds, start_time, detector)
+    if discarded is not None:
+        if tracker is not None:
+            tracker.apply(shift)
+        return discarded
+    
+    # Tracker mode: YOLO on keyframes, tracked objects in between
+    if tracker is not None:
+        if tracker.take_keyframe():
+            status, detected_objects = _detect_adaptive([features], thresholds, cascade)[0]
+            tracker.apply(shift, detected_objects)
+            if status != "ok":
+                return _detection_result(status, detected_objects, start_time)
+        else:
+            tracker.apply(shift)
+        return _categorize_detections(tracker.objects(), start_time)
+    
+    # Motion gate: near-static footage reuses the last YOLO result
+    if motion_gate is not None and not motion_gate.should_infer():
+        return motion_gate.last_result + (time.time() - start_time,)
+    
+    # Stage 4: YOLO object detection
+    status, detected_objects = _detect_adaptive([features], thresholds, cascade)[0]
+    result = _detection_result(status, detected_objects, start_time)
+    if motion_gate is not None:
+        motion_gate.record(result)
+    return result
+
+
+def classify_frames(frames, last_frame=None, thresholds=None, batch_size=YOLO_BATCH_SIZE,
+                    detector=None, motion_gate=None, tracker=None, cascade=None, recorder=None):
+    """
+    Batched classification - same 5-tuple per frame as classify_frame
+    Heuristic stages run per frame; the survivors go through YOLO as stacked
+    batches of up to batch_size so the predictor overhead is paid once per batch.
+    `last_frame` is the frame preceding frames[0]; each later frame is
+    duplicate-checked against its predecessor in the list. With a
+    DuplicateDetector, the detector's own stream state is used instead.
+    With a MotionGate, low-motion survivors reuse the latest inferred result
+    (possibly from earlier in the same batch) instead of going to YOLO.
+    With a KeyframeTracker, only keyframes go to YOLO and the tracker is then
+    replayed in frame order to label the frames in between.
+    With a ResolutionCascade, each batch is inferred small first and only its
+    ambiguous frames are re-run at the larger sizes.
+    With a FeatureRecorder (feature_store.py), every frame's raw measurements and
+    unfiltered detections are recorded so the job can be re-thresholded later.
+    Frames may be raw BGR arrays or FrameFeatures.
+    """
+    thresholds = _default_thresholds(thresholds)
+    batch_size = max(1, int(batch_size))
+    plan = _plan_frames(frames, last_frame, thresholds, detector, motion_gate, tracker)
+    
+    # Stage 4: YOLO on the frames that still need a fresh inference
+    raw_detections = {} if recorder is not None else None
+    detections = _detect_batches(plan.features, plan.survivors, thresholds, batch_size, cascade, raw_detections)
+    return _finish_frames(plan, detections, motion_gate, tracker, recorder, raw_detections)
+
+
+class _FramePlan:
+    """Stages 1-3 outcome for one classify_frames batch - everything except the YOLO results"""
+    
+    def __init__(self, features):
+        self.features = features
+        self.results = [None] * len(features)
+        self.duplicates = [None] * len(features)
+        self.survivors = []  # (index, start_time, heuristic_time) - frames that need YOLO
+        self.reused = []  # (index, source index or None for the gate's previous result, heuristic_time)
+        self.tracked = []  # (index, heuristic_time) - tracker mode frames between keyframes
+        self.shifts = []
+
+
+def _plan_frames(frames, last_frame, thresholds, detector=None, motion_gate=None, tracker=None):
+    """
+    First half of classify_frames - heuristic stages and gate / keyframe decisions
+    Advances the stream state (detector, gate, tracker) but never touches YOLO,
+    so the survivors can be inferred anywhere (this thread or a worker process)
+    before _finish_frames, as long as batches are finished in stream order.
+    """
+    if tracker is not None:
+        motion_gate = None
+    plan = _FramePlan([_as_features(frame) for frame in frames])
+    last_source = None
+    
+    # Stage 1 for the whole batch: one vectorized SSIM call over all strided pairs
+    if detector is not None:
+        plan.duplicates = detector.check_batch(plan.features)
+    
+    # Stages 2-3 for the whole batch: every sky / water feature from one thumbnail stack
+    heuristics = [None] * len(plan.features)
+    if len(plan.features) > 1:
+        with stage("hsv", len(plan.features)):
+            heuristics = evaluate_heuristics(plan.features) or heuristics
+    
+    # Then one frame at a time: the stage decisions, near-duplicate lookup and the gate / keyframe decision
+    previous = _as_features(last_frame)
+    for i, features in enumerate(plan.features):
+        start_time = time.time()
+        if tracker is not None:
+            plan.shifts.append(tracker.observe(features))
+        elif motion_gate is not None:
+            motion_gate.observe(features)
+        discarded = _run_heuristic_stages(
+            features, previous, thresholds, start_time, detector, plan.duplicates[i], heuristics[i]
+        )
+        if discarded is not None:
+            plan.results[i] = discarded
+        elif tracker is not None and not tracker.take_keyframe():
+            plan.tracked.append((i, time.time() - start_time))
+        elif motion_gate is not None and not motion_gate.should_infer():
+            plan.reused.append((i, last_source, time.time() - start_time))
+        else:
+            plan.survivors.append((i, start_time, time.time() - start_time))
+            last_source = i
+        previous = features
+    return plan
+
+
+def _finish_frames(plan, detections, motion_gate=None, tracker=None, recorder=None, raw_detections=None):
+    """
+    Second half of classify_frames - turns {index: (status, detections, latency)}
+    into the 5-tuples, replays the tracker and fills in motion-gate reuse
+    """
+    results = plan.results
+    if tracker is not None:
+        motion_gate = None
+    # The gate's previous result is read here, not at planning time, so a batch
+    # planned while the one before it was still in flight reuses the right result
+    previous_result = motion_gate.last_result if motion_gate is not None else None
+    
+    if recorder is not None:
+        for i, features in enumerate(plan.features):
+            recorder.add(features, plan.duplicates[i], raw_detections.get(i))
+    
+    if tracker is not None:
+        # Replay the tracker in frame order: keyframes re-seed, the rest propagate
+        tracked_times = dict(plan.tracked)
+        for i in range(len(plan.features)):
+            if i in detections:
+                status, detected_objects, latency = detections[i]
+                tracker.apply(plan.shifts[i], detected_objects)
+                if status != "ok":
+                    results[i] = _detection_result(status, detected_objects, time.time() - latency)
+                else:
+                    results[i] = _categorize_detections(tracker.objects(), time.time() - latency)
+            else:
+                tracker.apply(plan.shifts[i])
+                if i in tracked_times:
+                    results[i] = _categorize_detections(tracker.objects(), time.time() - tracked_times[i])
+        return results
+    
+    for i, (status, detected_objects, latency) in detections.items():
+        results[i] = _detection_result(status, detected_objects, time.time() - latency)
+    if motion_gate is not None and plan.survivors:
+        motion_gate.record(results[plan.survivors[-1][0]])
+    
+    # Fill in frames that reuse an earlier inference
+    for i, source, heuristic_time in plan.reused:
+        base = results[source] if source is not None else previous_result
+        results[i] = tuple(base[:4]) + (heuristic_time,)
+    
+    return results
+
+
+def _detect_batches(features_list, survivors, thresholds, batch_size, cascade=None, raw_detections=None):
+    """
+    Stage 4 for classify_frames - one stacked YOLO call per batch of survivors
+    Returns {index: (status, detections, latency)}; each frame is charged its own
+    heuristic time plus an equal share of its batch. Unfiltered detections go
+    into the raw_detections dict when one is given.
+    """
+    detections = {}
+    for b in range(0, len(survivors), batch_size):
+        chunk = survivors[b:b + batch_size]
+        batch_start = time.time()
+        raw = [] if raw_detections is not None else None
+        batch_detections = _detect_adaptive([features_list[i] for i, _, _ in chunk], thresholds, cascade, raw)
+        if raw is not None:
+            raw_detections.update((i, entry) for (i, _, _), entry in zip(chunk, raw))
+        share = (time.time() - batch_start) / len(chunk)
+        for (i, _, heuristic_time), (status, detected_objects) in zip(chunk, batch_detections):
+            detections[i] = (status, detected_objects, heuristic_time + share)
+    return detections
 
 
 # Test function to debug
@@ -0,0 +1,203 @@
+"""
+AURA Module 1 - Classifier Engine
+One ClassifierEngine per process owns the YOLO model handle, the inference
+backend, the CPU thread budget, default thresholds and engine-wide stats.
+Video jobs get a lightweight JobContext from engine.job(): it holds the job's
+own stream state (duplicate detector, motion gate, tracker, resolution
+cascade) and shares the engine's model, whose forward pass is serialized by
+the per-model inference lock in classifier.py.
+
+Thread budget (see benchmark_thread_budget in benchmark_module1.py):
+- torch.set_num_threads and cv2.setNumThreads are PROCESS-wide, so the budget
+  belongs to the engine, not to a job.
+- Jobs in one process take turns on the model, so torch gets all cores
+  (TORCH_THREADS = 0) - a forward pass never competes with another one.
+- OpenCV is left at its library default (CV2_THREADS = None): the setting would
+  also apply to every other page served by the same Streamlit process.
+- Across processes (one engine each), divide the cores: torch_threads =
+  cores // processes - see threads_per_worker(); pool workers run OpenCV
+  single-threaded, their per-frame work is one downscale plus thumbnail maths.
+"""
+
+import os
+import threading
+import time
+import cv2
+from classifier import (
+    DuplicateDetector, MotionGate, ResolutionCascade, get_model, warmup, _default_thresholds, _plan_frames,
+    _detect_batches, _finish_frames
+)
+from inference_backends import loaded_backend
+from tracker import KeyframeTracker
+from shot_detector import ShotDetector
+from stage_timing import StageProfiler, profiling
+from config import (
+    YOLO_WEIGHTS, YOLO_BACKEND, YOLO_BATCH_SIZE, PHASH_MAX_DISTANCE, TORCH_THREADS, CV2_THREADS
+)
+
+
+def threads_per_worker(n_workers, cores=None):
+    """torch threads for each of n_workers processes sharing this host"""
+    cores = cores or os.cpu_count() or 1
+    return max(1, cores // max(1, int(n_workers)))
+
+
+class ClassifierEngine:
+    """
+    Shared model + CPU thread budget + default thresholds for classification jobs
+    torch_threads / cv2_threads: 0 = all cores, None = leave the library default
+    """
+
+    def __init__(self, weights=YOLO_WEIGHTS, backend=YOLO_BACKEND, torch_threads=TORCH_THREADS,
+                 cv2_threads=CV2_THREADS, thresholds=None):
+        self.weights = weights
+        self.backend = backend
+        self.torch_threads = torch_threads
+        self.cv2_threads = cv2_threads
+        self.thresholds = dict(_default_thresholds(thresholds))
+        self.thresholds.update(weights=weights, backend=backend)
+
+        self._stats_lock = threading.Lock()
+        self.jobs = 0
+        self.frames = 0
+        self.batches = 0
+        self.busy_time = 0.0
+
+        self.apply_thread_budget()
+
+    def apply_thread_budget(self):
+        """Apply the torch / OpenCV thread counts to this process"""
+        cores = os.cpu_count() or 1
+        if self.cv2_threads is not None:
+            cv2.setNumThreads(self.cv2_threads or cores)
+        if self.torch_threads is not None:
+            try:
+                import torch
+                torch.set_num_threads(self.torch_threads or cores)
+            except ImportError:
+                pass
+
+    @property
+    def model(self):
+        """Shared YOLO handle (None if unavailable)"""
+        return get_model(self.weights, self.backend)
+
+    def loaded_backend(self):
+        """
+        Backend the model really runs on - an ONNX request falls back to torch when
+        export or ONNX Runtime fails, so ONNX requests load the model to find out
+        """
+        if self.backend == "torch":
+            return "torch"
+        if self.model is None:
+            return None
+        return loaded_backend(self.backend, self.weights)
+
+    def load(self, imgsz_levels=None):
+        """Load and warm up the model for each input size. Returns True if available"""
+        levels = imgsz_levels or ResolutionCascade().levels
+        return all(warmup(imgsz=imgsz, weights=self.weights, backend=self.backend) for imgsz in levels)
+
+    def job(self, thresholds=None):
+        """New per-job context; `thresholds` override the engine defaults"""
+        with self._stats_lock:
+            self.jobs += 1
+        return JobContext(self, {**self.thresholds, **(thresholds or {}),
+                                 'weights': self.weights, 'backend': self.backend})
+
+    def _record(self, n_frames, elapsed):
+        with self._stats_lock:
+            self.frames += n_frames
+            self.batches += 1
+            self.busy_time += elapsed
+
+    def stats(self):
+        """Engine-wide statistics"""
+        with self._stats_lock:
+            return {
+                'weights': self.weights,
+                'backend': self.backend,
+                'torch_threads': self.torch_threads,
+                'cv2_threads': self.cv2_threads,
+                'jobs': self.jobs,
+                'frames': self.frames,
+                'batches': self.batches,
+                'fps': self.frames / self.busy_time if self.busy_time else 0.0
+            }
+
+
+class JobContext:
+    """
+    Per-job classification state on top of a shared ClassifierEngine
+    Owns the stream objects, so concurrent jobs never share a duplicate
+    detector, motion gate, tracker or cascade.
+    """
+
+    def __init__(self, engine, thresholds):
+        self.engine = engine
+        self.thresholds = thresholds
+        self.batch_size = thresholds.get('batch_size', YOLO_BATCH_SIZE)
+        # Holds only the previous 24x24 thumbnail, plus a dHash index of every kept frame
+        self.detector = DuplicateDetector(
+            thresholds.get('ssim_threshold', 0.97),
+            hash_distance=thresholds.get('phash_distance', PHASH_MAX_DISTANCE)
+        )
+        # Near-static stretches reuse the last YOLO result
+        self.motion_gate = MotionGate()
+        # Keyframe mode: YOLO on keyframes only, tracked objects in between
+        self.tracker = KeyframeTracker() if thresholds.get('detection_mode') == 'keyframe_tracker' else None
+        # YOLO small first, ambiguous frames escalate
+        self.cascade = ResolutionCascade()
+        # Shot sampling mode: classify shot boundaries / representatives, propagate to the rest
+        self.shots = ShotDetector() if thresholds.get('sampling') == 'shots' else None
+        # Per-stage latency histograms; the classifier records into it while the job runs
+        self.profiler = StageProfiler()
+
+    def classify(self, frames, recorder=None):
+        """classify_frames for the next frames of this job's stream"""
+        start = time.perf_counter()
+        plan = self.plan(frames)
+        raw_detections = {} if recorder is not None else None
+        with profiling(self.profiler):
+            detections = _detect_batches(
+                plan.features, plan.survivors, self.thresholds, self.batch_size, self.cascade, raw_detections
+            )
+        return self.finish(plan, detections, recorder, raw_detections, time.perf_counter() - start)
+
+    def plan(self, frames):
+        """Heuristic stages for the next frames - the survivors still need YOLO"""
+        with profiling(self.profiler):
+            return _plan_frames(frames, None, self.thresholds, self.detector, self.motion_gate, self.tracker)
+
+    def finish(self, plan, detections, recorder=None, raw_detections=None, elapsed=0.0):
+        """Results for a planned batch once its detections are in (call in stream order)"""
+        results = _finish_frames(plan, detections, self.motion_gate, self.tracker, recorder, raw_detections)
+        for result in results:
+            self.profiler.add("end_to_end", result[4])
+        self.engine._record(len(plan.features), elapsed)
+        return results
+
+    def stats(self):
+        """Job statistics for final results"""
+        return {
+            'duplicate_stats': self.detector.stats(),
+            'near_duplicates': self.detector.near_duplicates,
+            'yolo_reuse': self.motion_gate.stats() if self.tracker is None else None,
+            'tracking': self.tracker.stats() if self.tracker is not None else None,
+            'resolution_cascade': self.cascade.stats(),
+            'shots': self.shots.stats() if self.shots is not None else None
+        }
+
+
+# Shared engines, one per (weights, backend)
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(backend=YOLO_BACKEND, weights=YOLO_WEIGHTS):
+    """Process-wide ClassifierEngine for a model / backend"""
+    key = (weights, backend)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = ClassifierEngine(weights, backend)
+        return _engines[key]
@@ -0,0 +1,180 @@
+"""
+AURA Module 1 - Multi-process Classification Pool
+YOLO and OpenCV hold the GIL long enough that one background thread uses about
+one core. The pool moves the YOLO stage into worker processes:
+
+- The parent keeps the stream: frame order, duplicate / sky / water / dHash
+  stages, motion gate and tracker decisions (JobContext.plan) and the
+  progress logic. Only frames that need a fresh inference leave the process.
+- Frames travel through multiprocessing.shared_memory ring slots - the parent
+  copies a batch into a free slot and sends its offset; nothing is pickled
+  except the small thresholds dict and the detections coming back.
+- Each worker loads and warms up the model ONCE, with torch threads set to
+  cores // workers (classifier_engine.threads_per_worker).
+- Batches are finished strictly in submission order (JobContext.finish), so
+  results are identical to the single-thread path.
+"""
+
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from classifier import FrameFeatures, ResolutionCascade, _detect_batches
+from classifier_engine import ClassifierEngine, threads_per_worker
+from stage_timing import StageProfiler, profiling
+from config import POOL_SLOTS_PER_WORKER
+
+# Per-worker state, set by _init_worker
+_worker_memory = None
+
+
+def _init_worker(memory_name, weights, backend, torch_threads, levels):
+    """Attach the frame ring and load the model once per worker process"""
+    global _worker_memory
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    ClassifierEngine(weights, backend, torch_threads=torch_threads, cv2_threads=1).load(levels)
+
+
+def _detect_slot(offset, frame_shape, heuristic_times, thresholds, batch_size, cascade_args, record_raw):
+    """
+    Stage 4 for one ring slot (runs in a worker)
+    Returns ({position: (status, detections, latency)}, raw detections or None,
+    frames inferred per cascade level or None, StageProfiler of this call, seconds spent)
+    """
+    start = time.perf_counter()
+    frames = np.ndarray((len(heuristic_times),) + frame_shape, dtype=np.uint8,
+                        buffer=_worker_memory.buf, offset=offset)
+    cascade = ResolutionCascade(*cascade_args) if cascade_args is not None else None
+    raw_detections = {} if record_raw else None
+    survivors = [(k, 0.0, heuristic_time) for k, heuristic_time in enumerate(heuristic_times)]
+    profiler = StageProfiler()
+    with profiling(profiler):
+        features = [FrameFeatures(frame) for frame in frames]
+        detections = _detect_batches(features, survivors, thresholds, batch_size, cascade, raw_detections)
+    inferred = cascade.inferred if cascade is not None else None
+    return detections, raw_detections, inferred, profiler, time.perf_counter() - start
+
+
+class ClassificationPool:
+    """
+    Worker processes running YOLO for one JobContext
+    submit() plans a batch in this process and ships its survivors to a free
+    ring slot; finished batches come back in order from submit() / drain() as
+    (payload, results) pairs.
+    """
+
+    def __init__(self, job, n_workers, frame_shape, slots_per_worker=POOL_SLOTS_PER_WORKER):
+        self.job = job
+        self.n_workers = max(1, int(n_workers))
+        self.frame_shape = tuple(frame_shape)
+        self.slot_bytes = job.batch_size * int(np.prod(self.frame_shape))
+        self.n_slots = self.n_workers * max(1, int(slots_per_worker))
+
+        self.memory = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.n_slots)
+        self.free_slots = deque(range(self.n_slots))
+        self.pending = deque()  # (payload, plan, slot, future, recorder, plan seconds)
+
+        engine = job.engine
+        self.executor = ProcessPoolExecutor(
+            self.n_workers,
+            mp_context=multiprocessing.get_context("spawn"),  # fork is unsafe with torch / Streamlit threads
+            initializer=_init_worker,
+            initargs=(self.memory.name, engine.weights, engine.backend,
+                      threads_per_worker(self.n_workers), job.cascade.levels)
+        )
+
+    def start(self):
+        """Spawn every worker and wait until each has loaded the model"""
+        for future in [self.executor.submit(os.getpid) for _ in range(self.n_workers)]:
+            future.result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, frames, payload=None, recorder=None):
+        """
+        Classify the next frames of the stream (raw BGR arrays of frame_shape)
+        Returns the (payload, results) of every batch finished meanwhile, in order
+        """
+        ready = []
+        if any(frame.shape != self.frame_shape for frame in frames):
+            # Odd-sized frames don't fit the ring - finish everything in flight, then run in-process
+            ready.extend(self.drain())
+            ready.append((payload, self.job.classify(frames, recorder)))
+            return ready
+
+        start = time.perf_counter()
+        plan = self.job.plan(frames)
+        plan_time = time.perf_counter() - start
+        if not plan.survivors:
+            self.pending.append((payload, plan, None, None, recorder, plan_time))
+            return ready + self._collect(block=False)
+
+        while not self.free_slots:
+            ready.extend(self._collect(block=True, limit=1))
+        slot = self.free_slots.popleft()
+
+        # Survivor frames are copied straight into the slot; the worker reads them in place
+        offset = slot * self.slot_bytes
+        ring = np.ndarray((len(plan.survivors),) + self.frame_shape, dtype=np.uint8,
+                          buffer=self.memory.buf, offset=offset)
+        for k, (i, _, _) in enumerate(plan.survivors):
+            ring[k] = plan.features[i].frame
+        del ring
+
+        cascade = self.job.cascade
+        future = self.executor.submit(
+            _detect_slot, offset, self.frame_shape, [h for _, _, h in plan.survivors], self.job.thresholds,
+            self.job.batch_size, (cascade.levels, cascade.margin, cascade.min_box_area), recorder is not None
+        )
+        self.pending.append((payload, plan, slot, future, recorder, plan_time))
+        return ready + self._collect(block=False)
+
+    def drain(self):
+        """Wait for every batch in flight; returns their (payload, results) in order"""
+        return self._collect(block=True)
+
+    def _collect(self, block, limit=None):
+        """Finish batches from the front of the queue (waiting for them if block)"""
+        ready = []
+        while self.pending and (limit is None or len(ready) < limit):
+            payload, plan, slot, future, recorder, elapsed = self.pending[0]
+            if future is not None and not block and not future.done():
+                break
+            self.pending.popleft()
+
+            detections, raw_detections = {}, ({} if recorder is not None else None)
+            if future is not None:
+                try:
+                    slot_detections, slot_raw, inferred, profiler, detect_time = future.result()
+                finally:
+                    self.free_slots.append(slot)
+                # Slot positions back to frame indices
+                index = [i for i, _, _ in plan.survivors]
+                detections = {index[k]: entry for k, entry in slot_detections.items()}
+                if raw_detections is not None:
+                    raw_detections = {index[k]: entry for k, entry in slot_raw.items()}
+                if inferred is not None:
+                    for level, n_frames in enumerate(inferred):
+                        self.job.cascade.record(level, n_frames)
+                self.job.profiler.merge(profiler)
+                elapsed += detect_time
+            # Busy time of the batch: heuristics here plus YOLO in the worker (not the time spent queued)
+            ready.append((payload, self.job.finish(plan, detections, recorder, raw_detections, elapsed)))
+        return ready
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.memory.close()
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
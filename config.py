@@ -2,6 +2,8 @@
 Configuration for AURA Module 1
 """
 
+import os
+
 # Classification categories
 CATEGORIES = ["Critical", "Important", "Normal", "Discard"]
 
@@ -21,3 +23,131 @@ IMPORTANT_CLASSES = ['car', 'truck', 'bus', 'motorcycle', 'bicycle', 'boat', 'tr
 SSIM_THRESHOLD = 0.93
 BLUE_RATIO_THRESHOLD = 0.6
 EDGE_RATIO_THRESHOLD = 0.02
+
+# YOLO weights (loaded lazily by classifier.get_model)
+YOLO_WEIGHTS = 'yolov8n.pt'
+
+# YOLO inference backend: "torch", "onnx" (ONNX Runtime FP32) or "onnx_int8"
+# ONNX artifacts are exported once at ONNX_EXPORT_IMGSZ and cached in ONNX_CACHE_DIR
+YOLO_BACKEND = 'torch'
+ONNX_EXPORT_IMGSZ = 256
+AURA_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aura")
+ONNX_CACHE_DIR = os.path.join(AURA_CACHE_DIR, "models")
+
+# Batched inference: frames sent to YOLO per stacked call
+YOLO_BATCH_SIZE = 8
+
+# YOLO input size when the resolution cascade is not used
+YOLO_IMGSZ = 256
+
+# Sky ROI crop: YOLO runs on the bounding box of the non-sky thumbnail cells,
+# padded by ROI_PADDING cells and at least ROI_MIN_SIZE of each dimension; crops
+# that would keep more than ROI_MAX_AREA of the frame use the full frame instead.
+# Off by default until Critical/Important recall is shown not to drop on the
+# benchmark; enable per job with thresholds['sky_roi'] = True
+SKY_ROI_CROP = False
+ROI_PADDING = 1
+ROI_MIN_SIZE = 0.4
+ROI_MAX_AREA = 0.85
+
+# Resolution cascade: infer at the first size, escalate to the next one when a
+# detection lands within ESCALATION_MARGIN of the confidence threshold or a kept
+# box is smaller than ESCALATION_MIN_BOX_AREA (fraction of the frame)
+# The first level is never below the old fixed YOLO_IMGSZ: a frame with NO
+# detections is never escalated, so anything a smaller first pass misses
+# (small people at altitude) would be lost
+RESOLUTION_LEVELS = (256, 416, 640)
+ESCALATION_MARGIN = 0.15
+ESCALATION_MIN_BOX_AREA = 0.002
+
+# Duplicate detection: SSIM is computed on every Nth frame of a stream
+DUPLICATE_CHECK_STRIDE = 5
+
+# Near-duplicate index: max dHash Hamming distance to an earlier kept frame
+PHASH_MAX_DISTANCE = 4
+# dHash only compares neighbouring pixels, so flat / low-texture frames (water,
+# sand, fog) all hash to ~0: frames with a thumbnail variance below
+# NEAR_DUP_MIN_VARIANCE, or fewer than NEAR_DUP_MIN_BITS set (or clear) hash
+# bits, are never indexed or looked up. A hash match only discards a frame if
+# its thumbnail also has SSIM >= NEAR_DUP_MIN_SSIM with the matched frame's
+# and no mean colour channel differs by more than NEAR_DUP_MAX_COLOR_DIFF
+NEAR_DUP_MIN_VARIANCE = 50
+NEAR_DUP_MIN_BITS = 8
+NEAR_DUP_MIN_SSIM = 0.95
+NEAR_DUP_MAX_COLOR_DIFF = 8
+
+# Motion gate: reuse the last YOLO result while accumulated thumbnail motion
+# (mean abs difference, 0-1) stays below the threshold, for at most N frames
+MOTION_THRESHOLD = 0.03
+MOTION_MAX_REUSE = 10
+
+# Keyframe + tracker mode: YOLO every N analysed frames or on a scene cut
+# (half the L1 distance between gray histograms), boxes tracked in between
+KEYFRAME_INTERVAL = 8
+SCENE_CUT_THRESHOLD = 0.5
+TRACK_WIDTH = 160
+
+# Persistent classification cache (result_cache.py): finished runs keyed by video
+# content hash, model/backend and thresholds; LRU-evicted past the disk budget
+RESULT_CACHE_PATH = os.path.join(AURA_CACHE_DIR, "results.sqlite")
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Video fingerprint: file size plus RESULT_CACHE_SAMPLE_CHUNKS evenly spaced chunks
+# of RESULT_CACHE_CHUNK_BYTES (first and last included) instead of every byte.
+# No mtime - each upload is a fresh temp file, so re-uploads would never hit
+RESULT_CACHE_SAMPLE_CHUNKS = 16
+RESULT_CACHE_CHUNK_BYTES = 256 * 1024
+
+# Feature store (feature_store.py): raw detections are recorded down to this
+# confidence so the YOLO slider can be lowered without reprocessing
+FEATURE_STORE_MIN_CONF = 0.1
+
+# CPU thread budget (classifier_engine.py) - process-wide, 0 = all cores, None = library default.
+# Jobs share one model and take turns on it, so torch gets every core. OpenCV is
+# left at its default: cv2.setNumThreads would also slow the Module 3 pages in the
+# same process; pool workers (own processes) run OpenCV single-threaded instead
+TORCH_THREADS = 0
+CV2_THREADS = None
+
+# Process-pool mode (classifier_pool.py): YOLO runs in CLASSIFY_WORKERS processes
+# (0 = in the background thread), frames handed over through shared-memory ring
+# slots, POOL_SLOTS_PER_WORKER batches in flight per worker
+CLASSIFY_WORKERS = 0
+POOL_SLOTS_PER_WORKER = 2
+
+
+# Shot sampling mode (shot_detector.py): every frame is scanned; a new shot starts
+# when the HSV histogram distance to the previous frame exceeds SHOT_CUT_THRESHOLD
+# (hard cut) or to the shot's first frame exceeds SHOT_DRIFT_THRESHOLD (slow pan),
+# at most once per SHOT_MIN_LENGTH frames. Shot boundaries plus one frame every
+# SHOT_REPRESENTATIVE_INTERVAL frames are classified (and may be saved); the rest
+# of each shot counts as duplicates of its representative and is never saved
+SHOT_CUT_THRESHOLD = 0.35
+SHOT_DRIFT_THRESHOLD = 0.5
+SHOT_MIN_LENGTH = 5
+SHOT_REPRESENTATIVE_INTERVAL = 150
+
+# Background pipeline (background_processor.py): decoder thread -> classifier ->
+# encoder thread, joined by bounded queues. A full queue blocks the stage
+# feeding it, so at most this many decoded / kept frames wait between stages
+PIPELINE_DECODE_QUEUE = 16
+PIPELINE_WRITE_QUEUE = 16
+
+# Frame decoder for Module 1 (frame_sources.py): "opencv" (cv2.VideoCapture) or
+# "ffmpeg" - a rawvideo pipe that scales inside ffmpeg to an ANALYSIS_WIDTH-wide
+# analysis stream (the YOLO input width) and ships full-resolution frames only
+# for the sampled indices
+FRAME_DECODER = "opencv"
+ANALYSIS_WIDTH = 640
+
+# ffmpeg decoder: seconds to wait for a sampled frame on the full-resolution pipe.
+# If its reader thread died, the analysis frames are scaled up instead; if it is
+# alive but silent this long, the stream ends instead of blocking the job forever
+FULL_FRAME_TIMEOUT = 10
+
+# Job manager (job_manager.py): video jobs queued by priority, JOB_WORKERS run at
+# once. Jobs share one engine whose forward pass is serialized, so a second job
+# keeps decoding / heuristics / encoding busy while the first holds the model
+JOB_WORKERS = 2
+JOB_PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+# Finished jobs (with their results) kept for status queries, oldest dropped first
+JOB_HISTORY = 50
@@ -0,0 +1,232 @@
+"""
+AURA Module 1 - Columnar Feature Store + Instant Re-classification
+A background job records every analysed frame's raw measurements (SSIM to the
+previous frame, HSV / edge ratios, variance, dHash plus the gray thumbnail and
+mean colour that confirm a hash match) and the unfiltered YOLO
+detections into one .npz file of flat arrays. reclassify() replays
+classify_frame's decision logic over those columns with NumPy, so moving a
+sidebar slider updates counts, reduction and the kept-frame list in
+milliseconds instead of reprocessing the video.
+
+Exact for every frame that went through YOLO. Frames that did not (motion-gate
+reuse, tracker frames, or frames that only survive under the new thresholds)
+take the detections of the closest earlier inferred frame - the same rule the
+motion gate uses.
+"""
+
+import numpy as np
+from hash_index import BKTree
+from config import CATEGORIES, PHASH_MAX_DISTANCE
+from classifier import (
+    CLASS_PRIORITY, FrameFeatures, SKY_BLUE_RATIO, SKY_WHITE_RATIO, SKY_MAX_EDGE_RATIO, WATER_RATIO, WATER_MAX_VARIANCE,
+    confirm_near_duplicate, hash_is_informative
+)
+
+# Per-frame detection status codes
+STATUS_NOT_INFERRED = 0
+STATUS_OK = 1
+STATUS_NO_MODEL = 2
+STATUS_ERROR = 3
+_STATUS_CODES = {"ok": STATUS_OK, "no_model": STATUS_NO_MODEL, "error": STATUS_ERROR}
+
+_CATEGORY_IDS = {name: i for i, name in enumerate(CATEGORIES)}
+
+
+class FeatureRecorder:
+    """
+    Collects per-frame columns during a job - pass it to classify_frames
+    Rows are appended in stream order; frame numbers are supplied at build time.
+    """
+
+    def __init__(self, phash_distance=PHASH_MAX_DISTANCE):
+        self.phash_distance = phash_distance
+        self.columns = {name: [] for name in (
+            'ssim', 'blue_ratio', 'white_ratio', 'edge_ratio', 'water_ratio', 'variance', 'dhash', 'status',
+            'thumb', 'mean_color'
+        )}
+        self.det_counts = []
+        self.det_class = []
+        self.det_conf = []
+        self.class_names = {}
+
+    def __len__(self):
+        return len(self.det_counts)
+
+    def add(self, features, duplicate=None, raw=None):
+        """
+        Record one frame
+        duplicate: (is_dup, ssim) from the stream's DuplicateDetector, or None
+        raw: unfiltered (status, detections) if the frame went through YOLO
+        """
+        self.columns['ssim'].append(duplicate[1] if duplicate is not None else np.nan)
+        self.columns['blue_ratio'].append(features.blue_ratio)
+        self.columns['white_ratio'].append(features.white_ratio)
+        self.columns['edge_ratio'].append(features.edge_ratio)
+        self.columns['water_ratio'].append(features.water_ratio)
+        self.columns['variance'].append(features.variance)
+        self.columns['dhash'].append(features.dhash)
+        self.columns['thumb'].append(features.gray)
+        self.columns['mean_color'].append(features.mean_color)
+
+        status, detections = raw if raw is not None else (None, [])
+        self.columns['status'].append(_STATUS_CODES.get(status, STATUS_NOT_INFERRED))
+        self.det_counts.append(len(detections))
+        for class_name, confidence, *_ in detections:
+            self.det_class.append(self.class_names.setdefault(class_name, len(self.class_names)))
+            self.det_conf.append(confidence)
+
+    def build(self, frame_numbers):
+        """Columnar store (dict of NumPy arrays) for the recorded frames"""
+        store = {
+            'frame_idx': np.asarray(frame_numbers, dtype=np.int64),
+            'ssim': np.asarray(self.columns['ssim'], dtype=np.float64),
+            'blue_ratio': np.asarray(self.columns['blue_ratio'], dtype=np.float64),
+            'white_ratio': np.asarray(self.columns['white_ratio'], dtype=np.float64),
+            'edge_ratio': np.asarray(self.columns['edge_ratio'], dtype=np.float64),
+            'water_ratio': np.asarray(self.columns['water_ratio'], dtype=np.float64),
+            'variance': np.asarray(self.columns['variance'], dtype=np.float64),
+            'dhash': np.asarray(self.columns['dhash'], dtype=np.uint64),
+            'status': np.asarray(self.columns['status'], dtype=np.int8),
+            'thumb': np.asarray(self.columns['thumb'], dtype=np.uint8).reshape(-1, *FrameFeatures.THUMB_SIZE[::-1]),
+            'mean_color': np.asarray(self.columns['mean_color'], dtype=np.float64).reshape(-1, 3),
+            'det_offsets': np.concatenate([[0], np.cumsum(self.det_counts, dtype=np.int64)]),
+            'det_class': np.asarray(self.det_class, dtype=np.int16),
+            'det_conf': np.asarray(self.det_conf, dtype=np.float32),
+            'class_names': np.asarray(sorted(self.class_names, key=self.class_names.get), dtype=str),
+            'phash_distance': np.asarray(-1 if self.phash_distance is None else self.phash_distance),
+        }
+        if len(store['frame_idx']) != len(self):
+            raise ValueError("frame_numbers must have one entry per recorded frame")
+        return store
+
+
+def save_feature_store(store, path):
+    """Write a store to an uncompressed .npz (loads in milliseconds)"""
+    np.savez(path, **store)
+    return path
+
+
+def load_feature_store(path):
+    """Read a store written by save_feature_store"""
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def _near_duplicates(store, candidates, max_distance):
+    """
+    Replay the dHash index over the frames that pass stages 1-3
+    Sequential by nature (a flagged frame is not indexed), so this uses the same
+    BK-tree, informative-hash filter and thumbnail confirmation as DuplicateDetector.
+    """
+    hashes, variance, thumbs, colors = store['dhash'], store['variance'], store['thumb'], store['mean_color']
+    flagged = np.zeros(len(hashes), dtype=bool)
+    index = BKTree()
+    for i in candidates.tolist():
+        hash_value = int(hashes[i])
+        if not hash_is_informative(hash_value, variance[i]):
+            continue
+        match = index.nearest(hash_value, max_distance)
+        if match is not None and confirm_near_duplicate(thumbs[i], colors[i], thumbs[match[1]], colors[match[1]]):
+            flagged[i] = True
+        else:
+            index.add(hash_value, i)
+    return flagged
+
+
+def reclassify(feature_store, thresholds=None):
+    """
+    classify_frame's decision logic over a whole feature store
+    feature_store: dict from FeatureRecorder.build / load_feature_store, or a path
+    Returns {'category': (N,) ids into CATEGORIES, 'detected': (N,) labels,
+    'confidence': (N,), 'counts', 'processed', 'reduction', 'kept_frames'}
+    """
+    store = load_feature_store(feature_store) if isinstance(feature_store, str) else feature_store
+    thresholds = thresholds or {}
+    ssim_threshold = thresholds.get('ssim_threshold', 0.97)
+    conf_threshold = thresholds.get('yolo_confidence', 0.5)
+    phash_distance = thresholds.get('phash_distance', int(store['phash_distance']))
+
+    n = len(store['frame_idx'])
+    category = np.full(n, _CATEGORY_IDS["Normal"], dtype=np.int8)
+    confidence = np.zeros(n, dtype=np.float64)
+    detected = np.empty(n, dtype=object)
+
+    # Stages 1-3: duplicate, sky, water - first matching stage wins
+    edge_ok = store['edge_ratio'] < SKY_MAX_EDGE_RATIO
+    duplicate = np.nan_to_num(store['ssim'], nan=-1.0) > ssim_threshold
+    sky = ~duplicate & (((store['blue_ratio'] > SKY_BLUE_RATIO) & edge_ok)
+                        | ((store['white_ratio'] > SKY_WHITE_RATIO) & edge_ok))
+    water = ~duplicate & ~sky & (store['water_ratio'] > WATER_RATIO) & (store['variance'] < WATER_MAX_VARIANCE)
+
+    # Stage 3b: near-duplicates of earlier kept frames
+    candidates = np.flatnonzero(~duplicate & ~sky & ~water)
+    if phash_distance is not None and phash_distance >= 0:
+        near_dup = _near_duplicates(store, candidates, phash_distance)
+    else:
+        near_dup = np.zeros(n, dtype=bool)
+    survivors = np.zeros(n, dtype=bool)
+    survivors[candidates] = True
+    survivors &= ~near_dup
+
+    # Stage 4: detections, from the frame itself or the closest earlier inferred frame
+    inferred = store['status'] != STATUS_NOT_INFERRED
+    source = np.where(inferred, np.arange(n), -1)
+    source = np.maximum.accumulate(source) if n else source
+    status = np.where(source >= 0, store['status'][np.maximum(source, 0)], STATUS_NOT_INFERRED)
+
+    # Per-detection priority: 2 critical, 1 important, 0 other; below-threshold boxes dropped
+    names = store['class_names']
+    class_priority = np.array([CLASS_PRIORITY.get(name, 0) for name in names], dtype=np.int8)
+    offsets = store['det_offsets']
+    counts_per_frame = np.diff(offsets)
+    det_frame = np.repeat(np.arange(n), counts_per_frame)
+    det_pos = np.arange(len(det_frame)) - offsets[det_frame] if len(det_frame) else det_frame
+    det_conf = store['det_conf'].astype(np.float64)
+    keep = det_conf > conf_threshold
+    det_frame, det_pos, det_conf = det_frame[keep], det_pos[keep], det_conf[keep]
+    det_class = store['det_class'][keep]
+    det_priority = class_priority[det_class] if len(det_class) else det_class.astype(np.int8)
+
+    # Best detection per inferred frame: highest priority, then YOLO order
+    order = np.lexsort((det_pos, -det_priority.astype(np.int16), det_frame))
+    first_frames, first = np.unique(det_frame[order], return_index=True)
+    best = order[first]
+    best_det = np.full(n, -1, dtype=np.int64)
+    best_det[first_frames] = best
+
+    frame_best = np.where(source >= 0, best_det[np.maximum(source, 0)], -1)
+    has_best = survivors & (status == STATUS_OK) & (frame_best >= 0)
+    best_idx = frame_best[has_best]
+    best_priority = det_priority[best_idx]
+    category[has_best] = np.select(
+        [best_priority == 2, best_priority == 1], [_CATEGORY_IDS["Critical"], _CATEGORY_IDS["Important"]],
+        _CATEGORY_IDS["Normal"]
+    )
+    confidence[has_best] = det_conf[best_idx]
+    detected[has_best] = names[det_class[best_idx]] if len(best_idx) else []
+
+    no_objects = survivors & (status == STATUS_OK) & (frame_best < 0)
+    confidence[no_objects], detected[no_objects] = 0.7, "no_objects_but_saved"
+    no_model = survivors & ((status == STATUS_NO_MODEL) | (status == STATUS_NOT_INFERRED))
+    confidence[no_model], detected[no_model] = 0.8, "no_model"
+    failed = survivors & (status == STATUS_ERROR)
+    confidence[failed], detected[failed] = 0.6, "detection_ok_saved"
+
+    # Discards, in stage order
+    discard = _CATEGORY_IDS["Discard"]
+    for mask, conf, label in ((duplicate, 1.0, "duplicate_frame"), (sky, 0.99, "empty_sky"),
+                              (water, 0.99, "static_water"), (near_dup, 1.0, "near_duplicate")):
+        category[mask], confidence[mask], detected[mask] = discard, conf, label
+
+    counts = {name: int(np.count_nonzero(category == i)) for i, name in enumerate(CATEGORIES)}
+    counts["Duplicates"] = int(np.count_nonzero(duplicate | near_dup))
+    saved = n - counts["Discard"]
+    return {
+        'category': category,
+        'detected': detected,
+        'confidence': confidence,
+        'counts': counts,
+        'processed': n,
+        'reduction': (1 - saved / n) * 100 if n else 0.0,
+        'kept_frames': store['frame_idx'][category != discard]
+    }
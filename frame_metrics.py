@@ -0,0 +1,84 @@
+"""
+AURA Module 1 - Vectorized Frame Metrics
+NumPy kernels that work on whole stacks of tiny thumbnails in one call
+"""
+
+import cv2
+import numpy as np
+
+# skimage.metrics.structural_similarity defaults (gaussian_weights=False)
+SSIM_WIN_SIZE = 7
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+
+def _box_mean(stack, win_size):
+    """Mean over every fully-inside win_size x win_size window, via summed-area tables"""
+    padded = np.zeros((stack.shape[0], stack.shape[1] + 1, stack.shape[2] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(stack, axis=1), axis=2, out=padded[:, 1:, 1:])
+    w = win_size
+    window_sum = padded[:, w:, w:] - padded[:, :-w, w:] - padded[:, w:, :-w] + padded[:, :-w, :-w]
+    return window_sum / (w * w)
+
+
+def ssim_batch(stack1, stack2, win_size=SSIM_WIN_SIZE, data_range=255.0):
+    """
+    Mean SSIM for N image pairs in one call
+    stack1, stack2: (N, h, w) or (h, w) gray images - returns an (N,) float64 array.
+    Matches skimage's structural_similarity (uniform window, sample covariance)
+    within floating-point tolerance: skimage averages S over the image cropped
+    by (win_size - 1) // 2, which is exactly the set of fully-inside windows.
+    No full similarity map is kept and there is no per-call validation overhead.
+    """
+    x = np.asarray(stack1, dtype=np.float64)
+    y = np.asarray(stack2, dtype=np.float64)
+    if x.ndim == 2:
+        x, y = x[None], y[None]
+
+    n_pixels = win_size * win_size
+    cov_norm = n_pixels / (n_pixels - 1.0)
+
+    ux = _box_mean(x, win_size)
+    uy = _box_mean(y, win_size)
+    uxx = _box_mean(x * x, win_size)
+    uyy = _box_mean(y * y, win_size)
+    uxy = _box_mean(x * y, win_size)
+
+    vx = cov_norm * (uxx - ux * ux)
+    vy = cov_norm * (uyy - uy * uy)
+    vxy = cov_norm * (uxy - ux * uy)
+
+    c1 = (SSIM_K1 * data_range) ** 2
+    c2 = (SSIM_K2 * data_range) ** 2
+
+    numerator = (2 * ux * uy + c1) * (2 * vxy + c2)
+    denominator = (ux * ux + uy * uy + c1) * (vx + vy + c2)
+    return (numerator / denominator).mean(axis=(1, 2))
+
+
+def thumbnail_batch(small, hsv_ranges, canny_low=50, canny_high=150):
+    """
+    Colour, edge and variance features for an (N, h, w, 3) BGR thumbnail stack
+    The stack is viewed as one tall (N*h, w) image, so the colour conversions and
+    every inRange run as a single OpenCV call; ratios and variances are
+    per-thumbnail reductions. Canny stays per thumbnail - its hysteresis would
+    link edges across neighbouring tiles.
+    hsv_ranges: {name: (lower, upper)}
+    Returns (hsv, gray, edges, masks {name: (N, h, w)}, ratios {name: (N,)}, edge_ratio (N,), variance (N,))
+    """
+    small = np.ascontiguousarray(small)
+    n, h, w = small.shape[:3]
+    tall = small.reshape(n * h, w, 3)
+    hsv = cv2.cvtColor(tall, cv2.COLOR_BGR2HSV)
+    gray = cv2.cvtColor(tall, cv2.COLOR_BGR2GRAY).reshape(n, h, w)
+
+    masks, ratios = {}, {}
+    for name, (lower, upper) in hsv_ranges.items():
+        masks[name] = cv2.inRange(hsv, lower, upper).reshape(n, h, w)
+        # inRange marks hits with 255 - an integer row sum is cheaper than count_nonzero(axis=...)
+        ratios[name] = masks[name].reshape(n, -1).sum(axis=1, dtype=np.int32) / (255 * h * w)
+
+    edges = np.stack([cv2.Canny(thumb, canny_low, canny_high) for thumb in gray])
+    edge_ratio = np.count_nonzero(edges.reshape(n, -1), axis=1) / (h * w)
+    variance = gray.reshape(n, -1).var(axis=1)
+    return hsv.reshape(n, h, w, 3), gray, edges, masks, ratios, edge_ratio, variance
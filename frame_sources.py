@@ -0,0 +1,483 @@
+"""
+AURA Module 1 - Frame Sources
+Common decoder interface for Module 1 (BackgroundVideoProcessor) and Module 3
+(DroneVideoProcessor). A frame source is an iterable of
+(frame_num, frame, full_frame) - frame numbers 1-based like the rest of
+Module 1, `frame` the BGR image to analyse and `full_frame` the
+full-resolution image in the source's own layout (the same array unless the
+source downscales). source.to_bgr(full_frame) turns it into BGR, so only the
+frames that are kept pay for the conversion. Each source times its own
+decoding and reports it through stats().
+
+- CaptureSampler: cv2.VideoCapture. Skipped frames are only grab()bed -
+  demuxed and decoded, but never converted to BGR or copied out - and
+  retrieve() runs only for frames that will be analysed.
+- FFmpegPipeSource: ffmpeg decodes into rawvideo pipes. Frame selection and
+  scaling happen inside ffmpeg: the sampled frames come out as a small
+  analysis stream on stdout, plus a second pipe with the same frames at full
+  resolution in the decoder's native yuv420p (half the bytes of BGR, no
+  conversion in ffmpeg). Unsampled frames are never converted or copied.
+- KeyframeSampler: FFmpegPipeSource that decodes I-frames only
+  (-skip_frame nokey), so P/B frames are not even decoded.
+
+If ffmpeg fails before its first frame (unsupported build, unreadable
+container), the ffmpeg sources switch to VideoCapture and deliver the same
+frame shapes and layout.
+"""
+
+import os
+import queue
+import re
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from config import FRAME_DECODER, ANALYSIS_WIDTH, FULL_FRAME_TIMEOUT
+
+# "pts_time:12.5" in the showinfo filter's per-frame log line
+_PTS_TIME = re.compile(r"pts_time:\s*([-0-9.eE+]+)")
+# "ffmpeg version 4.4.2-0ubuntu..." / "ffmpeg version n5.1.3" in `ffmpeg -version`
+_FFMPEG_VERSION = re.compile(r"ffmpeg version n?(\d+)\.(\d+)")
+_ffmpeg_versions = {}  # binary -> (major, minor) or None
+
+
+class FrameSource:
+    """
+    Base frame source: iterate for (frame_num, frame, full_frame), then stats()
+    frame_shape is the shape of the analysis frames (known before decoding)
+    """
+
+    mode = None
+
+    def __init__(self, video_path, frame_shape=None):
+        self.video_path = video_path
+        self.frame_shape = frame_shape
+        self.frames_seen = 0
+        self.frames_decoded = 0
+        self.decode_time = 0.0
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    @property
+    def pix_fmt(self):
+        """Layout of the full frames (ffmpeg pix_fmt name)"""
+        return "bgr24"
+
+    def to_bgr(self, full_frame):
+        """BGR image of a full_frame from this source"""
+        return full_frame
+
+    def close(self):
+        """Release the decoder (iteration also does this when it ends)"""
+
+    def stats(self):
+        """Frames covered / delivered and decode throughput"""
+        return {
+            'mode': self.mode,
+            'frames_seen': self.frames_seen,
+            'frames_decoded': self.frames_decoded,
+            'decode_time': self.decode_time,
+            # Video frames covered per second of decoding (skipped frames included)
+            'decode_fps': self.frames_seen / self.decode_time if self.decode_time else 0.0,
+            'frame_shape': list(self.frame_shape) if self.frame_shape else None
+        }
+
+
+class CaptureSampler(FrameSource):
+    """Every skip_frames-th frame via cv2.VideoCapture; grab() advances over the rest"""
+
+    mode = "grab"
+
+    def __init__(self, video_path, skip_frames=1, width=None, height=None, start_frame=0, max_frames=None):
+        super().__init__(video_path, (int(height), int(width), 3) if width and height else None)
+        self.skip_frames = max(1, int(skip_frames))
+        self.start_frame = max(0, int(start_frame))
+        self.max_frames = max_frames
+        self.cap = None
+
+    def __iter__(self):
+        self.cap = cv2.VideoCapture(self.video_path)
+        if self.start_frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        frame_num = self.start_frame
+        try:
+            while self.max_frames is None or self.frames_decoded < self.max_frames:
+                start = time.perf_counter()
+                # Advance without retrieving until the next analysed frame
+                while (frame_num + 1) % self.skip_frames != 0:
+                    if not self.cap.grab():
+                        self.decode_time += time.perf_counter() - start
+                        return
+                    frame_num += 1
+                    self.frames_seen += 1
+                ret, frame = self.cap.read()
+                self.decode_time += time.perf_counter() - start
+                if not ret:
+                    return
+                frame_num += 1
+                self.frames_seen += 1
+                self.frames_decoded += 1
+                yield frame_num, frame, frame
+        finally:
+            self.close()
+
+    def close(self):
+        """Release the capture"""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+def _read_frame(stream, shape):
+    """Exactly one raw BGR frame from a pipe into a fresh (writable) array, or None at EOF"""
+    frame = np.empty(shape, dtype=np.uint8)
+    view = memoryview(frame).cast("B")
+    got = 0
+    while got < len(view):
+        n = stream.readinto(view[got:])
+        if not n:
+            return None
+        got += n
+    return frame
+
+
+class FFmpegPipeSource(FrameSource):
+    """
+    ffmpeg decoder reading rawvideo frames straight from its pipes
+    Every skip_frames-th frame is selected inside ffmpeg; the analysis stream is
+    scaled there to analysis_width (aspect kept) and, with full_frames, the same
+    frames also arrive at full resolution on a second pipe. Frames already
+    narrower than analysis_width come through once, unscaled.
+    """
+
+    mode = "ffmpeg"
+
+    def __init__(self, video_path, width, height, fps=None, skip_frames=1, analysis_width=ANALYSIS_WIDTH,
+                 full_frames=True, start_frame=0, max_frames=None, keyframes_only=False, ffmpeg="ffmpeg"):
+        self.width, self.height = int(width), int(height)
+        analysis_width = min(int(analysis_width or self.width), self.width)
+        self.analysis_size = (analysis_width, max(1, int(self.height * analysis_width / self.width)))
+        super().__init__(video_path, (self.analysis_size[1], self.analysis_size[0], 3))
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.skip_frames = max(1, int(skip_frames))
+        self.start_frame = max(0, int(start_frame))
+        self.max_frames = max_frames
+        self.keyframes_only = keyframes_only
+        self.ffmpeg = ffmpeg
+        self.scaled = self.analysis_size != (self.width, self.height)
+        # A second output pipe needs fd inheritance (pass_fds), which Windows lacks
+        self.full_frames = full_frames and self.scaled and os.name != "nt"
+        if full_frames and self.scaled and not self.full_frames:
+            print(f"Warning: No full-resolution ffmpeg pipe on this platform - "
+                  f"full frames are the {self.analysis_size[0]}px analysis frames")
+        # Full frames stay in the decoder's yuv420p (needs even dimensions)
+        self.full_pix_fmt = "yuv420p" if self.width % 2 == 0 and self.height % 2 == 0 else "bgr24"
+        self.process = None
+        self._full_reader = None
+        self._closed = threading.Event()
+        self._log = deque(maxlen=20)
+        self.fallback = False  # True once ffmpeg failed and VideoCapture took over
+        self.full_pipe_lost = False  # True once the full-resolution reader died mid-stream
+
+    def _command(self, full_fd=None):
+        """ffmpeg arguments: one filter graph, analysis stream to stdout, full frames to pipe:full_fd"""
+        if self.keyframes_only:
+            select = "showinfo"  # logs each keyframe's timestamp -> frame number
+        elif self.skip_frames > 1:
+            select = f"select='not(mod(n+{self.start_frame + 1}\\,{self.skip_frames}))'"
+        else:
+            select = "null"
+        scale = f"scale={self.analysis_size[0]}:{self.analysis_size[1]}:flags=area"
+        if full_fd is not None:
+            graph = f"[0:v]{select},split=2[full][small];[small]{scale}[analysis]"
+        elif self.scaled:
+            graph = f"[0:v]{select},{scale}[analysis]"
+        else:
+            graph = f"[0:v]{select}[analysis]"
+
+        command = [self.ffmpeg, "-hide_banner", "-nostats", "-loglevel", "info" if self.keyframes_only else "error"]
+        # -fps_mode (per output) replaced the global -vsync in ffmpeg 5.1; 4.x rejects it
+        version = ffmpeg_version(self.ffmpeg)
+        fps_mode = version is None or version >= (5, 1)
+        if not fps_mode:
+            command += ["-vsync", "passthrough"]
+        if self.keyframes_only:
+            command += ["-skip_frame", "nokey"]
+        if self.start_frame:
+            command += ["-ss", f"{self.start_frame / self.fps:.6f}"]
+        command += ["-i", self.video_path, "-filter_complex", graph]
+        outputs = [("[analysis]", "bgr24", "pipe:1")]
+        if full_fd is not None:
+            outputs.append(("[full]", self.full_pix_fmt, f"pipe:{full_fd}"))
+        for label, pix_fmt, target in outputs:
+            command += ["-map", label, "-an"]
+            if fps_mode:
+                command += ["-fps_mode", "passthrough"]
+            if self.max_frames is not None:
+                command += ["-frames:v", str(int(self.max_frames))]
+            command += ["-f", "rawvideo", "-pix_fmt", pix_fmt, target]
+        return command
+
+    def _read_log(self, stream, timestamps):
+        """stderr reader: keyframe timestamps, plus the last lines for error messages"""
+        for line in iter(stream.readline, b""):
+            text = line.decode("utf-8", "replace")
+            if "Parsed_showinfo" in text:
+                match = _PTS_TIME.search(text)
+                if match:
+                    timestamps.put(float(match.group(1)))
+            else:
+                self._log.append(text.strip())
+        timestamps.put(None)
+
+    def _read_full_frames(self, stream, full_queue):
+        """Full-resolution pipe reader; runs in its own thread so neither pipe can stall ffmpeg"""
+        if self.full_pix_fmt == "yuv420p":
+            shape = (self.height * 3 // 2, self.width)  # I420: Y plane, then quarter-size U and V
+        else:
+            shape = (self.height, self.width, 3)
+        try:
+            while True:
+                frame = _read_frame(stream, shape)
+                while not self._closed.is_set():
+                    try:
+                        full_queue.put(frame, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if frame is None or self._closed.is_set():
+                    return
+        finally:
+            stream.close()
+
+    def _next_frame_num(self, frame_num, timestamps):
+        """Frame number of the next delivered frame"""
+        if self.keyframes_only:
+            try:
+                pts_time = timestamps.get(timeout=5)
+            except queue.Empty:
+                pts_time = None
+            # Strictly increasing even if a timestamp is missing
+            return max(frame_num + 1, int(round(pts_time * self.fps)) + 1 if pts_time is not None else 0)
+        # select keeps (start_frame + n + 1) % skip_frames == 0
+        return frame_num + self.skip_frames if frame_num else \
+            self.start_frame + self.skip_frames - self.start_frame % self.skip_frames
+
+    def __iter__(self):
+        self._closed.clear()
+        full_fd = None
+        if self.full_frames:
+            read_fd, full_fd = os.pipe()
+        try:
+            self.process = subprocess.Popen(
+                self._command(full_fd), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                bufsize=self.analysis_size[0] * self.analysis_size[1] * 3,
+                pass_fds=(full_fd,) if full_fd is not None else ()
+            )
+        except OSError as e:
+            if full_fd is not None:
+                os.close(read_fd)
+                os.close(full_fd)
+            yield from self._capture_fallback(str(e))
+            return
+        full_queue = None
+        if full_fd is not None:
+            os.close(full_fd)  # ffmpeg holds the write end now
+            full_queue = queue.Queue(maxsize=4)
+            self._full_reader = threading.Thread(
+                target=self._read_full_frames, args=(os.fdopen(read_fd, "rb"), full_queue), daemon=True
+            )
+            self._full_reader.start()
+        timestamps = queue.Queue()
+        log_reader = threading.Thread(target=self._read_log, args=(self.process.stderr, timestamps), daemon=True)
+        log_reader.start()
+
+        frame_num = 0
+        failure = None
+        try:
+            while True:
+                start = time.perf_counter()
+                frame = _read_frame(self.process.stdout, self.frame_shape)
+                full_frame = self._next_full_frame(frame, full_queue) if full_queue is not None else frame
+                if frame is None or full_frame is None:
+                    self.decode_time += time.perf_counter() - start
+                    break
+                frame_num = self._next_frame_num(frame_num, timestamps)
+                self.decode_time += time.perf_counter() - start
+                self.frames_seen = frame_num - self.start_frame
+                self.frames_decoded += 1
+                yield frame_num, frame, full_frame
+            if self.process.wait() != 0 and not self.frames_decoded:
+                log_reader.join(timeout=1)
+                failure = ' | '.join(self._log)[-300:]
+        finally:
+            self.close()
+        if failure is not None:
+            yield from self._capture_fallback(failure)
+
+    def _next_full_frame(self, frame, full_queue):
+        """
+        Full-resolution frame matching the analysis `frame` (None ends the stream)
+        Never blocks forever: a dead reader thread means the analysis frames are
+        scaled up from here on; a live but silent one ends the stream after
+        FULL_FRAME_TIMEOUT seconds.
+        """
+        if frame is None:
+            return None
+        if self.full_pipe_lost:
+            return self._full_from_bgr(frame)
+        deadline = time.perf_counter() + FULL_FRAME_TIMEOUT
+        while True:
+            try:
+                return full_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            if not self._full_reader.is_alive():
+                try:
+                    return full_queue.get_nowait()  # its last frame may have landed meanwhile
+                except queue.Empty:
+                    pass
+                print("Warning: Full-resolution ffmpeg pipe lost - using upscaled analysis frames")
+                self.full_pipe_lost = True
+                return self._full_from_bgr(frame)
+            if time.perf_counter() > deadline:
+                print(f"Warning: No full-resolution frame for {FULL_FRAME_TIMEOUT}s - ending the stream")
+                return None
+
+    def _full_from_bgr(self, frame):
+        """A BGR frame as a full frame: full size, in pix_fmt"""
+        if frame.shape[:2] != (self.height, self.width):
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420) if self.pix_fmt == "yuv420p" else frame
+
+    def _capture_fallback(self, reason):
+        """
+        Frames from cv2.VideoCapture when ffmpeg failed before its first frame
+        Shaped like this source's own: analysis frames at analysis_size and full
+        frames in pix_fmt. Keyframe sampling becomes every skip_frames-th frame.
+        """
+        print(f"Warning: ffmpeg decode failed ({reason or 'no output'}) - decoding with cv2.VideoCapture")
+        self.fallback = True
+        sampler = CaptureSampler(self.video_path, self.skip_frames, self.width, self.height,
+                                 self.start_frame, self.max_frames)
+        convert_time = 0.0
+        try:
+            for frame_num, frame, _ in sampler:
+                start = time.perf_counter()
+                if frame.shape[:2] != (self.height, self.width):
+                    frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+                small = cv2.resize(frame, self.analysis_size, interpolation=cv2.INTER_AREA) if self.scaled else frame
+                full = self._full_from_bgr(frame)
+                convert_time += time.perf_counter() - start
+                self.decode_time = sampler.decode_time + convert_time
+                self.frames_seen = sampler.frames_seen
+                self.frames_decoded = sampler.frames_decoded
+                yield frame_num, small, full
+        finally:
+            sampler.close()
+            self.decode_time = sampler.decode_time + convert_time
+            self.frames_seen = sampler.frames_seen
+
+    @property
+    def pix_fmt(self):
+        """Layout of the full frames: yuv420p on the full-resolution pipe, else BGR"""
+        return self.full_pix_fmt if self.full_frames else "bgr24"
+
+    def to_bgr(self, full_frame):
+        """BGR image of a full_frame (converts the yuv420p full-resolution frames)"""
+        if self.pix_fmt == "yuv420p":
+            return cv2.cvtColor(full_frame, cv2.COLOR_YUV2BGR_I420)
+        return full_frame
+
+    def close(self):
+        """Stop ffmpeg and the pipe readers"""
+        self._closed.set()
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+        if self._full_reader is not None:
+            self._full_reader.join(timeout=5)
+            self._full_reader = None
+
+    def stats(self):
+        """Decode stats, plus the analysis / full frame sizes"""
+        return {
+            **super().stats(),
+            'analysis_size': list(self.analysis_size),
+            'full_frames': self.full_frames,
+            'full_pix_fmt': self.pix_fmt,
+            'fallback': self.fallback,
+            'full_pipe_lost': self.full_pipe_lost
+        }
+
+
+class KeyframeSampler(FFmpegPipeSource):
+    """
+    I-frames only, decoded by ffmpeg (-skip_frame nokey) into the rawvideo pipes
+    Frame numbers come from each keyframe's timestamp (showinfo filter), so they
+    line up with the frame numbers of the other sources.
+    """
+
+    mode = "keyframes"
+
+    def __init__(self, video_path, width, height, fps, analysis_width=None, skip_frames=1, ffmpeg="ffmpeg"):
+        # skip_frames is only used by the VideoCapture fallback
+        super().__init__(video_path, width, height, fps, skip_frames=skip_frames, analysis_width=analysis_width,
+                         keyframes_only=True, ffmpeg=ffmpeg)
+
+
+def ffmpeg_available(ffmpeg="ffmpeg"):
+    """True if the ffmpeg binary is on PATH"""
+    return shutil.which(ffmpeg) is not None
+
+
+def ffmpeg_version(ffmpeg="ffmpeg"):
+    """(major, minor) of an ffmpeg binary, probed once; None if unknown (git snapshot builds, probe failed)"""
+    if ffmpeg not in _ffmpeg_versions:
+        version = None
+        try:
+            output = subprocess.run([ffmpeg, "-version"], capture_output=True, timeout=10).stdout
+            match = _FFMPEG_VERSION.search(output.decode("utf-8", "replace"))
+            if match:
+                version = (int(match.group(1)), int(match.group(2)))
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Warning: Could not probe ffmpeg version: {e}")
+        _ffmpeg_versions[ffmpeg] = version
+    return _ffmpeg_versions[ffmpeg]
+
+
+def open_frame_source(video_path, sampling="stride", skip_frames=1, width=None, height=None, fps=None,
+                      decoder=FRAME_DECODER, analysis_width=ANALYSIS_WIDTH, start_frame=0, max_frames=None):
+    """
+    Frame source for a sampling mode and decoder
+    "keyframes" sampling decodes I-frames only; otherwise every skip_frames-th
+    frame, through VideoCapture ("opencv") or the ffmpeg pipe ("ffmpeg", scaled
+    to analysis_width). The ffmpeg paths fall back to VideoCapture when ffmpeg
+    is not installed, or (inside the source) when it fails before its first frame.
+    On Windows the ffmpeg decoder has no full-resolution pipe and VideoCapture is used.
+    """
+    wants_ffmpeg = sampling == "keyframes" or decoder == "ffmpeg"
+    if decoder == "ffmpeg" and os.name == "nt":
+        # No second (full-resolution) pipe without pass_fds: the kept frames would be the
+        # downscaled analysis frames, so decode at full resolution instead
+        print("Warning: The ffmpeg decoder cannot stream full-resolution frames on Windows - "
+              "decoding with cv2.VideoCapture (keyframes: ffmpeg without downscaling)")
+        decoder = "opencv"
+        wants_ffmpeg = sampling == "keyframes"
+    if wants_ffmpeg and ffmpeg_available() and width and height:
+        if sampling == "keyframes":
+            return KeyframeSampler(video_path, width, height, fps,
+                                   analysis_width=analysis_width if decoder == "ffmpeg" else None,
+                                   skip_frames=skip_frames)
+        return FFmpegPipeSource(video_path, width, height, fps, skip_frames, analysis_width,
+                                start_frame=start_frame, max_frames=max_frames)
+    if wants_ffmpeg:
+        print("Warning: ffmpeg not found - decoding with cv2.VideoCapture (grab() sampling)")
+    return CaptureSampler(video_path, skip_frames, width, height, start_frame, max_frames)
@@ -0,0 +1,86 @@
+"""
+AURA Module 1 - Perceptual Hash Index
+64-bit dHash per frame + BK-tree for Hamming-distance lookups
+Lets the classifier flag near-duplicates of ANY earlier kept frame, not just the previous one
+"""
+
+import cv2
+import numpy as np
+
+# Bit weights for packing the 8x8 difference grid into one 64-bit integer
+_BIT_WEIGHTS = (1 << np.arange(64, dtype=np.uint64)).astype(np.uint64)
+
+
+def dhash(gray_thumb):
+    """
+    64-bit difference hash of a gray thumbnail
+    Shrinks to 9x8 and records whether each pixel is brighter than its right neighbour
+    """
+    small = cv2.resize(gray_thumb, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.sum(_BIT_WEIGHTS[bits]))
+
+
+def hamming_distance(hash1, hash2):
+    """Number of differing bits between two 64-bit hashes"""
+    return bin(hash1 ^ hash2).count("1")
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes
+    Children are keyed by their Hamming distance to the parent, so a radius
+    query only descends into branches that can still hold a match (triangle
+    inequality) - lookups stay sub-millisecond for thousands of kept frames.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, hash_value, item=None):
+        """Insert a hash with an optional payload (e.g. frame index)"""
+        node = (hash_value, item, {})
+        self.size += 1
+
+        if self.root is None:
+            self.root = node
+            return
+
+        current = self.root
+        while True:
+            distance = hamming_distance(hash_value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def nearest(self, hash_value, max_distance):
+        """
+        Closest stored hash within max_distance
+        Returns (distance, item) or None
+        """
+        if self.root is None:
+            return None
+
+        best = None
+        stack = [self.root]
+        while stack:
+            node_hash, item, children = stack.pop()
+            distance = hamming_distance(hash_value, node_hash)
+
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, item)
+                if distance == 0:
+                    break
+
+            radius = best[0] if best is not None else max_distance
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+
+        return best
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,105 @@
+"""
+AURA Module 1 - Inference Backends for the YOLO stage
+torch      : ultralytics PyTorch eager path (default)
+onnx       : ONNX Runtime FP32 on CPU
+onnx_int8  : ONNX Runtime with dynamic int8 weight quantization
+
+ONNX artifacts are exported / quantized ONCE and cached on disk. They are loaded
+through ultralytics' own ONNX Runtime backend, so pre/post-processing, NMS and the
+Results objects are identical to the PyTorch path.
+"""
+
+import os
+import shutil
+import threading
+from config import YOLO_WEIGHTS, ONNX_CACHE_DIR, ONNX_EXPORT_IMGSZ
+
+BACKENDS = ["torch", "onnx", "onnx_int8"]
+
+BACKEND_LABELS = {
+    "torch": "PyTorch (default)",
+    "onnx": "ONNX Runtime FP32",
+    "onnx_int8": "ONNX Runtime int8"
+}
+
+_export_lock = threading.Lock()
+# (backend, weights) -> backend the loaded model really runs on
+_loaded_backends = {}
+
+
+def _artifact_path(weights, suffix):
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    return os.path.join(ONNX_CACHE_DIR, f"{stem}_{ONNX_EXPORT_IMGSZ}{suffix}.onnx")
+
+
+def export_onnx(weights=YOLO_WEIGHTS):
+    """Export the PyTorch weights to ONNX (dynamic batch) once and return the cached path"""
+    path = _artifact_path(weights, "")
+    if os.path.exists(path):
+        return path
+
+    with _export_lock:
+        if not os.path.exists(path):
+            from ultralytics import YOLO
+            os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+            exported = YOLO(weights).export(format="onnx", imgsz=ONNX_EXPORT_IMGSZ, dynamic=True, simplify=True)
+            # Write to a temp name first so concurrent readers never see a partial file
+            tmp_path = path + ".tmp"
+            shutil.move(str(exported), tmp_path)
+            os.replace(tmp_path, path)
+    return path
+
+
+def quantize_onnx(weights=YOLO_WEIGHTS):
+    """Dynamic int8 weight quantization of the FP32 ONNX model, cached on disk"""
+    path = _artifact_path(weights, "_int8")
+    if os.path.exists(path):
+        return path
+
+    fp32_path = export_onnx(weights)
+    with _export_lock:
+        if not os.path.exists(path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            tmp_path = path + ".tmp.onnx"
+            quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QUInt8)
+            os.replace(tmp_path, path)
+    return path
+
+
+def resolve_weights(backend="torch", weights=YOLO_WEIGHTS):
+    """
+    Model file to hand to ultralytics.YOLO for a backend
+    Exports / quantizes on first use; raises if the backend's dependencies are missing
+    """
+    if backend == "torch":
+        return weights
+    if backend == "onnx":
+        return export_onnx(weights)
+    if backend == "onnx_int8":
+        return quantize_onnx(weights)
+    raise ValueError(f"Unknown inference backend: {backend}")
+
+
+def loaded_backend(backend="torch", weights=YOLO_WEIGHTS):
+    """Backend load_model actually used for a request (after any fallback), or None if never loaded"""
+    return _loaded_backends.get((backend, weights))
+
+
+def load_model(backend="torch", weights=YOLO_WEIGHTS):
+    """
+    Load YOLO for the requested backend
+    Falls back to the PyTorch weights (with a warning) if ONNX export or
+    ONNX Runtime is unavailable, so classification never stops working.
+    """
+    from ultralytics import YOLO
+
+    try:
+        model_path = resolve_weights(backend, weights)
+    except Exception as e:
+        print(f"Warning: {backend} backend unavailable ({e}) - falling back to PyTorch")
+        model_path = weights
+    _loaded_backends[(backend, weights)] = backend if model_path != weights else "torch"
+
+    if model_path.endswith(".onnx"):
+        return YOLO(model_path, task="detect")
+    return YOLO(model_path)
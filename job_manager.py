@@ -0,0 +1,225 @@
+"""
+AURA Module 1 - Job Manager
+Queue of video jobs for the whole process: submit / status / cancel by job ID.
+A fixed set of worker threads drains the queue highest priority first (FIFO
+within a priority); each running job gets its own BackgroundVideoProcessor, so
+jobs never share progress / result queues or stop events. Every job belongs to
+the session that submitted it - status and cancel with an owner only see that
+owner's jobs (owner=None is the operator view). Finished jobs stay queryable
+in a bounded history, oldest dropped first.
+"""
+
+import itertools
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from config import JOB_WORKERS, JOB_PRIORITIES, JOB_HISTORY
+
+ACTIVE_STATES = ("queued", "running")
+
+
+def _default_processor():
+    from background_processor import BackgroundVideoProcessor
+    return BackgroundVideoProcessor()
+
+
+class _Job:
+    """One submitted video job"""
+
+    def __init__(self, job_id, owner, priority, args):
+        self.job_id = job_id
+        self.owner = owner
+        self.priority = priority
+        self.args = args
+        self.seq = None
+        self.state = "queued"
+        self.processor = None
+        self.progress = {}
+        self.result = None
+        self.cancel_requested = False
+        self.submitted_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+
+class JobManager:
+    """
+    Priority job queue with `workers` concurrent video jobs
+    processor_factory builds the per-job processor: run(*args) processes the
+    video in the calling thread and returns the final result dict; its
+    progress_queue / stop_event carry progress and cancellation.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, history=JOB_HISTORY, processor_factory=_default_processor):
+        self.workers = max(1, int(workers))
+        self.history_size = max(1, int(history))
+        self.processor_factory = processor_factory
+        self._lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._active = {}  # job_id -> _Job, queued or running
+        self._history = OrderedDict()  # job_id -> _Job, finished (oldest first)
+        self._shutdown = threading.Event()
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"aura-job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, video_path, thresholds, fps, width, height, total_frames, priority="normal", owner=None):
+        """Queue a video job. Returns its job ID"""
+        if priority not in JOB_PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority} (expected one of {', '.join(JOB_PRIORITIES)})")
+        job = _Job(uuid.uuid4().hex[:12], owner, priority, (video_path, thresholds, fps, width, height, total_frames))
+        with self._lock:
+            job.seq = next(self._order)
+            self._active[job.job_id] = job
+        self._queue.put((JOB_PRIORITIES[priority], job.seq, job.job_id))
+        return job.job_id
+
+    def status(self, job_id, owner=None):
+        """Status dict of a job, or None if unknown / not owned by `owner`"""
+        with self._lock:
+            job = self._find(job_id, owner)
+            return self._describe(job) if job is not None else None
+
+    def cancel(self, job_id, owner=None):
+        """Cancel a queued job, or stop a running one (it keeps its partial result). Returns True if cancelled"""
+        with self._lock:
+            job = self._find(job_id, owner)
+            if job is None or job.state not in ACTIVE_STATES:
+                return False
+            job.cancel_requested = True
+            if job.state == "queued":
+                # The worker skips it when its queue entry comes up
+                self._finish(job, "cancelled")
+            elif job.processor is not None:
+                job.processor.stop_event.set()
+            return True
+
+    def jobs(self, owner=None):
+        """Status dicts of the active and remembered jobs, newest first"""
+        with self._lock:
+            jobs = list(self._active.values()) + list(self._history.values())
+            return [
+                self._describe(job)
+                for job in sorted(jobs, key=lambda j: j.seq, reverse=True)
+                if owner is None or job.owner == owner
+            ]
+
+    def stats(self):
+        """Queue statistics"""
+        with self._lock:
+            states = [job.state for job in self._active.values()]
+            return {
+                'workers': self.workers,
+                'queued': states.count("queued"),
+                'running': states.count("running"),
+                'history': len(self._history)
+            }
+
+    def shutdown(self, cancel=True):
+        """Stop the workers (cancelling every active job first)"""
+        if cancel:
+            for job_id in list(self._active):
+                self.cancel(job_id)
+        self._shutdown.set()
+        for thread in self._threads:
+            thread.join(timeout=10)
+
+    def _find(self, job_id, owner):
+        job = self._active.get(job_id) or self._history.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def _refresh(self, job):
+        """Fold the job's pending progress updates into its latest progress"""
+        if job.processor is not None:
+            updates = job.processor.get_progress()
+            if updates:
+                job.progress = updates[-1]
+
+    def _describe(self, job):
+        self._refresh(job)
+        position = None
+        if job.state == "queued":
+            # Jobs that will start before this one (same ordering as the queue)
+            rank = (JOB_PRIORITIES[job.priority], job.seq)
+            position = sum(
+                1 for other in self._active.values()
+                if other.state == "queued" and (JOB_PRIORITIES[other.priority], other.seq) < rank
+            )
+        return {
+            'job_id': job.job_id,
+            'owner': job.owner,
+            'priority': job.priority,
+            'state': job.state,
+            'queue_position': position,
+            'video_path': job.args[0],
+            'progress': job.progress,
+            'result': job.result,
+            'submitted_at': job.submitted_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at
+        }
+
+    def _finish(self, job, state):
+        """Move a job to the bounded history (call with the lock held)"""
+        job.state = state
+        job.finished_at = datetime.now()
+        self._active.pop(job.job_id, None)
+        self._history[job.job_id] = job
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+
+    def _worker(self):
+        while not self._shutdown.is_set():
+            try:
+                _, _, job_id = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            with self._lock:
+                job = self._active.get(job_id)
+                if job is None or job.state != "queued":
+                    continue  # cancelled while queued
+                job.state = "running"
+                job.started_at = datetime.now()
+            try:
+                # Built outside the lock (the first one imports the whole classifier stack)
+                processor = self.processor_factory()
+                with self._lock:
+                    job.processor = processor
+                    if job.cancel_requested:
+                        processor.stop_event.set()
+                result = processor.run(*job.args)
+            except Exception as e:
+                result = {'completed': False, 'error': str(e)}
+
+            with self._lock:
+                self._refresh(job)
+                job.result = result
+                if job.cancel_requested:
+                    state = "cancelled"
+                elif result and result.get('completed', False):
+                    state = "completed"
+                else:
+                    state = "failed"
+                self._finish(job, state)
+                job.processor = None
+
+
+# Process-wide job manager, shared by every Streamlit session
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Process-wide JobManager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -9,13 +9,16 @@ import os
 from datetime import datetime
 from typing import Dict
 import hashlib
+from frame_sources import open_frame_source
+from config import FRAME_DECODER, ANALYSIS_WIDTH
 
 
 class DroneVideoProcessor:
     """Process drone footage for secure distributed storage"""
     
-    def __init__(self, video_path: str):
+    def __init__(self, video_path: str, decoder: str = FRAME_DECODER):
         self.video_path = video_path
+        self.decoder = decoder
         self.video_info = {}
         self.metadata = {}
     
@@ -54,15 +57,27 @@ class DroneVideoProcessor:
                 sha256.update(chunk)
         return sha256.hexdigest()
     
-    def extract_frame(self, frame_number: int = 0) -> bytes:
-        """Extract a specific frame as thumbnail"""
-        cap = cv2.VideoCapture(self.video_path)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-        
-        ret, frame = cap.read()
-        cap.release()
+    def frame_source(self, skip_frames: int = 1, analysis_width: int = ANALYSIS_WIDTH, start_frame: int = 0,
+                     max_frames: int = None):
+        """Frame source (frame_sources.py) over this video: yields (frame_num, frame, full_frame)"""
+        info = self.video_info or self.extract_metadata()
+        return open_frame_source(self.video_path, "stride", skip_frames, info['width'], info['height'], info['fps'],
+                                 decoder=self.decoder, analysis_width=analysis_width,
+                                 start_frame=start_frame, max_frames=max_frames)
+    
+    def extract_frame(self, frame_number: int = 0, thumbnail_width: int = None) -> bytes:
+        """Extract a specific frame as JPEG bytes - full resolution, or at most thumbnail_width wide"""
+        source = self.frame_source(analysis_width=thumbnail_width, start_frame=frame_number, max_frames=1)
+        try:
+            _, frame, _ = next(iter(source), (None, None, None))
+        finally:
+            source.close()
         
-        if ret:
+        if frame is not None:
+            # The ffmpeg decoder already scaled it; VideoCapture frames are full size
+            if thumbnail_width and frame.shape[1] > thumbnail_width:
+                height = int(frame.shape[0] * thumbnail_width / frame.shape[1])
+                frame = cv2.resize(frame, (thumbnail_width, height), interpolation=cv2.INTER_AREA)
             # Convert to JPEG bytes
             _, buffer = cv2.imencode('.jpg', frame)
             return buffer.tobytes()
@@ -15,7 +15,9 @@ from datetime import datetime
 from classifier import classify_frame
 from ui_components import apply_custom_css, show_hero, get_category_badge, show_enhanced_video_comparison
 from video_generator import create_video_from_frames, create_video_from_frame_files
-from config import COLORS
+from config import COLORS, CLASSIFY_WORKERS, FRAME_DECODER, ANALYSIS_WIDTH, JOB_PRIORITIES
+from inference_backends import BACKENDS, BACKEND_LABELS
+from feature_store import load_feature_store, reclassify
 from background_processor import (
     init_background_state, get_background_status, start_background_processing,
     stop_background_processing, update_background_state
@@ -94,6 +96,77 @@ edge_threshold = st.sidebar.slider(
     help="Edge ratio threshold for content detection"
 )
 
+# Detection Mode
+detection_mode = st.sidebar.selectbox(
+    "🎞️ Detection Mode",
+    options=["motion_gate", "keyframe_tracker"],
+    format_func=lambda m: {
+        "motion_gate": "Every frame (motion-gated)",
+        "keyframe_tracker": "Keyframes + tracker"
+    }[m],
+    help="Keyframes + tracker runs YOLO only every few frames or on scene cuts and tracks objects in between"
+)
+
+# Sampling Mode
+sampling = st.sidebar.selectbox(
+    "🎬 Sampling Mode",
+    options=["stride", "shots", "keyframes"],
+    format_func=lambda m: {
+        "stride": "Fixed stride (max 300 frames)",
+        "shots": "Shot boundaries (whole video)",
+        "keyframes": "Keyframes only (ffmpeg)"
+    }[m],
+    help="Shot boundaries scans every frame, classifies one representative per shot and labels the rest of the shot; "
+         "keyframes only decodes just the I-frames (needs ffmpeg)"
+)
+
+# Frame decoder
+decoder = st.sidebar.selectbox(
+    "📼 Frame Decoder",
+    options=["opencv", "ffmpeg"],
+    index=["opencv", "ffmpeg"].index(FRAME_DECODER),
+    format_func=lambda d: {
+        "opencv": "OpenCV VideoCapture",
+        "ffmpeg": f"FFmpeg pipe ({ANALYSIS_WIDTH}px analysis)"
+    }[d],
+    help="FFmpeg pipe scales frames inside the decoder for analysis and ships full resolution only "
+         "for the sampled frames (falls back to OpenCV without ffmpeg)"
+)
+
+# Inference Backend
+backend = st.sidebar.selectbox(
+    "⚙️ Inference Backend",
+    options=BACKENDS,
+    format_func=lambda b: BACKEND_LABELS[b],
+    help="ONNX Runtime backends are exported once and cached; int8 is fastest on CPU-only devices"
+)
+
+# Persistent classification cache
+use_cache = st.sidebar.checkbox(
+    "♻️ Reuse cached results",
+    value=True,
+    help="Replay a finished run of the same video with the same settings instead of reclassifying"
+)
+
+# Process-pool mode: YOLO in worker processes instead of the background thread
+workers = st.sidebar.slider(
+    "🧮 Worker Processes",
+    min_value=0,
+    max_value=os.cpu_count() or 1,
+    value=CLASSIFY_WORKERS,
+    step=1,
+    help="0 runs YOLO in the background thread; each worker loads its own model copy"
+)
+
+# Job queue priority for the next submitted video
+job_priority = st.sidebar.selectbox(
+    "📋 Job Priority",
+    options=list(JOB_PRIORITIES),
+    index=list(JOB_PRIORITIES).index("normal"),
+    format_func=str.capitalize,
+    help="Queued videos run highest priority first; several jobs run at once on the shared model"
+)
+
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 📊 Current Settings")
 st.sidebar.info(f"""
@@ -128,7 +201,13 @@ st.session_state.thresholds = {
     'yolo_confidence': yolo_threshold,
     'ssim_threshold': ssim_threshold,
     'sky_threshold': sky_threshold,
-    'edge_threshold': edge_threshold
+    'edge_threshold': edge_threshold,
+    'detection_mode': detection_mode,
+    'sampling': sampling,
+    'decoder': decoder,
+    'backend': backend,
+    'use_cache': use_cache,
+    'workers': workers
 }
 
 tab1, tab2 = st.tabs(["📹 VIDEO ANALYSIS", "🖼️ IMAGE ANALYSIS"])
@@ -179,8 +258,8 @@ with tab1:
             if not bg_status['active']:
                 process_btn = st.button("🎬 START BACKGROUND PROCESSING", type="primary", use_container_width=True)
             else:
-                process_btn = False
-                st.button("🔄 Processing...", disabled=True, use_container_width=True)
+                # More videos can be queued while jobs are running
+                process_btn = st.button("➕ QUEUE THIS VIDEO", type="primary", use_container_width=True)
         
         with col2:
             if bg_status['active']:
@@ -201,14 +280,28 @@ with tab1:
         # Start background processing
         if process_btn:
             success, message = start_background_processing(
-                input_path, st.session_state.thresholds, fps, width, height, total_frames
+                input_path, st.session_state.thresholds, fps, width, height, total_frames, priority=job_priority
             )
             if success:
-                st.success("🚀 Background processing started! You can now navigate to other modules.")
+                st.success(f"🚀 {message}! You can now navigate to other modules.")
                 st.rerun()
             else:
                 st.error(f"Failed to start processing: {message}")
         
+        # This session's jobs (queued, running and recently finished)
+        if bg_status['jobs']:
+            with st.expander(f"📋 Job Queue ({len(bg_status['jobs'])} jobs)", expanded=bg_status['active']):
+                st.dataframe(pd.DataFrame([
+                    {
+                        'Job': job['job_id'],
+                        'State': job['state'] + (f" (#{job['queue_position'] + 1})" if job['queue_position'] is not None else ""),
+                        'Priority': job['priority'],
+                        'Processed': job['progress'].get('processed', 0),
+                        'Submitted': job['submitted_at'].strftime("%H:%M:%S")
+                    }
+                    for job in bg_status['jobs']
+                ]), use_container_width=True, hide_index=True)
+        
         # Show current processing status
         if bg_status['active'] or bg_status['progress']:
             st.markdown("---")
@@ -236,7 +329,8 @@ with tab1:
                 
                 with col2:
                     counts = progress['counts']
-                    saved = counts["Critical"] + counts["Important"] + counts["Normal"]
+                    # Shot-inherited frames carry a kept label but are never written
+                    saved = progress.get('saved', counts["Critical"] + counts["Important"] + counts["Normal"])
                     reduction = (1 - saved / max(progress['processed'], 1)) * 100
                     
                     st.markdown(f"""
@@ -260,7 +354,7 @@ with tab1:
                 counts = result['counts']
                 processed = result['processed']
                 elapsed_time = result['elapsed_time']
-                saved = counts["Critical"] + counts["Important"] + counts["Normal"]
+                saved = result['saved_frames']
                 reduction = result['reduction']
                 lifespan_extension = result['lifespan_extension']
                 
@@ -272,6 +366,108 @@ with tab1:
                 fm[3].metric("Write Reduction", f"{reduction:.1f}%", "Lower is better")
                 fm[4].metric("Lifespan Extension", f"{lifespan_extension:.1f}x", "Higher is better")
                 
+                # Where the time went: per-stage p50 / p95 / p99 for this run
+                if result.get('stage_latency'):
+                    with st.expander("⏱️ Stage Latency Breakdown", expanded=False):
+                        st.dataframe(pd.DataFrame([
+                            {
+                                'Stage': stage_name,
+                                'Samples': s['count'],
+                                'Total (ms)': round(s['total_ms'], 1),
+                                'p50 (ms)': round(s['p50_ms'], 3),
+                                'p95 (ms)': round(s['p95_ms'], 3),
+                                'p99 (ms)': round(s['p99_ms'], 3),
+                                'Share': f"{s['total_ms'] / (elapsed_time * 1000):.1%}" if elapsed_time else "-"
+                            }
+                            for stage_name, s in result['stage_latency'].items() if stage_name != 'end_to_end'
+                        ]), use_container_width=True)
+                        if 'end_to_end' in result['stage_latency']:
+                            e2e = result['stage_latency']['end_to_end']
+                            st.caption(
+                                f"Per-frame classification latency: p50 {e2e['p50_ms']:.2f} ms | "
+                                f"p95 {e2e['p95_ms']:.2f} ms | p99 {e2e['p99_ms']:.2f} ms"
+                            )
+                
+                if result.get('cache_hit'):
+                    st.caption("♻️ Replayed from the classification cache - same video and settings as an earlier run")
+                if result.get('yolo_reuse'):
+                    reuse = result['yolo_reuse']
+                    st.caption(
+                        f"🎯 YOLO inferences: {reuse['inferences']} | reused on low motion: {reuse['reused']} "
+                        f"({reuse['hit_rate']:.0%} of detection-stage frames)"
+                    )
+                if result.get('tracking'):
+                    tracking = result['tracking']
+                    st.caption(
+                        f"🎞️ YOLO keyframes: {tracking['keyframes']} | tracked frames: {tracking['tracked_frames']} "
+                        f"| scene cuts: {tracking['scene_cuts']} ({tracking['inference_fraction']:.0%} inference)"
+                    )
+                if result.get('decode'):
+                    decode = result['decode']
+                    st.caption(
+                        f"📼 Decode ({decode['mode']}): {decode['decode_fps']:.0f} video fps "
+                        f"| {decode['frames_decoded']} of {decode['frames_seen']} frames retrieved"
+                        + (f" | analysed at {decode['analysis_size'][0]}x{decode['analysis_size'][1]}"
+                           if decode.get('analysis_size') else "")
+                    )
+                if result.get('video_sink'):
+                    sink = result['video_sink']
+                    st.caption(
+                        f"🎥 Output ({sink['mode']}): {sink['frames_written']} frames streamed to the encoder "
+                        f"| {sink['output_bytes'] / 1e6:.1f} MB output | {sink['encode_time']:.1f}s encoding"
+                    )
+                if result.get('shots'):
+                    shots = result['shots']
+                    st.caption(
+                        f"🎬 Shots: {shots['shots']} ({shots['cuts']} cuts, {shots['drifts']} drifts) "
+                        f"| classified {shots['representatives']} of {shots['frames']} frames "
+                        f"({shots['classified_fraction']:.1%})"
+                    )
+                if result.get('resolution_cascade'):
+                    cascade_stats = result['resolution_cascade']
+                    escalated = " | ".join(f"{size}px: {n}" for size, n in cascade_stats['escalated'].items())
+                    st.caption(
+                        f"🔍 Resolution cascade: {cascade_stats['inferred'][0]} frames at {cascade_stats['levels'][0]}px "
+                        f"| escalated {escalated} ({cascade_stats['relative_cost']:.2f}x single-pass cost)"
+                    )
+                if result.get('near_duplicates'):
+                    st.caption(
+                        f"🔁 Perceptual-hash index removed {result['near_duplicates']} extra writes "
+                        f"(revisited scenes missed by the consecutive-frame SSIM check)"
+                    )
+                
+                # Live re-classification: sliders re-threshold the stored measurements instantly
+                feature_path = result.get('feature_store')
+                if feature_path and os.path.exists(feature_path):
+                    if st.session_state.get('feature_store_path') != feature_path:
+                        st.session_state.feature_store = load_feature_store(feature_path)
+                        st.session_state.feature_store_path = feature_path
+                    live = reclassify(st.session_state.feature_store, st.session_state.thresholds)
+                    live_counts = live['counts']
+                    # Shot mode stores the classified representatives only, while the job counts
+                    # include every inherited frame - deltas against the job would be meaningless
+                    shot_run = bool(result.get('shots'))
+                    
+                    def delta(live_value, job_value):
+                        return None if shot_run else live_value - job_value
+                    
+                    st.markdown("---")
+                    st.markdown("### 🎚️ Live Re-classification (current sliders)")
+                    if shot_run:
+                        st.caption(f"🎬 Shot sampling: covers the {len(live['category'])} classified representatives only")
+                    lc = st.columns(5)
+                    lc[0].metric("Critical", live_counts["Critical"], delta(live_counts["Critical"], counts["Critical"]))
+                    lc[1].metric("Important", live_counts["Important"], delta(live_counts["Important"], counts["Important"]))
+                    lc[2].metric("Normal", live_counts["Normal"], delta(live_counts["Normal"], counts["Normal"]))
+                    lc[3].metric("Discard", live_counts["Discard"], delta(live_counts["Discard"], counts["Discard"]))
+                    lc[4].metric("Write Reduction", f"{live['reduction']:.1f}%",
+                                 None if shot_run else f"{live['reduction'] - reduction:+.1f}%")
+                    kept = live['kept_frames']
+                    st.caption(
+                        f"Kept frames ({len(kept)}): {', '.join(str(n) for n in kept[:50])}"
+                        f"{' ...' if len(kept) > 50 else ''} - reprocess to regenerate the optimized video"
+                    )
+                
                 # Video results
                 if result['video_created']:
                     st.markdown("---")
@@ -0,0 +1,260 @@
+"""
+AURA Module 1 - Persistent Classification Cache
+Finished jobs are stored on disk keyed by (sampled video hash, model/backend id,
+threshold hash), one compact row per analysed frame index. Re-running the same
+upload with the same settings - after a sidebar round-trip, a Streamlit restart
+or by another operator - replays the stored results at decode speed.
+
+Only COMPLETE runs are replayed: the duplicate detector, motion gate and tracker
+carry state from frame to frame, so a half-cached run could not be resumed
+without changing its results. Whole runs are evicted least-recently-used once
+the database grows past its disk budget.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import config
+from config import (
+    CATEGORIES, YOLO_WEIGHTS, YOLO_BACKEND, RESULT_CACHE_PATH, RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_SAMPLE_CHUNKS, RESULT_CACHE_CHUNK_BYTES
+)
+
+# Bump when classification logic changes so old results are never replayed
+CACHE_VERSION = 1
+
+# Job settings that never change per-frame results
+_UNHASHED_KEYS = ('use_cache', 'batch_size', 'workers')
+
+# config.py constants that change per-frame results - hashed into every run key,
+# so editing one of them never replays results computed with the old value
+_CLASSIFICATION_CONSTANTS = (
+    'CRITICAL_CLASSES', 'IMPORTANT_CLASSES', 'SSIM_THRESHOLD', 'YOLO_IMGSZ', 'ONNX_EXPORT_IMGSZ',
+    'SKY_ROI_CROP', 'ROI_PADDING', 'ROI_MIN_SIZE', 'ROI_MAX_AREA',
+    'RESOLUTION_LEVELS', 'ESCALATION_MARGIN', 'ESCALATION_MIN_BOX_AREA',
+    'DUPLICATE_CHECK_STRIDE', 'PHASH_MAX_DISTANCE',
+    'NEAR_DUP_MIN_VARIANCE', 'NEAR_DUP_MIN_BITS', 'NEAR_DUP_MIN_SSIM', 'NEAR_DUP_MAX_COLOR_DIFF',
+    'MOTION_THRESHOLD', 'MOTION_MAX_REUSE', 'KEYFRAME_INTERVAL', 'SCENE_CUT_THRESHOLD', 'TRACK_WIDTH',
+    'SHOT_CUT_THRESHOLD', 'SHOT_DRIFT_THRESHOLD', 'SHOT_MIN_LENGTH', 'SHOT_REPRESENTATIVE_INTERVAL',
+    'ANALYSIS_WIDTH'
+)
+
+# Fallback labels written when YOLO could not run (missing model, inference error):
+# such runs are never stored, the next run must retry the detector
+_UNCACHEABLE_DETECTIONS = ('no_model', 'detection_ok_saved')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_key TEXT PRIMARY KEY,
+    video_hash TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    thresholds_hash TEXT NOT NULL,
+    n_frames INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frames (
+    run_key TEXT NOT NULL,
+    frame_idx INTEGER NOT NULL,
+    category INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    detected TEXT NOT NULL,
+    metric REAL NOT NULL,
+    PRIMARY KEY (run_key, frame_idx)
+) WITHOUT ROWID;
+"""
+
+
+def video_fingerprint(video_path, samples=RESULT_CACHE_SAMPLE_CHUNKS, chunk_size=RESULT_CACHE_CHUNK_BYTES):
+    """
+    Content hash of a video file (BLAKE2b-128 over its size and sampled chunks)
+    Reads at most samples * chunk_size bytes whatever the file size - the first
+    and last chunks hold the container header / index (MP4 moov), which changes
+    with any re-encode or edit. Files smaller than the sample are hashed whole.
+    """
+    size = os.path.getsize(video_path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    samples = max(2, int(samples))
+    with open(video_path, "rb") as f:
+        if size <= samples * chunk_size:
+            digest.update(f.read())
+        else:
+            step = (size - chunk_size) / (samples - 1)
+            for i in range(samples):
+                f.seek(int(i * step))
+                digest.update(f.read(chunk_size))
+    return digest.hexdigest()
+
+
+def thresholds_fingerprint(thresholds, **extra):
+    """Stable hash of the thresholds dict, the config.py classification constants and extra job parameters"""
+    relevant = {k: v for k, v in (thresholds or {}).items() if k not in _UNHASHED_KEYS}
+    constants = {name: getattr(config, name) for name in _CLASSIFICATION_CONSTANTS}
+    payload = json.dumps({'thresholds': relevant, 'config': constants, **extra}, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+def model_id(thresholds=None, weights=YOLO_WEIGHTS, backend=None):
+    """
+    Identifier of the detector a job runs with
+    `backend` is the backend actually loaded (an ONNX request falls back to torch
+    when export fails); without it the requested backend is used.
+    """
+    backend = backend or (thresholds or {}).get('backend', YOLO_BACKEND)
+    return f"{os.path.basename(weights)}:{backend}"
+
+
+class ResultCache:
+    """
+    SQLite-backed store of finished classification runs
+    Thread-safe; a single connection is shared behind a lock.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # Must be set before the first table exists; lets evict() return pages to the OS
+        self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(video_hash, model, thresholds_hash):
+        """Run key from its three components"""
+        return f"v{CACHE_VERSION}|{video_hash}|{model}|{thresholds_hash}"
+
+    def job_key(self, video_path, thresholds, backend=None, **extra):
+        """Run key for a job on a video file - hashes the file content"""
+        return self.make_key(
+            video_fingerprint(video_path), model_id(thresholds, backend=backend),
+            thresholds_fingerprint(thresholds, **extra)
+        )
+
+    def lookup(self, run_key):
+        """
+        Replay a complete run
+        Returns ({frame_idx: (category, confidence, detected, metric)}, summary) or None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM runs WHERE run_key = ?", (run_key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            rows = self._conn.execute(
+                "SELECT frame_idx, category, confidence, detected, metric FROM frames WHERE run_key = ?",
+                (run_key,)
+            ).fetchall()
+            self._conn.execute("UPDATE runs SET last_used = ? WHERE run_key = ?", (time.time(), run_key))
+            self._conn.commit()
+            self.hits += 1
+
+        results = {
+            frame_idx: (CATEGORIES[category], confidence, detected, metric)
+            for frame_idx, category, confidence, detected, metric in rows
+        }
+        return results, json.loads(row[0])
+
+    def store(self, run_key, results, summary=None):
+        """
+        Save a complete run
+        results: {frame_idx: (category, confidence, detected, metric[, latency])}
+        summary: JSON-serialisable job statistics replayed alongside the frames
+        Returns False (nothing stored) when any frame fell back because YOLO did not run.
+        """
+        if any(result[2] in _UNCACHEABLE_DETECTIONS for result in results.values()):
+            return False
+        video_hash, model, thresholds_hash = run_key.split("|")[1:4]
+        rows = [
+            (run_key, int(frame_idx), CATEGORIES.index(result[0]), float(result[1]), str(result[2]), float(result[3]))
+            for frame_idx, result in results.items()
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM frames WHERE run_key = ?", (run_key,))
+                self._conn.executemany("INSERT INTO frames VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (run_key, video_hash, model, thresholds_hash, len(rows),
+                     json.dumps(summary or {}, default=str), time.time())
+                )
+            self._evict()
+        return True
+
+    def discard(self, run_key):
+        """Remove one stored run (e.g. one that no longer matches the decoded frames)"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM frames WHERE run_key = ?", (run_key,))
+                self._conn.execute("DELETE FROM runs WHERE run_key = ?", (run_key,))
+
+    def size_bytes(self):
+        """Bytes used by live pages of the database"""
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def _evict(self):
+        """Drop least-recently-used runs until the database fits the disk budget (caller holds the lock)"""
+        while self.size_bytes() > self.max_bytes:
+            candidates = self._conn.execute("SELECT run_key FROM runs ORDER BY last_used LIMIT 2").fetchall()
+            if len(candidates) < 2:
+                break  # never evict the only (just written) run
+            oldest = candidates[0]
+            with self._conn:
+                self._conn.execute("DELETE FROM frames WHERE run_key = ?", oldest)
+                self._conn.execute("DELETE FROM runs WHERE run_key = ?", oldest)
+        self._conn.execute("PRAGMA incremental_vacuum")
+        self._conn.commit()
+
+    def clear(self):
+        """Remove every stored run"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM frames")
+                self._conn.execute("DELETE FROM runs")
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.commit()
+
+    def stats(self):
+        """Cache usage for the UI"""
+        with self._lock:
+            runs, frames = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(n_frames), 0) FROM runs").fetchone()
+            return {
+                'runs': runs,
+                'frames': frames,
+                'size_bytes': self.size_bytes(),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Shared cache instance
+_global_cache = None
+_global_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide ResultCache, or None if the cache directory is not writable"""
+    global _global_cache
+    if _global_cache is None:
+        with _global_cache_lock:
+            if _global_cache is None:
+                try:
+                    _global_cache = ResultCache()
+                except Exception as e:
+                    print(f"Warning: Classification cache unavailable: {e}")
+                    return None
+    return _global_cache
@@ -0,0 +1,103 @@
+"""
+AURA Module 1 - Shot-Boundary Detection
+Drone clips are mostly a handful of long, stable shots. The shot detector reads
+every frame's 24x24 HSV thumbnail (already computed by FrameFeatures), so whole
+videos can be scanned end to end; only shot boundaries and a few
+representative frames per shot go through the classifier, and their labels
+are propagated to the rest of the shot.
+
+A boundary is either a hard cut (colour histogram jumps between consecutive
+frames) or drift (a slow pan has moved far enough from the shot's first frame).
+"""
+
+import numpy as np
+from config import SHOT_CUT_THRESHOLD, SHOT_DRIFT_THRESHOLD, SHOT_MIN_LENGTH, SHOT_REPRESENTATIVE_INTERVAL
+
+# Marginal histogram bins per HSV channel (OpenCV hue is 0-179)
+_HSV_BINS = ((16, 180), (8, 256), (8, 256))
+
+
+def colour_histogram(hsv):
+    """Normalized hue, saturation and value histograms of a thumbnail, concatenated"""
+    pixels = hsv.reshape(-1, 3)
+    hists = []
+    for channel, (bins, span) in enumerate(_HSV_BINS):
+        hist = np.bincount(pixels[:, channel].astype(np.int64) * bins // span, minlength=bins)
+        hists.append(hist / max(len(pixels), 1))
+    return np.concatenate(hists)
+
+
+def histogram_distance(hist1, hist2):
+    """Mean half-L1 distance of the per-channel histograms (0 = same colours, 1 = disjoint)"""
+    return 0.5 * np.abs(hist1 - hist2).sum() / len(_HSV_BINS)
+
+
+class ShotDetector:
+    """
+    Per-stream shot-boundary detector
+    observe() every frame in order; it returns (is_boundary, is_representative).
+    Boundaries are always representatives; long shots get another one every
+    `representative_interval` frames. A cut is only accepted `min_length`
+    frames after the previous one, so flashes and flicker don't split shots.
+    """
+
+    def __init__(self, cut_threshold=SHOT_CUT_THRESHOLD, drift_threshold=SHOT_DRIFT_THRESHOLD,
+                 min_length=SHOT_MIN_LENGTH, representative_interval=SHOT_REPRESENTATIVE_INTERVAL):
+        self.cut_threshold = cut_threshold
+        self.drift_threshold = drift_threshold
+        self.min_length = max(1, int(min_length))
+        self.representative_interval = max(1, int(representative_interval))
+        self.reset()
+
+    def reset(self):
+        """Forget the stream and clear the stats"""
+        self.prev_hist = None
+        self.shot_hist = None
+        self.shot_length = 0
+        self.since_representative = 0
+        self.frames = 0
+        self.shots = 0
+        self.cuts = 0
+        self.drifts = 0
+        self.representatives = 0
+
+    def observe(self, features):
+        """Register the next frame (FrameFeatures). Returns (is_boundary, is_representative)"""
+        hist = colour_histogram(features.hsv)
+        self.frames += 1
+
+        boundary = self.prev_hist is None
+        if not boundary and self.shot_length >= self.min_length:
+            if histogram_distance(hist, self.prev_hist) > self.cut_threshold:
+                self.cuts += 1
+                boundary = True
+            elif histogram_distance(hist, self.shot_hist) > self.drift_threshold:
+                self.drifts += 1
+                boundary = True
+        self.prev_hist = hist
+
+        if boundary:
+            self.shots += 1
+            self.shot_hist = hist
+            self.shot_length = 0
+            self.since_representative = 0
+        self.shot_length += 1
+
+        representative = boundary or self.since_representative >= self.representative_interval
+        if representative:
+            self.representatives += 1
+            self.since_representative = 0
+        self.since_representative += 1
+        return boundary, representative
+
+    def stats(self):
+        """Shot statistics for job results"""
+        return {
+            'frames': self.frames,
+            'shots': self.shots,
+            'cuts': self.cuts,
+            'drifts': self.drifts,
+            'representatives': self.representatives,
+            'classified_fraction': self.representatives / self.frames if self.frames else 0.0,
+            'mean_shot_length': self.frames / self.shots if self.shots else 0.0
+        }
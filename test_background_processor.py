@@ -0,0 +1,135 @@
+"""
+Tests for the Module 1 background pipeline (decoder thread -> classifier -> encoder thread)
+Runs without YOLO weights - detection-stage frames are classified "no_model"
+"""
+
+import threading
+import cv2
+import numpy as np
+from background_processor import BackgroundVideoProcessor
+from classifier_engine import get_engine
+from feature_store import FeatureRecorder, load_feature_store
+from frame_sources import open_frame_source
+from test_classifier import make_scene_frame, make_sky_frame, make_water_frame
+
+THRESHOLDS = {'use_cache': False, 'workers': 0}
+
+
+def write_clip(path, frames, fps=30):
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+def mixed_clip(path, n_frames=90):
+    """Scenes, sky and water segments, with repeated scenes for the duplicate stages"""
+    frames = []
+    for i in range(n_frames):
+        if i % 9 == 4:
+            frames.append(make_sky_frame(120, 160))
+        elif i % 9 == 7:
+            frames.append(make_water_frame(120, 160))
+        else:
+            frames.append(make_scene_frame(i // 3, 120, 160))
+    return write_clip(path, frames)
+
+
+def pipeline_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("aura-pipeline")]
+
+
+def test_pipeline_matches_single_threaded_order(tmp_path):
+    path = mixed_clip(tmp_path / "mixed.mp4")
+    result = BackgroundVideoProcessor().run(path, dict(THRESHOLDS), 30, 160, 120, 90)
+    assert result['completed'], result.get('error')
+
+    # Single-threaded reference: same frames, same batches, one job, no helper threads
+    job = get_engine().job(dict(THRESHOLDS))
+    recorder = FeatureRecorder(job.detector.hash_distance)
+    source = open_frame_source(path, None, 1, 160, 120, 30)
+    items = list(source)
+    counts = {"Critical": 0, "Important": 0, "Normal": 0, "Discard": 0, "Duplicates": 0}
+    for b in range(0, len(items), job.batch_size):
+        batch = items[b:b + job.batch_size]
+        for category, _, detected, _, _ in job.classify([f for _, f, _ in batch], recorder=recorder):
+            counts[category] += 1
+            counts["Duplicates"] += category == "Discard" and detected in ("duplicate_frame", "near_duplicate")
+    reference = recorder.build([n for n, _, _ in items])
+
+    assert result['counts'] == counts and result['processed'] == len(items)
+    assert result['saved_frames'] == len(items) - counts["Discard"]
+    store = load_feature_store(result['feature_store'])
+    assert sorted(store) == sorted(reference)
+    for key in reference:
+        assert np.array_equal(store[key], reference[key]), key
+    assert not pipeline_threads()
+
+
+class StoppingProcessor(BackgroundVideoProcessor):
+    """Requests a stop once the classifier reaches `stop_at`"""
+
+    stop_at = 60
+
+    def _next_frame(self, frames_queue):
+        item = super()._next_frame(frames_queue)
+        if item is not None and item[0] >= self.stop_at:
+            self.stop_event.set()
+        return item
+
+
+def test_stop_joins_helper_threads(tmp_path):
+    frames = [make_scene_frame(i, 120, 160) for i in range(300)]
+    path = write_clip(tmp_path / "scenes.mp4", frames)
+    processor = StoppingProcessor()
+    started, _ = processor.start_processing(path, dict(THRESHOLDS), 30, 160, 120, 300)
+    assert started
+    processor.processing_thread.join(timeout=30)
+
+    assert not processor.processing_thread.is_alive() and not processor.is_active()
+    assert not pipeline_threads()
+    result = processor.get_result()
+    # A stopped job keeps (and finalizes) what it classified so far
+    assert result['completed'] and StoppingProcessor.stop_at <= result['processed'] < 300
+    assert result['saved_frames'] <= result['processed']
+
+
+def test_shot_mode_saves_only_classified_frames(tmp_path):
+    # Two static shots: a textured scene, then a different red-tinted one after a hard cut
+    scene = make_scene_frame(1, 120, 160)
+    tinted = make_scene_frame(2, 120, 160) // 2 + np.array([0, 0, 120], dtype=np.uint8)
+    path = write_clip(tmp_path / "static.mp4", [scene] * 200 + [tinted] * 120)
+    thresholds = {**THRESHOLDS, 'sampling': 'shots'}
+    result = BackgroundVideoProcessor().run(path, thresholds, 30, 160, 120, 320)
+    assert result['completed'], result.get('error')
+
+    # Every frame is read, only the shot starts are saved: the interval
+    # representative of the first shot (frame 150) is a duplicate of its first frame
+    assert result['processed'] == 320
+    assert result['shots']['shots'] == 2 and result['shots']['representatives'] == 3
+    assert result['saved_frames'] == 2
+    assert result['reduction'] == (1 - 2 / 320) * 100
+    # Inherited frames take their representative's label and count as duplicates
+    assert result['counts']['Duplicates'] == 318
+    assert result['counts']['Discard'] == 50 and result['counts']['Normal'] == 270
+
+
+def test_cached_run_missing_frames_is_a_cache_miss(tmp_path, monkeypatch):
+    import background_processor
+    from result_cache import ResultCache
+    path = mixed_clip(tmp_path / "mixed.mp4")
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    monkeypatch.setattr(background_processor, "get_result_cache", lambda: cache)
+    thresholds = {**THRESHOLDS, 'use_cache': True}
+    # A stored run that only covers the first 60 decoded frames
+    run_key = cache.job_key(path, thresholds, backend="torch", skip_frames=1)
+    cache.store(run_key, {n: ("Normal", 0.7, "no_objects_but_saved", 0.0) for n in range(60)})
+
+    result = BackgroundVideoProcessor().run(path, dict(thresholds), 30, 160, 120, 90)
+    assert result['completed'], result.get('error')
+    assert result['processed'] == 90 and not result['cache_hit']
+    assert result['counts']['Normal'] >= 60
+    assert cache.lookup(run_key) is None  # the stale run is dropped
+    assert not pipeline_threads()
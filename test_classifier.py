@@ -0,0 +1,264 @@
+"""
+Tests for AURA Module 1 classifier heuristics
+Runs without YOLO weights - the detection stage falls back to "no_model"
+"""
+
+import cv2
+import numpy as np
+from frame_metrics import ssim_batch
+from tracker import KeyframeTracker
+from shot_detector import ShotDetector
+from classifier import (
+    FrameFeatures, DuplicateDetector, MotionGate, ResolutionCascade, classify_frame,
+    classify_frames, evaluate_heuristics, is_empty_sky, is_static_water, non_sky_roi
+)
+
+
+def make_sky_frame(height=480, width=640):
+    """Uniform blue sky (BGR)"""
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[:, :] = [230, 150, 90]
+    return frame
+
+
+def make_water_frame(height=480, width=640):
+    """Uniform green-teal water (BGR) - outside the blue sky hue range"""
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[:, :] = [101, 120, 49]
+    return frame
+
+
+def make_scene_frame(seed=0, height=480, width=640):
+    """Random textured frame that passes every heuristic stage"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def test_frame_features_match_stage_functions():
+    for frame in [make_sky_frame(), make_water_frame(), make_scene_frame()]:
+        features = FrameFeatures(frame)
+        assert is_empty_sky(features) == is_empty_sky(frame)
+        assert is_static_water(features) == is_static_water(frame)
+        assert features.small.shape == (24, 24, 3)
+
+
+def test_sky_and_water_are_discarded():
+    assert classify_frame(make_sky_frame())[2] == "empty_sky"
+    assert classify_frame(make_water_frame())[2] == "static_water"
+
+
+def test_classify_frames_matches_single_frame_path():
+    frames = [make_sky_frame(), make_scene_frame(1), make_water_frame(), make_scene_frame(2)]
+    batched = classify_frames(frames, batch_size=2)
+    single = [classify_frame(frame) for frame in frames]
+    assert [r[:4] for r in batched] == [r[:4] for r in single]
+
+
+def test_duplicate_detector_checks_every_stride_frame():
+    frame = make_scene_frame(3)
+    detector = DuplicateDetector(threshold=0.97, check_stride=2)
+    results = [classify_frame(frame, thresholds=None, detector=detector)[2] for _ in range(5)]
+    # First frame has no predecessor; afterwards every 2nd repeat is checked
+    assert results == ["no_model", "no_model", "duplicate_frame", "no_model", "duplicate_frame"]
+    stats = detector.stats()
+    assert stats['checks'] == 2 and stats['duplicates'] == 2
+    assert detector.prev_thumb.shape == (24, 24)
+
+
+def test_hash_index_flags_revisited_scene():
+    scene_a, scene_b = make_scene_frame(4), make_scene_frame(5)
+    detector = DuplicateDetector(threshold=0.97, hash_distance=4)
+    results = classify_frames([scene_a, scene_b, scene_a.copy()], detector=detector)
+    assert [r[2] for r in results] == ["no_model", "no_model", "near_duplicate"]
+    assert detector.stats()['near_duplicates'] == 1
+
+
+def test_hash_index_keeps_flat_frames_and_new_objects():
+    field = np.full((480, 640, 3), (120, 130, 125), dtype=np.uint8)
+    other_field = np.full((480, 640, 3), (60, 90, 160), dtype=np.uint8)
+    boat = field.copy()
+    boat[300:340, 200:260] = (0, 0, 255)
+    # Textured ground: indexed, but the hash match alone must not discard the new object
+    sand = cv2.resize(np.random.default_rng(0).integers(90, 170, (60, 80, 3), dtype=np.uint8), (640, 480))
+    person = sand.copy()
+    person[300:340, 200:260] = (0, 0, 255)
+    for first, second in [(field, other_field), (field, boat), (sand, person)]:
+        detector = DuplicateDetector(threshold=0.97, hash_distance=4)
+        results = classify_frames([first, second], detector=detector)
+        assert results[1][2] != "near_duplicate"
+        assert detector.stats()['near_duplicates'] == 0
+
+
+def test_ssim_batch_matches_skimage():
+    from skimage.metrics import structural_similarity as ssim
+    rng = np.random.default_rng(6)
+    stack1 = rng.integers(0, 255, (20, 24, 24), dtype=np.uint8)
+    noise = rng.integers(-20, 20, stack1.shape)
+    stack2 = np.clip(stack1.astype(int) + noise, 0, 255).astype(np.uint8)
+    stack2[:5] = stack1[:5]
+    expected = np.array([ssim(a, b) for a, b in zip(stack1, stack2)])
+    assert np.allclose(ssim_batch(stack1, stack2), expected, atol=1e-9)
+
+
+def test_motion_gate_reuses_results_on_static_footage():
+    frame = make_scene_frame(7)
+    moved = np.roll(frame, 200, axis=1)
+    detector = DuplicateDetector(check_stride=1000)  # keep SSIM out of the way
+    gate = MotionGate(threshold=0.03, max_reuse=3)
+    classify_frames([frame] * 6 + [moved], detector=detector, motion_gate=gate)
+    stats = gate.stats()
+    # infer, reuse x3, forced infer, reuse, then a large motion forces inference
+    assert (stats['inferences'], stats['reused']) == (3, 4)
+
+
+def test_tracker_propagates_boxes_between_keyframes():
+    tracker = KeyframeTracker(keyframe_interval=3)
+    frame = make_scene_frame(8)
+    features = FrameFeatures(frame)
+    tracker.observe(features)
+    assert tracker.take_keyframe()
+    tracker.apply((0.0, 0.0), [("person", 0.9, (0.4, 0.4, 0.5, 0.5))])
+    # Two tracked frames, the scene content moving right by 30% each time
+    for _ in range(2):
+        tracker.observe(features)
+        assert not tracker.take_keyframe()
+        tracker.apply((0.3, 0.0))
+    assert tracker.objects() == []  # person has left the frame
+    tracker.observe(features)
+    assert tracker.take_keyframe()
+
+
+def test_resolution_cascade_escalates_only_ambiguous_frames(monkeypatch):
+    import classifier
+    # Frame 0: confident large box; frame 1: near-threshold at low res, confident at 320
+    def fake_detect(features_list, thresholds, imgsz=256, margin=0.0, floor=None):
+        out = []
+        for features in features_list:
+            if features.frame[0, 0, 0] == 0:
+                out.append(("ok", [("car", 0.9, (0.0, 0.0, 0.5, 0.5))]))
+            else:
+                conf = 0.45 if imgsz < 320 else 0.8
+                out.append(("ok", [("person", conf, (0.2, 0.2, 0.4, 0.4))]))
+        return out
+    monkeypatch.setattr(classifier, "_detect", fake_detect)
+    frames = [np.zeros((64, 64, 3), np.uint8), np.full((64, 64, 3), 50, np.uint8)]
+    cascade = ResolutionCascade(levels=(160, 320, 640), margin=0.15)
+    outcomes = classifier._detect_adaptive([FrameFeatures(f) for f in frames], {'yolo_confidence': 0.5}, cascade)
+    assert outcomes[0] == ("ok", [("car", 0.9, (0.0, 0.0, 0.5, 0.5))])
+    assert outcomes[1] == ("ok", [("person", 0.8, (0.2, 0.2, 0.4, 0.4))])
+    assert cascade.stats()['inferred'] == [2, 1, 0]
+    # Empty frames stop at the first level, so it must not be smaller than the old fixed size
+    from config import YOLO_IMGSZ
+    assert ResolutionCascade().levels[0] >= YOLO_IMGSZ
+
+
+def test_sky_roi_crops_to_the_ground_below_the_horizon():
+    frame = make_sky_frame()
+    frame[300:] = make_scene_frame(9)[300:]
+    x1, y1, x2, y2 = FrameFeatures(frame).sky_roi
+    assert (x1, x2, y2) == (0.0, 1.0, 1.0)
+    assert 0.5 < y1 < 300 / 480
+    # Mostly ground: not worth cropping; a single non-sky cell still gets the minimum crop
+    assert FrameFeatures(make_scene_frame(9)).sky_roi is None
+    sky = np.full((24, 24), 255, np.uint8)
+    sky[0, 0] = 0
+    assert non_sky_roi(sky, padding=1, min_size=0.4) == (0.0, 0.0, 0.4, 0.4)
+
+
+def test_sky_roi_keeps_white_boat_on_blue_sea():
+    # Sky, a grey shoreline, then blue sea with a white boat in the lower half
+    frame = make_sky_frame()
+    frame[200:240] = [90, 110, 120]
+    frame[380:420, 300:360] = [250, 250, 250]
+    x1, y1, x2, y2 = FrameFeatures(frame).sky_roi or (0.0, 0.0, 1.0, 1.0)
+    assert y1 <= 200 / 480 and y2 >= 420 / 480 and x1 <= 300 / 640 and x2 >= 360 / 640
+    # Open horizon: the sea touches the sky, the boat alone is still never sky
+    frame = make_sky_frame()
+    frame[380:420, 300:360] = [250, 250, 250]
+    x1, y1, x2, y2 = FrameFeatures(frame).sky_roi
+    assert y1 <= 380 / 480 and y2 >= 420 / 480 and x1 <= 300 / 640 and x2 >= 360 / 640
+
+
+def test_vectorized_post_processing_matches_per_box_loop():
+    from types import SimpleNamespace
+    from classifier import _categorize_detections, _extract_batch
+    from config import CRITICAL_CLASSES, IMPORTANT_CLASSES
+    names = {i: name for i, name in enumerate(['person', 'car', 'tree', 'boat', 'bench', 'dog'])}
+    rng = np.random.default_rng(10)
+    results = []
+    for n_boxes in (0, 1, 5, 40):
+        conf = np.sort(rng.random(n_boxes).astype(np.float32))[::-1]  # YOLO returns boxes by confidence
+        boxes = SimpleNamespace(conf=conf, cls=rng.integers(0, 6, n_boxes).astype(np.float32),
+                                xyxyn=rng.random((n_boxes, 4)).astype(np.float32))
+        results.append(SimpleNamespace(names=names, boxes=boxes))
+
+    for result, detections in zip(results, _extract_batch(results, 0.3)):
+        # Reference: the original per-box loop and list lookups
+        expected = [(names[int(c)], float(p), tuple(b.tolist()))
+                    for p, c, b in zip(result.boxes.conf, result.boxes.cls, result.boxes.xyxyn) if float(p) > 0.3]
+        assert sorted(detections) == sorted(expected)
+        critical = [d for d in expected if d[0] in CRITICAL_CLASSES]
+        important = [d for d in expected if d[0] in IMPORTANT_CLASSES]
+        best = (critical or important or expected or [None])[0]
+        category = _categorize_detections(detections, 0.0)
+        if best is None:
+            assert category[2] == "no_objects_but_saved"
+        else:
+            assert category[1:3] == (best[1], best[0])
+
+
+def test_engine_jobs_keep_separate_stream_state():
+    from classifier_engine import ClassifierEngine
+    engine = ClassifierEngine(torch_threads=None, cv2_threads=None)
+    frames = [make_scene_frame(0)] * 3
+    first, second = engine.job(), engine.job({'ssim_threshold': 0.99})
+
+    first.classify(frames[:2])
+    # A new job's detectors have not seen `first`'s frames, so its first frame is kept
+    assert second.classify(frames[:1])[0][0] != "Discard"
+    assert first.classify(frames[2:])[0][2] in ("duplicate_frame", "near_duplicate")
+    assert second.thresholds['ssim_threshold'] == 0.99 and first.thresholds['ssim_threshold'] == 0.97
+    assert engine.stats()['jobs'] == 2 and engine.stats()['frames'] == 4
+
+
+def test_process_pool_matches_in_process_classification():
+    from classifier_engine import ClassifierEngine
+    from classifier_pool import ClassificationPool
+    engine = ClassifierEngine(torch_threads=None, cv2_threads=None)
+    frames = [make_scene_frame(i // 2, 120, 160) for i in range(12)] + [make_sky_frame(120, 160)]
+    expected = engine.job().classify(frames)
+
+    results = []
+    busy_before = engine.busy_time
+    with ClassificationPool(engine.job(), 1, frames[0].shape) as pool:
+        for b in range(0, len(frames), 4):
+            results += [r for _, batch in pool.submit(frames[b:b + 4]) for r in batch]
+        results += [r for _, batch in pool.drain() for r in batch]
+    assert [r[:4] for r in results] == [r[:4] for r in expected]
+    # Pool batches report their real busy time, so engine fps is not inflated
+    assert engine.busy_time > busy_before
+
+
+def test_shot_detector_splits_cuts_and_spaces_representatives():
+    shots = ShotDetector(representative_interval=4)
+    frames = [make_sky_frame()] * 10 + [make_water_frame()] * 10 + [make_scene_frame(s) for s in range(10)]
+    observed = [shots.observe(FrameFeatures(frame)) for frame in frames]
+    assert [i for i, (boundary, _) in enumerate(observed) if boundary] == [0, 10, 20]
+    # A new representative at every cut and every 4 frames within a shot
+    assert [i for i, (_, representative) in enumerate(observed) if representative] == [0, 4, 8, 10, 14, 18, 20, 24, 28]
+    assert shots.stats()['shots'] == 3 and shots.stats()['cuts'] == 2
+
+
+def test_batched_heuristics_match_per_frame_stages():
+    frames = [make_sky_frame(), make_water_frame(), make_scene_frame(5)]
+    batched = [FrameFeatures(frame) for frame in frames]
+    decisions = evaluate_heuristics(batched)
+    for frame, features, decision in zip(frames, batched, decisions):
+        reference = FrameFeatures(frame)
+        is_sky, blue_ratio, edge_ratio = is_empty_sky(reference)
+        is_water, water_ratio = is_static_water(reference) if not is_sky else (False, 0.0)
+        assert decision == (is_sky, blue_ratio, edge_ratio, is_water, water_ratio)
+        # Seeded caches hold the per-frame values
+        assert features.variance == reference.variance and features.white_ratio == reference.white_ratio
+        assert features.dhash == reference.dhash and features.sky_roi == reference.sky_roi
+    assert [d[0] for d in decisions] == [True, False, False] and decisions[1][3]
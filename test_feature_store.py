@@ -0,0 +1,59 @@
+"""
+Tests for the columnar feature store and vectorized re-classification
+Runs without YOLO weights - detection-stage frames are recorded as "no_model"
+"""
+
+import numpy as np
+from classifier import DuplicateDetector, classify_frames
+from feature_store import FeatureRecorder, load_feature_store, reclassify, save_feature_store
+from config import CATEGORIES
+from test_classifier import make_scene_frame, make_sky_frame, make_water_frame
+
+
+def make_stream():
+    frames = []
+    for i in range(40):
+        if i % 7 == 0:
+            frames.append(make_sky_frame())
+        elif i % 7 == 3:
+            frames.append(make_water_frame())
+        else:
+            # Runs of the same scene with growing sensor noise: a spread of SSIM values
+            noise = np.random.default_rng(i).integers(-1, 2, (480, 640, 3)) * (i % 6) * 12
+            frames.append(np.clip(make_scene_frame(i // 6).astype(int) + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def run_job(frames, thresholds, recorder=None):
+    detector = DuplicateDetector(thresholds['ssim_threshold'], check_stride=1, hash_distance=4)
+    results = []
+    for b in range(0, len(frames), 8):
+        results += classify_frames(frames[b:b + 8], thresholds=thresholds, detector=detector, recorder=recorder)
+    return results
+
+
+def labels(live):
+    return [(CATEGORIES[c], d) for c, d in zip(live['category'], live['detected'])]
+
+
+def test_reclassify_reproduces_the_job(tmp_path):
+    frames = make_stream()
+    thresholds = {'yolo_confidence': 0.5, 'ssim_threshold': 0.97}
+    recorder = FeatureRecorder(phash_distance=4)
+    results = run_job(frames, thresholds, recorder)
+    path = save_feature_store(recorder.build(range(1, len(frames) + 1)), str(tmp_path / "features.npz"))
+
+    live = reclassify(load_feature_store(path), thresholds)
+    assert labels(live) == [(r[0], r[2]) for r in results]
+    assert live['processed'] == len(frames)
+    assert list(live['kept_frames']) == [i + 1 for i, r in enumerate(results) if r[0] != "Discard"]
+
+
+def test_reclassify_with_new_ssim_threshold_matches_a_rerun():
+    frames = make_stream()
+    recorder = FeatureRecorder(phash_distance=4)
+    run_job(frames, {'yolo_confidence': 0.5, 'ssim_threshold': 0.97}, recorder)
+    store = recorder.build(range(len(frames)))
+
+    looser = {'yolo_confidence': 0.5, 'ssim_threshold': 0.5}
+    assert labels(reclassify(store, looser)) == [(r[0], r[2]) for r in run_job(frames, looser)]
@@ -0,0 +1,119 @@
+"""
+Tests for the Module 1 frame sources (grab() sampling, ffmpeg pipe, keyframe-only decoding)
+"""
+
+import os
+import cv2
+import numpy as np
+import pytest
+from frame_sources import (
+    CaptureSampler, FFmpegPipeSource, KeyframeSampler, ffmpeg_available, ffmpeg_version, open_frame_source
+)
+
+
+def write_video(path, n_frames=40, size=(160, 120)):
+    """Short clip whose frames are all different, plus every frame as read() returns it"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 10, size)
+    rng = np.random.default_rng(0)
+    for _ in range(n_frames):
+        writer.write(cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), size))
+    writer.release()
+    cap = cv2.VideoCapture(str(path))
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def test_grab_sampler_matches_read_every_frame(tmp_path):
+    frames = write_video(tmp_path / "clip.mp4")
+    sampler = CaptureSampler(str(tmp_path / "clip.mp4"), skip_frames=3)
+    sampled = list(sampler)
+    assert [n for n, _, _ in sampled] == list(range(3, len(frames) + 1, 3))
+    assert all(np.array_equal(frame, frames[n - 1]) and full is frame for n, frame, full in sampled)
+    stats = sampler.stats()
+    assert stats['frames_seen'] == len(frames) and stats['frames_decoded'] == len(sampled)
+
+
+@pytest.mark.skipif(not ffmpeg_available(), reason="ffmpeg not installed")
+def test_keyframe_sampler_numbers_frames_like_capture(tmp_path):
+    frames = write_video(tmp_path / "clip.mp4")
+    sampled = list(KeyframeSampler(str(tmp_path / "clip.mp4"), 160, 120, 10))
+    assert sampled and sampled[0][0] == 1 and len(sampled) < len(frames)
+    for n, frame, _ in sampled:
+        assert np.abs(frame.astype(int) - frames[n - 1]).mean() < 2
+
+
+@pytest.mark.skipif(not ffmpeg_available(), reason="ffmpeg not installed")
+def test_ffmpeg_pipe_scales_analysis_frames_and_keeps_full_frames(tmp_path):
+    frames = write_video(tmp_path / "clip.mp4")
+    source = FFmpegPipeSource(str(tmp_path / "clip.mp4"), 160, 120, 10, skip_frames=3, analysis_width=80)
+    sampled = list(source)
+    assert [n for n, _, _ in sampled] == list(range(3, len(frames) + 1, 3))
+    for n, frame, full in sampled:
+        assert frame.shape == source.frame_shape == (60, 80, 3)
+        small = cv2.resize(frames[n - 1], (80, 60), interpolation=cv2.INTER_AREA)
+        # Chroma subsampling differs a little at this size; a wrong frame is off by ~80
+        assert np.abs(frame.astype(int) - small).mean() < 10
+        assert np.abs(source.to_bgr(full).astype(int) - frames[n - 1]).mean() < 2
+    assert source.stats()['frames_decoded'] == len(sampled)
+
+
+class LostFullPipeSource(FFmpegPipeSource):
+    """Full-resolution reader that dies without signalling the end of the stream"""
+
+    def _read_full_frames(self, stream, full_queue):
+        stream.close()
+
+
+@pytest.mark.skipif(not ffmpeg_available(), reason="ffmpeg not installed")
+def test_ffmpeg_pipe_survives_a_dead_full_frame_reader(tmp_path):
+    write_video(tmp_path / "clip.mp4")
+    source = LostFullPipeSource(str(tmp_path / "clip.mp4"), 160, 120, 10, skip_frames=3, analysis_width=80)
+    # Ends (ffmpeg may stop on the broken pipe) instead of waiting forever for a full frame
+    sampled = list(source)
+    for _, frame, full in sampled:
+        assert full.shape == (180, 160)  # I420 at full resolution, scaled up from the analysis frame
+    assert source.stats()['full_pipe_lost'] or not sampled
+
+
+@pytest.mark.skipif(os.name == "nt", reason="shell-script stand-in for ffmpeg")
+def test_ffmpeg_failure_falls_back_to_capture(tmp_path):
+    frames = write_video(tmp_path / "clip.mp4")
+    # An old ffmpeg build that fails before decoding anything
+    fake = tmp_path / "ffmpeg-4.4"
+    fake.write_text(
+        '#!/bin/sh\n'
+        'if [ "$1" = "-version" ]; then echo "ffmpeg version 4.4.2-0ubuntu0.22.04.1"; exit 0; fi\n'
+        'echo "Unrecognized option" >&2; exit 1\n'
+    )
+    fake.chmod(0o755)
+    assert ffmpeg_version(str(fake)) == (4, 4)
+
+    source = FFmpegPipeSource(str(tmp_path / "clip.mp4"), 160, 120, 10, skip_frames=3, analysis_width=80,
+                              ffmpeg=str(fake))
+    command = source._command(full_fd=3)
+    assert "-vsync" in command and "-fps_mode" not in command
+    sampled = list(source)
+    assert [n for n, _, _ in sampled] == list(range(3, len(frames) + 1, 3))
+    for n, frame, full in sampled:
+        assert frame.shape == source.frame_shape == (60, 80, 3)
+        assert np.abs(source.to_bgr(full).astype(int) - frames[n - 1]).mean() < 2
+    stats = source.stats()
+    assert stats['fallback'] and stats['frames_decoded'] == len(sampled) and stats['frames_seen'] == len(frames)
+
+    # A missing binary falls back the same way
+    missing = KeyframeSampler(str(tmp_path / "clip.mp4"), 160, 120, 10, skip_frames=5, ffmpeg=str(tmp_path / "none"))
+    assert [n for n, _, _ in missing] == list(range(5, len(frames) + 1, 5))
+
+
+def test_ffmpeg_decoder_keeps_full_resolution_on_windows(monkeypatch):
+    # Without pass_fds the ffmpeg pipe could only hand the encoder downscaled frames
+    monkeypatch.setattr(os, "name", "nt")
+    source = open_frame_source("clip.mp4", "stride", 3, 1920, 1080, 30, decoder="ffmpeg", analysis_width=640)
+    monkeypatch.undo()
+    assert isinstance(source, CaptureSampler) and source.frame_shape == (1080, 1920, 3)
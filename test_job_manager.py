@@ -0,0 +1,76 @@
+"""
+Tests for the Module 1 job manager (priorities, cancellation, ownership, history)
+"""
+
+import queue
+import threading
+import time
+from job_manager import JobManager
+
+
+class GatedProcessor:
+    """Processor whose jobs run until the test opens the gate (or the job is stopped)"""
+
+    gate = threading.Event()
+    started = []
+
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.progress_queue = queue.Queue()
+
+    def run(self, video_path, thresholds, fps, width, height, total_frames):
+        GatedProcessor.started.append(video_path)
+        self.progress_queue.put({'processed': 10})
+        while not (self.gate.is_set() or self.stop_event.is_set()):
+            time.sleep(0.01)
+        return {'completed': not self.stop_event.is_set(), 'video': video_path}
+
+    def get_progress(self):
+        updates = []
+        while not self.progress_queue.empty():
+            updates.append(self.progress_queue.get_nowait())
+        return updates
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def submit(manager, name, priority="normal", owner="a"):
+    return manager.submit(name, {}, 30, 640, 360, 100, priority=priority, owner=owner)
+
+
+def test_jobs_run_by_priority_and_cancel_by_owner():
+    GatedProcessor.gate.clear()
+    GatedProcessor.started = []
+    manager = JobManager(workers=1, history=2, processor_factory=GatedProcessor)
+    try:
+        first = submit(manager, "first")
+        wait_for(lambda: manager.status(first)['state'] == "running")
+        low = submit(manager, "low", "low")
+        normal = submit(manager, "normal", owner="b")
+        high = submit(manager, "high", "high")
+        assert manager.status(high)['queue_position'] == 0 and manager.status(low)['queue_position'] == 2
+
+        # Sessions only see and cancel their own jobs
+        assert manager.status(normal, owner="a") is None and not manager.cancel(normal, owner="a")
+        assert [job['job_id'] for job in manager.jobs(owner="b")] == [normal]
+        assert manager.cancel(low, owner="a") and manager.status(low)['state'] == "cancelled"
+
+        # A running job stops early and keeps its (partial) result
+        assert manager.cancel(first, owner="a")
+        wait_for(lambda: manager.status(first)['state'] == "cancelled")
+        assert manager.status(first)['progress'] == {'processed': 10}
+
+        GatedProcessor.gate.set()
+        wait_for(lambda: manager.stats()['queued'] + manager.stats()['running'] == 0)
+        assert GatedProcessor.started == ["first", "high", "normal"]
+        assert manager.status(normal)['result'] == {'completed': True, 'video': "normal"}
+        # Bounded history: only the two most recently finished jobs remain
+        assert manager.status(first) is None and manager.stats()['history'] == 2
+    finally:
+        GatedProcessor.gate.set()
+        manager.shutdown()
@@ -0,0 +1,79 @@
+"""
+Tests for the persistent classification cache
+"""
+
+from result_cache import ResultCache, model_id, thresholds_fingerprint, video_fingerprint
+
+
+def make_run(n_frames, detected="no_objects_but_saved"):
+    return {i: ("Normal", 0.7, detected, 0.0, 0.01) for i in range(n_frames)}
+
+
+def test_round_trip_and_threshold_key(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    key = cache.make_key("video", "yolov8n.pt:torch", thresholds_fingerprint({'ssim_threshold': 0.97}))
+    assert cache.lookup(key) is None
+    cache.store(key, make_run(5), {'near_duplicates': 2})
+    results, summary = cache.lookup(key)
+    assert results[3] == ("Normal", 0.7, "no_objects_but_saved", 0.0)
+    assert summary == {'near_duplicates': 2}
+    # Settings that don't change results share a key; real thresholds don't
+    assert thresholds_fingerprint({'ssim_threshold': 0.97, 'batch_size': 4}) == \
+        thresholds_fingerprint({'ssim_threshold': 0.97})
+    assert thresholds_fingerprint({'ssim_threshold': 0.9}) != thresholds_fingerprint({'ssim_threshold': 0.97})
+
+
+def test_lru_eviction_keeps_recently_used_runs(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_bytes=10 ** 9)
+    keys = [cache.make_key(f"video{i}", "m", "t") for i in range(3)]
+    for key in keys:
+        cache.store(key, make_run(2000, "x" * 40))
+    cache.lookup(keys[0])  # keys[1] is now the least recently used
+    cache.max_bytes = cache.size_bytes() - 1
+    cache.store(cache.make_key("video3", "m", "t"), make_run(10))
+    assert cache.lookup(keys[1]) is None
+    assert cache.lookup(keys[0]) is not None
+
+
+def test_video_fingerprint_samples_large_files(tmp_path):
+    data = bytearray(range(256)) * (40 * 1024)  # 10 MB
+    path = tmp_path / "video.mp4"
+    path.write_bytes(bytes(data))
+    fingerprint = video_fingerprint(str(path), samples=4, chunk_size=1024)
+    assert fingerprint == video_fingerprint(str(tmp_path / "video.mp4"), samples=4, chunk_size=1024)
+
+    # Any change in a sampled chunk (here the last one) or in the size changes it
+    data[-1] ^= 1
+    path.write_bytes(bytes(data))
+    assert video_fingerprint(str(path), samples=4, chunk_size=1024) != fingerprint
+    path.write_bytes(bytes(data) + b"\0")
+    assert video_fingerprint(str(path), samples=4, chunk_size=1024) != fingerprint
+
+    # Small files are hashed whole: a change anywhere counts
+    small = bytearray(4000)
+    path.write_bytes(bytes(small))
+    before = video_fingerprint(str(path), samples=4, chunk_size=1024)
+    small[2000] = 1
+    path.write_bytes(bytes(small))
+    assert video_fingerprint(str(path), samples=4, chunk_size=1024) != before
+
+
+def test_runs_without_yolo_are_not_stored(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    run = make_run(5)
+    run[2] = ("Normal", 0.8, "no_model", 0.0, 0.01)
+    assert not cache.store(cache.make_key("video", "m", "t"), run)
+    run[2] = ("Normal", 0.6, "detection_ok_saved", 0.0, 0.01)
+    assert not cache.store(cache.make_key("video", "m", "t"), run)
+    assert cache.lookup(cache.make_key("video", "m", "t")) is None
+    assert cache.store(cache.make_key("video", "m", "t"), make_run(5))
+
+
+def test_key_follows_config_constants_and_loaded_backend(monkeypatch):
+    import config
+    before = thresholds_fingerprint({'ssim_threshold': 0.97})
+    monkeypatch.setattr(config, "PHASH_MAX_DISTANCE", config.PHASH_MAX_DISTANCE + 1)
+    assert thresholds_fingerprint({'ssim_threshold': 0.97}) != before
+    # An ONNX request that fell back to torch shares the torch results
+    assert model_id({'backend': 'onnx'}, backend='torch') == model_id({'backend': 'torch'})
+    assert model_id({'backend': 'onnx'}) != model_id({'backend': 'torch'})
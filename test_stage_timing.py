@@ -0,0 +1,28 @@
+"""
+Tests for the per-stage latency histograms
+"""
+
+import numpy as np
+from stage_timing import LatencyHistogram, StageProfiler, profiling, stage
+
+
+def test_histogram_percentiles_track_exact_values():
+    samples = np.random.default_rng(0).lognormal(mean=-6, sigma=1.0, size=5000)
+    histogram = LatencyHistogram()
+    for value in samples:
+        histogram.add(float(value))
+    for q in (50, 95, 99):
+        assert abs(histogram.percentile(q) / np.percentile(samples, q) - 1) < 0.07
+    assert histogram.count == len(samples)
+    assert abs(histogram.total - samples.sum()) < 1e-9
+
+
+def test_stage_records_only_into_the_active_profiler():
+    profiler = StageProfiler()
+    with stage("resize"):
+        pass
+    with profiling(profiler):
+        with stage("ssim", count=4):
+            pass
+    summary = profiler.summary()
+    assert list(summary) == ["ssim"] and summary["ssim"]["count"] == 4
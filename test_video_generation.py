@@ -7,7 +7,7 @@ import cv2
 import numpy as np
 import os
 import tempfile
-from video_generator import create_video_from_frames
+from video_generator import create_video_from_frames, StreamingVideoSink
 
 def create_test_frames(num_frames=30, width=640, height=480):
     """Create test frames with different colors and patterns"""
@@ -91,6 +91,22 @@ def test_video_generation():
         print(f"❌ Video creation failed: {message}")
         return False
 
+def test_streaming_sink_encodes_bgr_and_yuv_frames():
+    """Frames streamed into one encoder (no frame files) come back as a readable video"""
+    frames = create_test_frames(12, 160, 120)
+    for pix_fmt in ("bgr24", "yuv420p"):
+        temp_dir = tempfile.mkdtemp()
+        sink = StreamingVideoSink(os.path.join(temp_dir, "stream.mp4"), fps=10, width=160, height=120, pix_fmt=pix_fmt)
+        assert sink.open()
+        for frame in frames:
+            assert sink.write(frame if pix_fmt == "bgr24" else cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420))
+        success, message, frames_written = sink.close()
+        assert success, message
+        assert frames_written == 12 and os.listdir(temp_dir) == ["stream.mp4"]
+        cap = cv2.VideoCapture(sink.output_path)
+        assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 12
+        cap.release()
+
 if __name__ == "__main__":
     success = test_video_generation()
     if success:
@@ -0,0 +1,170 @@
+"""
+AURA Module 1 - Keyframe Detection + Lightweight Tracker
+YOLO runs only on keyframes (every N frames or on scene cuts); in between,
+detections are carried forward by a global-shift tracker so every frame still
+gets a Critical / Important / Normal label at a fraction of the inference cost
+"""
+
+import cv2
+import numpy as np
+from config import KEYFRAME_INTERVAL, SCENE_CUT_THRESHOLD, TRACK_WIDTH
+
+# Minimum IoU for a keyframe detection to continue an existing track
+TRACK_IOU_MATCH = 0.3
+
+
+def box_iou(box1, box2):
+    """IoU of two (x1, y1, x2, y2) boxes"""
+    ix1, iy1 = max(box1[0], box2[0]), max(box1[1], box2[1])
+    ix2, iy2 = min(box1[2], box2[2]), min(box1[3], box2[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
+    area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
+    union = area1 + area2 - inter
+    return inter / union if union > 0 else 0.0
+
+
+def gray_histogram(gray, bins=16):
+    """Normalized gray-level histogram of a thumbnail"""
+    hist = np.bincount((gray // (256 // bins)).ravel(), minlength=bins).astype(np.float64)
+    return hist / max(hist.sum(), 1.0)
+
+
+class KeyframeTracker:
+    """
+    Per-stream keyframe scheduler + global-shift box tracker
+    Drone footage is dominated by camera motion, so boxes are propagated by the
+    frame-to-frame content shift (phase correlation on a TRACK_WIDTH gray image)
+    rather than by per-object trackers. Boxes are kept in normalized (0-1) frame
+    coordinates; tracks that drift out of frame or outlive max_age are dropped.
+
+    Usage per frame, in stream order:
+        shift = tracker.observe(features)      # every frame, even discarded ones
+        tracker.take_keyframe()                # True -> run YOLO on this frame
+        tracker.apply(shift, detections)       # detections only on keyframes
+        tracker.objects()                      # (class_name, confidence) of live tracks
+    """
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, scene_cut_threshold=SCENE_CUT_THRESHOLD,
+                 max_age=None):
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.scene_cut_threshold = scene_cut_threshold
+        self.max_age = max_age if max_age is not None else 2 * self.keyframe_interval
+        self.reset()
+
+    def reset(self):
+        """Forget all tracks and stream history"""
+        self.tracks = []
+        self.next_track_id = 0
+        self.prev_track_gray = None
+        self.prev_hist = None
+        self.frames_since_keyframe = 0
+        self.keyframe_pending = True
+        self.keyframes = 0
+        self.scene_cuts = 0
+        self.tracked_frames = 0
+
+    def observe(self, features):
+        """
+        Register the next frame of the stream
+        Returns the (dx, dy) content shift since the previous frame in normalized
+        coordinates, and flags a pending keyframe on interval or scene cut.
+        """
+        frame = features.frame
+        h, w = frame.shape[:2]
+        track_h = max(1, int(round(h * TRACK_WIDTH / w)))
+        track_gray = cv2.cvtColor(
+            cv2.resize(frame, (TRACK_WIDTH, track_h), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY
+        ).astype(np.float32)
+        hist = gray_histogram(features.gray)
+
+        shift = (0.0, 0.0)
+        if self.prev_track_gray is not None and self.prev_track_gray.shape == track_gray.shape:
+            (dx, dy), _ = cv2.phaseCorrelate(self.prev_track_gray, track_gray)
+            shift = (dx / TRACK_WIDTH, dy / track_h)
+
+            # Scene cut: the gray-level distribution changes abruptly
+            if 0.5 * np.abs(hist - self.prev_hist).sum() > self.scene_cut_threshold:
+                self.scene_cuts += 1
+                self.keyframe_pending = True
+
+        self.prev_track_gray = track_gray
+        self.prev_hist = hist
+        self.frames_since_keyframe += 1
+        if self.frames_since_keyframe >= self.keyframe_interval:
+            self.keyframe_pending = True
+
+        return shift
+
+    def take_keyframe(self):
+        """
+        Called for frames that reach the detection stage
+        Returns True (and resets the interval) if this frame must run YOLO
+        """
+        if not self.keyframe_pending:
+            self.tracked_frames += 1
+            return False
+
+        self.keyframe_pending = False
+        self.frames_since_keyframe = 0
+        self.keyframes += 1
+        return True
+
+    def apply(self, shift, detections=None):
+        """
+        Advance the tracks by one frame
+        shift: normalized (dx, dy) from observe(); detections: on keyframes, a list
+        of (class_name, confidence, (x1, y1, x2, y2)) in normalized coordinates
+        """
+        dx, dy = shift
+        alive = []
+        for track in self.tracks:
+            x1, y1, x2, y2 = track['box']
+            track['box'] = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+            track['age'] += 1
+            cx = (track['box'][0] + track['box'][2]) / 2
+            cy = (track['box'][1] + track['box'][3]) / 2
+            if 0.0 <= cx <= 1.0 and 0.0 <= cy <= 1.0 and track['age'] <= self.max_age:
+                alive.append(track)
+        self.tracks = alive
+
+        if detections is not None:
+            self._reseed(detections)
+
+    def _reseed(self, detections):
+        """Keyframe detections replace the tracks; IoU matches keep their track id"""
+        unmatched = list(self.tracks)
+        new_tracks = []
+        for class_name, confidence, box in sorted(detections, key=lambda d: -d[1]):
+            best, best_iou = None, TRACK_IOU_MATCH
+            for track in unmatched:
+                iou = box_iou(track['box'], box)
+                if track['class_name'] == class_name and iou >= best_iou:
+                    best, best_iou = track, iou
+            if best is not None:
+                unmatched.remove(best)
+                track_id = best['id']
+            else:
+                track_id = self.next_track_id
+                self.next_track_id += 1
+            new_tracks.append({
+                'id': track_id, 'class_name': class_name, 'confidence': confidence,
+                'box': tuple(box), 'age': 0
+            })
+        self.tracks = new_tracks
+
+    def objects(self):
+        """(class_name, confidence) of every live track, highest confidence first"""
+        return [(t['class_name'], t['confidence']) for t in sorted(self.tracks, key=lambda t: -t['confidence'])]
+
+    def stats(self):
+        """Keyframe / tracking statistics for job results"""
+        detection_frames = self.keyframes + self.tracked_frames
+        return {
+            'keyframes': self.keyframes,
+            'tracked_frames': self.tracked_frames,
+            'scene_cuts': self.scene_cuts,
+            'tracks_created': self.next_track_id,
+            'inference_fraction': self.keyframes / detection_frames if detection_frames else 0.0,
+            'keyframe_interval': self.keyframe_interval
+        }
@@ -9,6 +9,9 @@ import os
 import sys
 import tempfile
 import shutil
+import threading
+import time
+from collections import deque
 
 def _safe_int_fps(fps):
     """Ensure FPS is a valid integer"""
@@ -307,3 +310,196 @@ def create_video_from_frame_files(frames_dir, output_path, fps, width, height, c
         return False, "FFmpeg timeout - video too long or system overloaded", 0
     except Exception as e:
         return False, f"FFmpeg error: {str(e)}", 0
+
+
+class StreamingVideoSink:
+    """
+    Streaming MP4 output: ONE ffmpeg encoder reading rawvideo on stdin, opened at
+    job start and fed each kept frame as soon as it's classified - no temporary
+    frame files, so the only bytes written to disk are the MP4 itself.
+    Falls back to cv2.VideoWriter (mp4v) when ffmpeg is not available.
+    pix_fmt is the layout of the frames fed in: "bgr24", or "yuv420p" (I420,
+    e.g. the ffmpeg frame source's full frames - encoded without converting).
+    close() finalizes the file - after a completed OR stopped job - and
+    returns (success, message, frames_written) like the functions above.
+    """
+
+    def __init__(self, output_path, fps, width, height, pix_fmt="bgr24", crf=23, preset="ultrafast"):
+        # Ensure output is mp4
+        self.output_path = os.path.splitext(output_path)[0] + ".mp4"
+        self.fps = _safe_int_fps(fps)
+        self.width = int(width)
+        self.height = int(height)
+        self.pix_fmt = pix_fmt
+        self.crf = min(crf, 23)  # Cap CRF for speed
+        self.preset = preset
+        self.mode = None
+        self.process = None
+        self.writer = None
+        self.frames_written = 0
+        self.bytes_streamed = 0
+        self.encode_time = 0.0
+        self.error = None
+        self.closed = False
+        self._log = deque(maxlen=20)
+        self._log_reader = None
+
+    def open(self):
+        """Start the encoder (ffmpeg, else cv2.VideoWriter). Returns True if one is running"""
+        # Even output dimensions (required for yuv420p), same scale/pad as create_video_from_frame_files
+        width = max(64, self.width + (self.width % 2))
+        height = max(64, self.height + (self.height % 2))
+        if shutil.which("ffmpeg") is not None:
+            ffmpeg_cmd = [
+                "ffmpeg",
+                "-y",
+                "-hide_banner",
+                "-loglevel", "error",
+                "-f", "rawvideo",
+                "-pix_fmt", self.pix_fmt,
+                "-s", f"{self.width}x{self.height}",
+                "-framerate", str(self.fps),
+                "-i", "-",
+                "-c:v", "libx264",
+                "-pix_fmt", "yuv420p",
+                "-crf", str(self.crf),
+                "-preset", self.preset,
+                "-movflags", "+faststart",
+                "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
+                self.output_path
+            ]
+            try:
+                self.process = subprocess.Popen(
+                    ffmpeg_cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+                )
+                # Drain stderr so a chatty encoder can never block on it
+                self._log_reader = threading.Thread(target=self._read_log, daemon=True)
+                self._log_reader.start()
+                self.mode = "ffmpeg"
+                return True
+            except Exception as e:
+                print(f"Warning: Could not start FFmpeg encoder: {e}")
+                self.process = None
+
+        try:
+            import cv2
+            self.writer = cv2.VideoWriter(
+                self.output_path, cv2.VideoWriter_fourcc(*"mp4v"), float(self.fps), (width, height)
+            )
+            if self.writer.isOpened():
+                self.mode = "opencv"
+                return True
+        except Exception as e:
+            print(f"Warning: Could not open OpenCV VideoWriter: {e}")
+        self.writer = None
+        self.error = "No video encoder available"
+        return False
+
+    def _read_log(self):
+        for line in iter(self.process.stderr.readline, b""):
+            self._log.append(line.decode("utf-8", "replace").strip())
+
+    def write(self, frame):
+        """Encode the next kept frame. Returns True if it was accepted"""
+        if self.error is not None or (self.process is None and self.writer is None):
+            return False
+        start = time.perf_counter()
+        try:
+            import numpy as np
+            if self.pix_fmt == "yuv420p":
+                if frame.shape[:2] != (self.height * 3 // 2, self.width):
+                    return False
+            else:
+                frame = _validate_frame(frame, self.width, self.height)
+                if frame is None:
+                    return False
+
+            if self.process is not None:
+                data = np.ascontiguousarray(frame)
+                self.process.stdin.write(data.data)
+                self.bytes_streamed += data.nbytes
+            else:
+                import cv2
+                if self.pix_fmt == "yuv420p":
+                    frame = cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+                width, height = self.width + (self.width % 2), self.height + (self.height % 2)
+                self.writer.write(_validate_frame(frame, max(64, width), max(64, height)))
+            self.frames_written += 1
+            return True
+        except (BrokenPipeError, OSError) as e:
+            self.error = f"FFmpeg encoder stopped: {' | '.join(self._log)[-200:] or e}"
+            return False
+        except Exception as e:
+            self.error = f"Encoding failed: {str(e)}"
+            return False
+        finally:
+            self.encode_time += time.perf_counter() - start
+
+    def close(self):
+        """Finalize the MP4 with every frame written so far. Returns (success, message, frames_written)"""
+        self.closed = True
+        start = time.perf_counter()
+        try:
+            if self.process is not None:
+                try:
+                    self.process.stdin.close()
+                except Exception:
+                    pass
+                try:
+                    returncode = self.process.wait(timeout=300)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+                    self.error = self.error or "FFmpeg timeout - video too long or system overloaded"
+                    returncode = -1
+                if self._log_reader is not None:
+                    self._log_reader.join(timeout=5)
+                self.process = None
+                if returncode != 0 and self.error is None:
+                    self.error = f"FFmpeg failed: {' | '.join(self._log)[-200:]}"
+            elif self.writer is not None:
+                self.writer.release()
+                self.writer = None
+        finally:
+            self.encode_time += time.perf_counter() - start
+
+        if self.frames_written == 0:
+            self._remove_output()
+            return False, self.error or "No frames provided", 0
+        if self.error is not None:
+            return False, self.error, 0
+        if not os.path.exists(self.output_path) or os.path.getsize(self.output_path) < 1000:
+            return False, "Output file not created or too small", 0
+
+        file_size_mb = os.path.getsize(self.output_path) / (1024.0 * 1024.0)
+        label = "FFmpeg MP4 Streamed" if self.mode == "ffmpeg" else "OpenCV MP4V Streamed"
+        return True, f"✅ {label}: {self.frames_written} frames | {file_size_mb:.2f} MB", self.frames_written
+
+    def abort(self):
+        """Kill the encoder and delete the partial file (job failed)"""
+        self.closed = True
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+        self._remove_output()
+
+    def _remove_output(self):
+        try:
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        except OSError:
+            pass
+
+    def stats(self):
+        """Encoder statistics for job results"""
+        return {
+            'mode': self.mode,
+            'frames_written': self.frames_written,
+            'bytes_streamed': self.bytes_streamed,
+            'output_bytes': os.path.getsize(self.output_path) if os.path.exists(self.output_path) else 0,
+            'encode_time': self.encode_time
+        }